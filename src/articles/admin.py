@@ -1,5 +1,6 @@
 from django.contrib import admin
-from articles.models import Article, Rating
+from articles.models import Article, ArchivedRating, Rating
 
 admin.site.register(Article)
 admin.site.register(Rating)
+admin.site.register(ArchivedRating)
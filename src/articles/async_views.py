@@ -0,0 +1,100 @@
+from rest_framework import permissions, serializers, status
+from rest_framework.request import Request
+
+from articles.caches import articles_list_cache
+from articles.constants import ArticlesListPaginationMode
+from articles.models import Article, Rating
+from articles.paginations import AsyncArticleCursorPagination, AsyncArticlePageNumberPagination
+from articles.rating_buffer import rating_buffer
+from articles.serializers import RatingBatchItemSerializer, rating_compiled_serializer
+from articles.spam_detector import spam_detector
+from articles.views import ArticlesListMixin
+from core.async_views import AsyncAPIView
+from core.constants import APIMessages
+from core.db_routers import apin_user_to_primary, aread_from_replica
+from core.settings import config
+from users.authentication import CachedTokenAuthentication
+
+
+class AsyncArticlesListView(ArticlesListMixin, AsyncAPIView):
+    '''
+    Async ArticlesListView, with the same pagination modes, page cache and replica reads.
+    '''
+    authentication_classes = [CachedTokenAuthentication]
+    pagination_classes = {
+        ArticlesListPaginationMode.PAGE_NUMBER: AsyncArticlePageNumberPagination,
+        ArticlesListPaginationMode.CURSOR: AsyncArticleCursorPagination,
+    }
+
+    async def get(self, request: Request):
+        async with aread_from_replica(user=request.user):
+            page_data = await articles_list_cache.aget_or_set(
+                request.build_absolute_uri(),
+                self.aget_articles_page_data,
+            )
+            if request.user.is_authenticated:
+                page_data = {
+                    **page_data,
+                    'results': await Rating.objects.aannotate_serialized_articles_with_user_rating(
+                        page_data['results'],
+                        user=request.user
+                    ),
+                }
+
+        return page_data, status.HTTP_200_OK
+
+    async def aget_articles_page_data(self) -> dict:
+        compiled_serializer = self.get_compiled_serializer()
+        articles_in_page = await self.paginator.apaginate_queryset(
+            self.get_queryset().values(*compiled_serializer.values_fields),
+            self.request,
+        )
+        page_data = self.paginator.get_paginated_response(
+            compiled_serializer.serialize_rows(articles_in_page)
+        ).data
+        return dict(page_data)
+
+
+async def aupsert_user_rating(user, article, score: int, spam_status: int):
+    '''
+    Async upsert_user_rating. The async ORM runs in autocommit, so the rating is
+    committed before it is buffered.
+    return rating, old_score
+    '''
+    rating, old_score = await Rating.objects.aupsert_user_rating(
+        user=user,
+        article=article,
+        score=score,
+        spam_status=spam_status,
+        update_article=not config.RATING_WRITE_BEHIND_IS_ACTIVE,
+    )
+    if config.RATING_WRITE_BEHIND_IS_ACTIVE:
+        await rating_buffer.apush_rating(rating, old_score)
+    return rating, old_score
+
+
+class AsyncRatingView(AsyncAPIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    article_does_not_exist_message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+
+    async def post(self, request: Request):
+        serializer = RatingBatchItemSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        article_id = serializer.validated_data.get('article')
+        score = serializer.validated_data.get('score')
+        article = await Article.objects.filter(id=article_id).afirst()
+        if article is None:
+            raise serializers.ValidationError({
+                'article': [self.article_does_not_exist_message.format(pk_value=article_id)],
+            })
+
+        spam_status = await spam_detector.aget_spam_status_for_article_score(score, article, request.user.id)
+        rating, _ = await aupsert_user_rating(request.user, article, score, spam_status)
+        await apin_user_to_primary(request.user)
+
+        return {
+                "message": APIMessages.RATING_CREATED_SUCCESSFULLY,
+                "rating": rating_compiled_serializer.serialize_instance(rating)
+            }, status.HTTP_200_OK
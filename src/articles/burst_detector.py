@@ -0,0 +1,124 @@
+import logging
+import time
+
+import redis
+
+from core.redis import get_async_redis_client, get_redis_client
+from core.settings import config
+
+logger = logging.getLogger(__name__)
+
+
+class RatingBurstDetector:
+    '''
+    Counts ratings of each article and each user in redis over sliding windows
+    and reports bursts: an article rated far more often in the last window
+    seconds than its rate over the last baseline_window seconds, or a user
+    submitting more than user_limit ratings in a window.
+
+    Sliding windows are estimated from counters of the current and previous
+    fixed windows (previous count weighted by the part of it still in the
+    sliding window), so recording a rating is one pipeline of O(1) commands.
+    Redis failures are logged and never report a burst.
+    '''
+
+    def __init__(
+            self,
+            redis_client=None,
+            async_redis_client=None,
+            window: int = 60,
+            baseline_window: int = 3600,
+            min_count: int = 20,
+            factor: float = 5.0,
+            user_limit: int = 30,
+            key_prefix: str = 'articles:rating_burst',
+        ) -> None:
+        if not 0 < window < baseline_window:
+            raise ValueError(
+                f'Burst window ({window}) should be positive and shorter than baseline window ({baseline_window}).'
+            )
+        self._redis_client = redis_client
+        self._async_redis_client = async_redis_client
+        self.window = window
+        self.baseline_window = baseline_window
+        self.min_count = min_count
+        self.factor = factor
+        self.user_limit = user_limit
+        self.key_prefix = key_prefix
+
+    @property
+    def redis_client(self):
+        return self._redis_client or get_redis_client()
+
+    @property
+    def async_redis_client(self):
+        return self._async_redis_client or get_async_redis_client()
+
+    def get_keys(self, name: str, window: int, now: float) -> tuple[str, str]:
+        bucket = int(now // window)
+        return f'{self.key_prefix}:{name}:{window}:{bucket}', f'{self.key_prefix}:{name}:{window}:{bucket - 1}'
+
+    def add_counter(self, pipeline, name: str, window: int, now: float) -> None:
+        current_key, previous_key = self.get_keys(name, window, now)
+        pipeline.incr(current_key)
+        pipeline.expire(current_key, window * 2)
+        pipeline.get(previous_key)
+
+    def get_sliding_count(self, window: int, now: float, current_count: int, previous_count: bytes | None) -> float:
+        previous_weight = 1 - (now % window) / window
+        return current_count + int(previous_count or 0) * previous_weight
+
+    def add_rating_counters(self, pipeline, article_id: int, user_id: int | None, now: float) -> None:
+        self.add_counter(pipeline, f'article:{article_id}', self.window, now)
+        self.add_counter(pipeline, f'article:{article_id}', self.baseline_window, now)
+        if user_id is not None:
+            self.add_counter(pipeline, f'user:{user_id}', self.window, now)
+
+    def is_burst(self, results: list, user_id: int | None, now: float) -> bool:
+        article_count = self.get_sliding_count(self.window, now, results[0], results[2])
+        baseline_count = self.get_sliding_count(self.baseline_window, now, results[3], results[5])
+        if user_id is not None and self.get_sliding_count(self.window, now, results[6], results[8]) > self.user_limit:
+            return True
+        return self.is_article_burst(article_count, baseline_count)
+
+    def record_rating(self, article_id: int, user_id: int | None = None, now: float | None = None) -> bool:
+        '''
+        Counts the rating and returns whether it is part of a burst.
+        '''
+        now = time.time() if now is None else now
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            self.add_rating_counters(pipeline, article_id, user_id, now)
+            results = pipeline.execute()
+        except redis.RedisError:
+            logger.warning('Could not record rating for burst detection', exc_info=True)
+            return False
+        return self.is_burst(results, user_id, now)
+
+    async def arecord_rating(self, article_id: int, user_id: int | None = None, now: float | None = None) -> bool:
+        '''
+        Same as record_rating for async views, using redis.asyncio.
+        '''
+        now = time.time() if now is None else now
+        try:
+            pipeline = self.async_redis_client.pipeline(transaction=False)
+            self.add_rating_counters(pipeline, article_id, user_id, now)
+            results = await pipeline.execute()
+        except redis.RedisError:
+            logger.warning('Could not record rating for burst detection', exc_info=True)
+            return False
+        return self.is_burst(results, user_id, now)
+
+    def is_article_burst(self, article_count: float, baseline_count: float) -> bool:
+        # expected count of a window at the baseline rate, leaving out the window itself
+        expected_count = max(baseline_count - article_count, 0) * self.window / (self.baseline_window - self.window)
+        return article_count >= self.min_count and article_count > self.factor * max(expected_count, 1)
+
+
+rating_burst_detector = RatingBurstDetector(
+    window=config.RATING_BURST_WINDOW,
+    baseline_window=config.RATING_BURST_BASELINE_WINDOW,
+    min_count=config.RATING_BURST_MIN_COUNT,
+    factor=config.RATING_BURST_FACTOR,
+    user_limit=config.RATING_BURST_USER_LIMIT,
+)
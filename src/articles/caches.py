@@ -0,0 +1,11 @@
+from core.cache import TwoTierCache
+from core.settings import config
+
+
+articles_list_cache = TwoTierCache(
+    namespace='articles:list',
+    ttl=config.ARTICLES_LIST_CACHE_TTL,
+    local_max_size=config.ARTICLES_LIST_LOCAL_CACHE_SIZE,
+    is_active=config.ARTICLES_LIST_CACHE_IS_ACTIVE,
+    version_ttl=config.ARTICLES_LIST_CACHE_VERSION_TTL,
+)
@@ -14,3 +14,13 @@ class RatingSpamStatus(models.IntegerChoices):
     NOT_SPAM = 0, 'not spam'
     PROBABLE_SPAM = 1, 'probable spam'
     SPAM = 2, 'spam'
+
+
+class ArticlesListPaginationMode(models.TextChoices):
+    PAGE_NUMBER = 'page_number', 'page number'
+    CURSOR = 'cursor', 'cursor'
+
+
+class ArticlesListBodyMode(models.TextChoices):
+    FULL = 'full', 'full'
+    EXCERPT = 'excerpt', 'excerpt'
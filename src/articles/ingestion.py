@@ -0,0 +1,161 @@
+import csv
+import itertools
+import json
+from typing import IO, Iterable, Iterator, List
+
+from django.core.management.color import no_style
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+
+from articles.caches import articles_list_cache
+from articles.constants import RatingSpamStatus
+from articles.models import Article, Rating
+
+
+RATING_COLUMNS = ['user_id', 'article_id', 'score', 'spam_status', 'created_at', 'updated_at']
+RATING_DEFAULTS = {'spam_status': RatingSpamStatus.NOT_SPAM}
+
+INSERT_STAGED_RATINGS_SQL = '''
+INSERT INTO {rating_table} ({columns})
+SELECT DISTINCT ON (staged.article_id, staged.user_id) {staged_columns}
+FROM {staging_table} AS staged
+WHERE EXISTS (SELECT 1 FROM {article_table} WHERE id = staged.article_id)
+    AND EXISTS (SELECT 1 FROM {user_table} WHERE id = staged.user_id)
+ORDER BY staged.article_id, staged.user_id, staged.updated_at DESC
+ON CONFLICT (article_id, user_id) DO NOTHING
+RETURNING article_id
+'''
+
+
+def read_records(file: IO, file_format: str) -> Iterator[dict]:
+    '''
+    Streams records of a JSONL or CSV (with header) file.
+    '''
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def chunked(records: Iterable[dict], chunk_size: int) -> Iterator[List[dict]]:
+    iterator = iter(records)
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        yield chunk
+
+
+def get_column_value(field: models.Field, record: dict, now, defaults: dict | None = None):
+    '''
+    Value of the column from record, or the value the ORM would set when missing.
+    '''
+    value = record.get(field.attname)
+    if value not in (None, ''):
+        return value
+    if defaults and field.attname in defaults:
+        return defaults[field.attname]
+    if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+        return record.get('created_at') or now
+    return field.get_default()
+
+
+class CopyIngestor:
+    '''
+    Loads articles and ratings in chunks with postgres COPY. Only one chunk
+    of records is kept in memory and each chunk is committed on its own.
+    Articles may keep their ids (e.g. ids of an older system, which ratings
+    refer to). Ratings are copied to a temporary table first and inserted
+    unless the user already rated the article or the article or user does
+    not exist. Article rating info is not updated, see rebuild_rating_info.
+    '''
+
+    def __init__(self, chunk_size: int = 10000) -> None:
+        self.chunk_size = chunk_size
+        self.db = router.db_for_write(Article)
+
+    def copy_rows(self, cursor, table: str, columns: List[str], rows: Iterable[tuple]) -> None:
+        with cursor.copy(f'COPY {table} ({", ".join(columns)}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row)
+
+    def ingest_articles(self, records: Iterable[dict]) -> int:
+        '''
+        Either all records or none of them have an id, otherwise ValueError is
+        raised at the first record that differs. Chunks before it stay loaded.
+        '''
+        loaded_count = 0
+        has_ids = None
+        try:
+            for chunk in chunked(records, self.chunk_size):
+                for i, record in enumerate(chunk, loaded_count + 1):
+                    record_has_id = record.get('id') not in (None, '')
+                    if has_ids is None:
+                        has_ids = record_has_id
+                    elif record_has_id != has_ids:
+                        raise ValueError(
+                            f'Article record {i} '
+                            f'{"has no" if has_ids else "has an"} id unlike the first record. '
+                            'Either all records or none of them should have ids.'
+                        )
+                fields = [
+                    field for field in Article._meta.concrete_fields
+                    if not field.primary_key or has_ids
+                ]
+                now = timezone.now()
+                with transaction.atomic(using=self.db), connections[self.db].cursor() as cursor:
+                    self.copy_rows(
+                        cursor,
+                        Article._meta.db_table,
+                        [field.column for field in fields],
+                        (tuple(get_column_value(field, record, now) for field in fields) for record in chunk),
+                    )
+                loaded_count += len(chunk)
+        finally:
+            if has_ids and loaded_count:
+                # move id sequence past copied ids
+                with connections[self.db].cursor() as cursor:
+                    for sql in connections[self.db].ops.sequence_reset_sql(no_style(), [Article]):
+                        cursor.execute(sql)
+            if loaded_count:
+                articles_list_cache.invalidate()
+        return loaded_count
+
+    def ingest_ratings(self, records: Iterable[dict]) -> tuple[int, int, set]:
+        '''
+        return loaded count, skipped count, ids of articles with loaded ratings
+        '''
+        fields = [Rating._meta.get_field(column.removesuffix('_id')) for column in RATING_COLUMNS]
+        staging_table = 'articles_rating_ingestion'
+        sql = INSERT_STAGED_RATINGS_SQL.format(
+            rating_table=Rating._meta.db_table,
+            article_table=Article._meta.db_table,
+            user_table=Rating._meta.get_field('user').related_model._meta.db_table,
+            staging_table=staging_table,
+            columns=', '.join(RATING_COLUMNS),
+            staged_columns=', '.join(f'staged.{column}' for column in RATING_COLUMNS),
+        )
+        loaded_count = skipped_count = 0
+        article_ids = set()
+        for chunk in chunked(records, self.chunk_size):
+            now = timezone.now()
+            with transaction.atomic(using=self.db), connections[self.db].cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TEMPORARY TABLE {staging_table} AS '
+                    f'SELECT {", ".join(RATING_COLUMNS)} FROM {Rating._meta.db_table} WITH NO DATA'
+                )
+                self.copy_rows(
+                    cursor,
+                    staging_table,
+                    RATING_COLUMNS,
+                    (
+                        tuple(get_column_value(field, record, now, RATING_DEFAULTS) for field in fields)
+                        for record in chunk
+                    ),
+                )
+                cursor.execute(sql)
+                chunk_article_ids = [row[0] for row in cursor.fetchall()]
+                cursor.execute(f'DROP TABLE {staging_table}')
+            loaded_count += len(chunk_article_ids)
+            skipped_count += len(chunk) - len(chunk_article_ids)
+            article_ids.update(chunk_article_ids)
+        return loaded_count, skipped_count, article_ids
@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from articles.models import Rating
+from core.settings import config
+
+
+class Command(BaseCommand):
+    help = 'Moves settled spam ratings to the archive table in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age-days', type=int, default=config.RATING_ARCHIVE_AGE_DAYS,
+            help='Spam ratings not updated for this many days are archived',
+        )
+        parser.add_argument('--batch-size', type=int, default=config.RATING_ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        archived_count = Rating.objects.archive_spam_ratings(
+            timezone.now() - datetime.timedelta(days=options['age_days']),
+            options['batch_size'],
+        )
+        self.stdout.write(f'Archived {archived_count} spam ratings')
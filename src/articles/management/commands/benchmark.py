@@ -0,0 +1,225 @@
+import datetime
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from articles.constants import RatingScores, RatingSpamStatus
+from articles.managers import ACCEPTABLE_SCORE_BAND_FIELDS
+from articles.models import Article, Rating
+from articles.seeding import SEED_USERNAME_PREFIX
+from articles.spam_detector import spam_detector
+from core.benchmark import run_load
+
+
+SCENARIOS = ('list', 'rate', 'login', 'spam')
+BENCHMARK_USERNAME_PREFIX = 'benchmark_'
+
+
+class InProcessTransport:
+    '''
+    Sends requests through django test client in this process, one client per thread.
+    '''
+
+    def __init__(self) -> None:
+        self.local = threading.local()
+        allowed_hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+        self.host = allowed_hosts[0].lstrip('.') if allowed_hosts else 'testserver'
+
+    def send(self, method: str, path: str, data: dict | None = None, token: str | None = None) -> int:
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client(HTTP_HOST=self.host)
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        if method == 'GET':
+            response = self.local.client.get(path, data, headers=headers)
+        else:
+            response = self.local.client.post(path, data, content_type='application/json', headers=headers)
+        return response.status_code
+
+
+class HTTPTransport:
+    '''
+    Sends requests to a running server.
+    '''
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, method: str, path: str, data: dict | None = None, token: str | None = None) -> int:
+        url = self.base_url + path
+        body = None
+        if method == 'GET' and data:
+            url += '?' + urllib.parse.urlencode(data)
+        elif data is not None:
+            body = json.dumps(data).encode()
+        request = urllib.request.Request(url, data=body, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if token:
+            request.add_header('Authorization', f'Token {token}')
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures throughput and latency percentiles of articles list, rate and login APIs '
+        'and duration of spam handling for backlogs of different sizes, on seeded data '
+        '(see seed_data command). Results are written as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'Comma separated of {SCENARIOS}')
+        parser.add_argument('--requests', type=int, default=200, help='Count of requests of each API scenario')
+        parser.add_argument('--concurrency', type=int, default=4, help='Count of concurrent clients')
+        parser.add_argument('--base-url', default=None, help='URL of a running server. Requests are served in process when not set')
+        parser.add_argument('--users', type=int, default=50, help='Count of seeded users sending requests')
+        parser.add_argument('--password', default='password', help='Password of seeded users')
+        parser.add_argument('--spam-backlog-sizes', default='100,1000,10000', help='Comma separated sizes of probable spam backlogs')
+        parser.add_argument('--output', default=None, help='Path of JSON results. Printed when not set')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',')
+        unknown_scenarios = set(scenarios) - set(SCENARIOS)
+        if unknown_scenarios:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown_scenarios))}')
+
+        self.rng = random.Random(options['seed'])
+        self.transport = HTTPTransport(options['base_url']) if options['base_url'] else InProcessTransport()
+        self.password = options['password']
+        self.users = list(User.objects.filter(username__startswith=SEED_USERNAME_PREFIX)[:options['users']])
+        self.article_ids = list(Article.objects.values_list('id', flat=True)[:10000])
+        if not self.users or not self.article_ids:
+            raise CommandError('No seeded data found. Run seed_data command first.')
+        self.tokens = [Token.objects.get_or_create(user=user)[0].key for user in self.users]
+        self.articles_pages_count = max(1, min(50, Article.objects.count() // settings.REST_FRAMEWORK['PAGE_SIZE']))
+
+        results = {
+            'commit': self.get_commit(),
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'options': {
+                key: options[key]
+                for key in ('scenarios', 'requests', 'concurrency', 'base_url', 'users', 'spam_backlog_sizes')
+            },
+            'apis': {},
+        }
+        for scenario in scenarios:
+            if scenario == 'spam':
+                results['spam_handler'] = [
+                    self.benchmark_spam_handler(int(size))
+                    for size in options['spam_backlog_sizes'].split(',')
+                ]
+                continue
+            send_request = getattr(self, f'send_{scenario}_request')
+            results['apis'][scenario] = run_load(send_request, options['requests'], options['concurrency'])
+            self.stderr.write(f'{scenario}: {results["apis"][scenario]["requests_per_s"]} requests/s')
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def get_commit(self) -> str | None:
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def send_list_request(self, i: int) -> bool:
+        status_code = self.transport.send(
+            'GET',
+            reverse('articles-list'),
+            {'page': self.rng.randint(1, self.articles_pages_count)},
+            token=self.rng.choice(self.tokens),
+        )
+        return status_code == 200
+
+    def send_rate_request(self, i: int) -> bool:
+        status_code = self.transport.send(
+            'POST',
+            reverse('create-rating'),
+            {'article': self.rng.choice(self.article_ids), 'score': self.rng.choice(RatingScores.values)},
+            token=self.rng.choice(self.tokens),
+        )
+        return status_code == 200
+
+    def send_login_request(self, i: int) -> bool:
+        status_code = self.transport.send(
+            'POST',
+            '/users/login',
+            {'username': self.rng.choice(self.users).username, 'password': self.password},
+        )
+        return status_code == 200
+
+    def create_probable_spam_ratings(self, backlog_size: int) -> int:
+        '''
+        Creates backlog_size probable spam ratings by new users with scores out of
+        the acceptable band of their articles where possible. Like the rating API,
+        they are counted in score counts but not in rating info of articles.
+        '''
+        articles = list(
+            Article.objects.filter(id__in=self.rng.sample(self.article_ids, min(backlog_size, len(self.article_ids))))
+            .only('id', *ACCEPTABLE_SCORE_BAND_FIELDS)
+        )
+        users = User.objects.bulk_create([
+            User(username=f'{BENCHMARK_USERNAME_PREFIX}{uuid.uuid4().hex}')
+            for _ in range(math.ceil(backlog_size / len(articles)))
+        ])
+        ratings = []
+        for i in range(backlog_size):
+            article = articles[i % len(articles)]
+            scores = [
+                score for score in RatingScores.values if not article.score_is_in_acceptable_band(score)
+            ] or RatingScores.values
+            ratings.append(Rating(
+                user=users[i // len(articles)],
+                article=article,
+                score=self.rng.choice(scores),
+                spam_status=RatingSpamStatus.PROBABLE_SPAM,
+            ))
+        Rating.objects.bulk_create(ratings, batch_size=1000)
+        Article.objects.bulk_update_rating_info_with_changes([
+            (rating.article_id, rating.spam_status, rating.score, None) for rating in ratings
+        ])
+        return len(ratings)
+
+    def benchmark_spam_handler(self, backlog_size: int) -> dict:
+        '''
+        Creates a backlog of backlog_size probable spam ratings and times handling
+        them. All changes are rolled back.
+        '''
+        with transaction.atomic():
+            backlog_size = self.create_probable_spam_ratings(backlog_size)
+            started_at = time.perf_counter()
+            spam_detector.handle_probable_spams()
+            duration = time.perf_counter() - started_at
+            transaction.set_rollback(True)
+
+        self.stderr.write(f'spam handler: {backlog_size} probable spams in {duration:.3f}s')
+        return {
+            'backlog_size': backlog_size,
+            'duration_s': round(duration, 3),
+            'ratings_per_s': round(backlog_size / duration, 2) if duration else 0.0,
+        }
@@ -0,0 +1,55 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from articles.ingestion import CopyIngestor, read_records
+from articles.models import Article
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads articles or ratings from a JSONL or CSV file with postgres COPY, in chunks. '
+        'Article fields are title, body, created_at and optionally id. Rating fields are '
+        'user_id, article_id, score, spam_status (not spam by default), created_at and updated_at. '
+        'Rating info of articles with loaded ratings is rebuilt afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=['articles', 'ratings'])
+        parser.add_argument('path', help='Path of the file, - for stdin')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], default=None, help='Inferred from file extension by default')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Count of records copied in each transaction')
+        parser.add_argument('--skip-rebuild', action='store_true', help='Do not rebuild rating info of articles after loading ratings')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        if path == '-' and options['format'] is None:
+            raise CommandError('--format is required when reading from stdin')
+
+        ingestor = CopyIngestor(chunk_size=options['chunk_size'])
+        started_at = time.perf_counter()
+        file = sys.stdin if path == '-' else open(path, newline='')
+        try:
+            records = read_records(file, file_format)
+            if options['model'] == 'articles':
+                try:
+                    loaded_count = ingestor.ingest_articles(records)
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f'Loaded {loaded_count} articles in {time.perf_counter() - started_at:.1f}s')
+                return
+
+            loaded_count, skipped_count, article_ids = ingestor.ingest_ratings(records)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        self.stdout.write(
+            f'Loaded {loaded_count} ratings and skipped {skipped_count} in {time.perf_counter() - started_at:.1f}s'
+        )
+
+        if not options['skip_rebuild'] and article_ids:
+            started_at = time.perf_counter()
+            rebuilt_count = Article.objects.rebuild_rating_info(sorted(article_ids))
+            self.stdout.write(f'Rebuilt rating info of {rebuilt_count} articles in {time.perf_counter() - started_at:.1f}s')
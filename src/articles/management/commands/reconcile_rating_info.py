@@ -0,0 +1,43 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles.reconciliation import RatingInfoReconciler
+from core.settings import config
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes count, average and square sum of articles from their not spam ratings '
+        'in chunks of article ids on several worker processes, and reports articles whose '
+        'stored rating info has drifted. Drifted articles are rebuilt with --fix.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Count of article ids in each chunk')
+        parser.add_argument('--workers', type=int, default=4, help='Count of worker processes')
+        parser.add_argument('--tolerance', type=float, default=1e-6, help='Allowed float error of average and square sum')
+        parser.add_argument('--fix', action='store_true', help='Rebuild rating info of drifted articles')
+
+    def handle(self, *args, **options):
+        if options['fix'] and config.RATING_WRITE_BEHIND_IS_ACTIVE:
+            self.stderr.write(
+                'Rating write behind is active: ratings waiting in the buffer are counted by '
+                'the fix and again when the buffer is flushed. Pause flushing while fixing.'
+            )
+
+        def report_drift(drift: dict):
+            if options['verbosity'] >= 2:
+                self.stdout.write(json.dumps(drift))
+
+        reconciler = RatingInfoReconciler(
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            tolerance=options['tolerance'],
+            fix=options['fix'],
+        )
+        started_at = time.perf_counter()
+        summary = reconciler.reconcile(on_drift=report_drift)
+        summary['duration_s'] = round(time.perf_counter() - started_at, 3)
+        self.stdout.write(json.dumps(summary))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from articles.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Recomputes acceptable score band of all articles. Run it after changing SPAM_RATE_ZSCORE_BOUND.'
+
+    def handle(self, *args, **options):
+        updated_count = Article.objects.refresh_acceptable_score_bands()
+        self.stdout.write(f'Refreshed acceptable score band of {updated_count} articles')
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles.constants import RatingScores
+from articles.seeding import SCORE_DISTRIBUTIONS, DataSeeder
+
+
+class Command(BaseCommand):
+    help = 'Seeds synthetic users, articles and ratings for load tests and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=1000, help='Count of articles')
+        parser.add_argument('--users', type=int, default=1000, help='Count of users')
+        parser.add_argument('--ratings', type=int, default=100000, help='Count of not spam ratings')
+        parser.add_argument('--distribution', choices=SCORE_DISTRIBUTIONS, default='normal')
+        parser.add_argument('--score-mean', type=float, default=3.0, help='Mean score around which article means are drawn')
+        parser.add_argument('--score-std', type=float, default=1.0, help='Standard deviation of scores of an article')
+        parser.add_argument('--spam-bursts', type=int, default=0, help='Count of spam bursts')
+        parser.add_argument('--spam-burst-size', type=int, default=50, help='Count of ratings of each spam burst')
+        parser.add_argument('--spam-score', type=int, choices=RatingScores.values, default=RatingScores.ZERO)
+        parser.add_argument('--password', default='password', help='Password of seeded users')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data')
+
+    def handle(self, *args, **options):
+        seeder = DataSeeder(
+            distribution=options['distribution'],
+            score_mean=options['score_mean'],
+            score_std=options['score_std'],
+            password=options['password'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+        )
+        started_at = time.perf_counter()
+        with transaction.atomic():
+            counts = seeder.seed(
+                articles_count=options['articles'],
+                users_count=options['users'],
+                ratings_count=options['ratings'],
+                spam_burst_count=options['spam_bursts'],
+                spam_burst_size=options['spam_burst_size'],
+                spam_score=options['spam_score'],
+            )
+        self.stdout.write(
+            'Seeded {users} users, {articles} articles, {ratings} ratings and {spam_burst_ratings} '
+            'spam burst ratings'.format(**counts) + f' in {time.perf_counter() - started_at:.1f}s'
+        )
@@ -1,59 +1,643 @@
+import datetime
 import logging
-from typing import List
+from typing import List, Tuple
 
-from django.db import models
-from articles.constants import RatingSpamStatus
+from django.db import OperationalError, connections, models, router, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from articles.caches import articles_list_cache
+from articles.constants import RatingScores, RatingSpamStatus
+from core.settings import config
+from core.utils import calculate_normal_dist_info, calculate_normal_dist_info_with_histogram
 
 logger = logging.getLogger(__name__)
 
 
+RATING_INFO_FIELDS = ['rating_count', 'rating_average', 'rating_square_sum']
+SCORE_COUNT_FIELDS = [f'score_count_{score}' for score in RatingScores.values]
+ACCEPTABLE_SCORE_BAND_FIELDS = ['acceptable_score_low', 'acceptable_score_high']
+
+
 class ArticleManager(models.Manager):
 
-    def bulk_update_rating_info(self, articles_rating_info: dict):
-        article_ids = articles_rating_info.keys()
-        articles = self.filter(id__in=article_ids)
-        for article in articles:
-            rating_scores = articles_rating_info.get(article.id, [])
-            article.update_rating_info_with_new_scores(
-                rating_scores
+    def get_estimated_count(self) -> int | None:
+        '''
+        Returns postgres planner estimate of the table row count.
+        None is returned when the table has not been analyzed yet.
+        '''
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [self.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
+
+    def bulk_update_rating_info(self, articles_rating_info: dict) -> int:
+        '''
+        Adds new not spam scores (dict mapping article id to list of scores) to
+        rating info and acceptable score band of articles in one set based
+        statement. Count, mean and square sum of the new scores of each article
+        are computed here and merged into stored rating info by the database
+        with the parallel variance formula. Articles are locked in id order.
+        '''
+        new_rating_infos = sorted(
+            (article_id, *calculate_normal_dist_info(scores))
+            for article_id, scores in articles_rating_info.items() if scores
+        )
+        if not new_rating_infos:
+            return 0
+
+        db = router.db_for_write(self.model)
+        article_ids, means, square_sums, counts = zip(*new_rating_infos)
+        acceptable_score_low, acceptable_score_high = get_acceptable_score_band_sql(
+            MERGE_RATING_INFO_NEW_COUNT_SQL,
+            MERGE_RATING_INFO_NEW_MEAN_SQL,
+            MERGE_RATING_INFO_NEW_SQUARE_SUM_SQL,
+            config.SPAM_RATE_ZSCORE_BOUND,
+        )
+        sql = MERGE_RATING_INFO_SQL.format(
+            article_table=self.model._meta.db_table,
+            new_count=MERGE_RATING_INFO_NEW_COUNT_SQL,
+            new_mean=MERGE_RATING_INFO_NEW_MEAN_SQL,
+            new_square_sum=MERGE_RATING_INFO_NEW_SQUARE_SUM_SQL,
+            acceptable_score_low=acceptable_score_low,
+            acceptable_score_high=acceptable_score_high,
+        )
+        with connections[db].cursor() as cursor:
+            cursor.execute(sql, {
+                'article_ids': list(article_ids),
+                'counts': list(counts),
+                'means': list(means),
+                'square_sums': list(square_sums),
+            })
+            updated_count = cursor.rowcount
+        transaction.on_commit(articles_list_cache.invalidate, using=db)
+        return updated_count
+
+    @staticmethod
+    def group_rating_changes_by_article(rating_changes: List[Tuple[int, int, int, int | None]]) -> dict:
+        '''
+        rating_changes is a list of (article_id, spam_status, score, old_score)
+        tuples where old_score is None for new ratings.
+        return dict mapping article id to (new_scores, updated_scores, score_count_changes)
+        '''
+        articles_rating_changes = {}
+        for article_id, spam_status, score, old_score in rating_changes:
+            new_scores, updated_scores, score_count_changes = articles_rating_changes.setdefault(
+                article_id, ([], [], [0] * len(SCORE_COUNT_FIELDS))
             )
+            score_count_changes[score] += 1
+            if old_score is not None:
+                score_count_changes[old_score] -= 1
+            if spam_status != RatingSpamStatus.NOT_SPAM:
+                continue
+            if old_score is None:
+                new_scores.append(score)
+            else:
+                updated_scores.append((score, old_score))
+
+        return articles_rating_changes
+
+    def bulk_update_rating_info_with_changes(self, rating_changes: List[Tuple[int, int, int, int | None]]):
+        '''
+        Applies rating changes (see group_rating_changes_by_article) to rating info
+        and score counts of articles. Articles are locked in id order and saved
+        with a single bulk update.
+        '''
+        articles_rating_changes = self.group_rating_changes_by_article(rating_changes)
+        fields = RATING_INFO_FIELDS + ACCEPTABLE_SCORE_BAND_FIELDS + SCORE_COUNT_FIELDS
+        with transaction.atomic():
+            articles = list(
+                self.select_for_update().filter(
+                    id__in=articles_rating_changes.keys()
+                ).order_by('id').only('id', *fields)
+            )
+            for article in articles:
+                article.apply_rating_changes(*articles_rating_changes[article.id])
+            self.bulk_update(articles, fields)
+            self.model._meta.apps.get_model('articles', 'RatingRollup').objects.add_scores({
+                article_id: new_scores
+                for article_id, (new_scores, _, _) in articles_rating_changes.items()
+                if new_scores
+            })
+            transaction.on_commit(articles_list_cache.invalidate, using=self.db)
+
+        return articles
+
+    def refresh_acceptable_score_bands(self, article_ids: List[int] | None = None) -> int:
+        '''
+        Recomputes acceptable score band of articles from their stored rating info
+        in one statement. All articles are refreshed when article_ids is None,
+        e.g. after SPAM_RATE_ZSCORE_BOUND is changed.
+        '''
+        articles = self.all() if article_ids is None else self.filter(id__in=article_ids)
+        acceptable_score_low, acceptable_score_high = get_acceptable_score_band_sql(
+            'rating_count', 'rating_average', 'rating_square_sum', config.SPAM_RATE_ZSCORE_BOUND
+        )
+        return articles.update(
+            acceptable_score_low=RawSQL(acceptable_score_low, []),
+            acceptable_score_high=RawSQL(acceptable_score_high, []),
+        )
+
+    def rebuild_rating_info(self, article_ids: List[int] | None = None) -> int:
+        '''
+        Recomputes rating info, score counts and acceptable score band of articles
+        from their ratings in one set based statement, e.g. after ratings are
+        loaded in bulk. Archived ratings are still counted in score counts.
+        All articles are rebuilt when article_ids is None.
+        '''
+        db = router.db_for_write(self.model)
+        rating_model = self.model._meta.get_field('rating').related_model
+        archived_rating_model = self.model._meta.apps.get_model('articles', 'ArchivedRating')
+        acceptable_score_low, acceptable_score_high = get_acceptable_score_band_sql(
+            'stats.rating_count', 'stats.rating_average', 'stats.rating_square_sum', config.SPAM_RATE_ZSCORE_BOUND
+        )
+        sql = REBUILD_RATING_INFO_SQL.format(
+            article_table=self.model._meta.db_table,
+            rating_table=rating_model._meta.db_table,
+            archived_rating_table=archived_rating_model._meta.db_table,
+            acceptable_score_low=acceptable_score_low,
+            acceptable_score_high=acceptable_score_high,
+            score_counts_select=',\n        '.join(
+                REBUILD_RATING_INFO_SCORE_COUNT_SQL.format(score=score) for score in RatingScores.values
+            ),
+            score_counts=', '.join(
+                f'score_count_{score} = stats.score_count_{score} + COALESCE(archived.score_count_{score}, 0)'
+                for score in RatingScores.values
+            ),
+            article_filter='TRUE' if article_ids is None else 'a.id = ANY(%(article_ids)s)',
+            archived_article_filter='TRUE' if article_ids is None else 'r.article_id = ANY(%(article_ids)s)',
+        )
+        with connections[db].cursor() as cursor:
+            cursor.execute(sql, {
+                'not_spam': RatingSpamStatus.NOT_SPAM,
+                'article_ids': list(article_ids or []),
+            })
+            updated_count = cursor.rowcount
+        transaction.on_commit(articles_list_cache.invalidate, using=db)
+        return updated_count
+
+    def iter_rating_info_drifts(self, min_id: int, max_id: int, tolerance: float, page_size: int = 1000):
+        '''
+        Yields articles with min_id <= id < max_id whose stored rating info differs
+        from the one computed from their not spam ratings, as dicts of stored and
+        actual count, average and square sum. Averages differing by at most
+        tolerance and square sums by at most tolerance relatively are not drifts.
+        Rows are streamed with a server side cursor, or read in pages of page_size
+        drifts by id when server side cursors are disabled (e.g. behind pgbouncer
+        in transaction mode). Articles are not locked.
+        '''
+        for article_id, *values in self.iter_rating_info_drift_rows(min_id, max_id, tolerance, page_size):
+            yield {
+                'id': article_id,
+                'stored': dict(zip(RATING_INFO_FIELDS, values[:3])),
+                'actual': dict(zip(RATING_INFO_FIELDS, values[3:])),
+            }
+
+    def iter_rating_info_drift_rows(self, min_id: int, max_id: int, tolerance: float, page_size: int):
+        connection = connections[self.db]
+        rating_model = self.model._meta.get_field('rating').related_model
+        server_side_cursors_are_disabled = connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')
+        sql = RATING_INFO_DRIFT_SQL.format(
+            article_table=self.model._meta.db_table,
+            rating_table=rating_model._meta.db_table,
+            limit='LIMIT %(page_size)s' if server_side_cursors_are_disabled else '',
+        )
+        params = {
+            'not_spam': RatingSpamStatus.NOT_SPAM,
+            'min_id': min_id,
+            'max_id': max_id,
+            'tolerance': tolerance,
+            'page_size': page_size,
+        }
+        if not server_side_cursors_are_disabled:
+            with connection.chunked_cursor() as cursor:
+                cursor.execute(sql, params)
+                while rows := cursor.fetchmany(page_size):
+                    yield from rows
+            return
+
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            yield from rows
+            if len(rows) < page_size:
+                return
+            params['min_id'] = rows[-1][0] + 1
 
     def get_ratings_score_count_for_article_ids(self, article_ids: List[int]) -> dict:
-        articles_score_counts = self.filter(id__in=article_ids).annotate(
-            count_0=models.Count('rating__id', filter=models.Q(rating__score=0)),
-            count_1=models.Count('rating__id', filter=models.Q(rating__score=1)),
-            count_2=models.Count('rating__id', filter=models.Q(rating__score=2)),
-            count_3=models.Count('rating__id', filter=models.Q(rating__score=3)),
-            count_4=models.Count('rating__id', filter=models.Q(rating__score=4)),
-            count_5=models.Count('rating__id', filter=models.Q(rating__score=5)),
-        ).values('id', 'count_0', 'count_1', 'count_2', 'count_3', 'count_4', 'count_5')
+        articles_score_counts = self.filter(id__in=article_ids).values(
+            'id',
+            **{f'count_{score}': models.F(f'score_count_{score}') for score in RatingScores.values}
+        )
         return {
             d.pop('id'): d for d in articles_score_counts
         }
 
 
+REBUILD_RATING_INFO_SQL = '''
+UPDATE {article_table} AS article SET
+    rating_count = stats.rating_count,
+    rating_average = stats.rating_average,
+    rating_square_sum = stats.rating_square_sum,
+    acceptable_score_low = {acceptable_score_low},
+    acceptable_score_high = {acceptable_score_high},
+    {score_counts}
+FROM (
+    SELECT a.id,
+        COUNT(r.id) FILTER (WHERE r.spam_status = %(not_spam)s) AS rating_count,
+        COALESCE(AVG(r.score::double precision) FILTER (WHERE r.spam_status = %(not_spam)s), 0) AS rating_average,
+        COALESCE(VAR_POP(r.score::double precision) FILTER (WHERE r.spam_status = %(not_spam)s), 0)
+            * COUNT(r.id) FILTER (WHERE r.spam_status = %(not_spam)s) AS rating_square_sum,
+        {score_counts_select}
+    FROM {article_table} AS a LEFT JOIN {rating_table} AS r ON r.article_id = a.id
+    WHERE {article_filter}
+    GROUP BY a.id
+) AS stats LEFT JOIN (
+    SELECT r.article_id,
+        {score_counts_select}
+    FROM {archived_rating_table} AS r
+    WHERE {archived_article_filter}
+    GROUP BY r.article_id
+) AS archived ON archived.article_id = stats.id
+WHERE article.id = stats.id
+'''
+
+RATING_INFO_DRIFT_SQL = '''
+SELECT article.id,
+    article.rating_count, article.rating_average, article.rating_square_sum,
+    stats.rating_count, stats.rating_average, stats.rating_square_sum
+FROM {article_table} AS article JOIN (
+    SELECT a.id,
+        COUNT(r.id) AS rating_count,
+        COALESCE(AVG(r.score::double precision), 0) AS rating_average,
+        COALESCE(VAR_POP(r.score::double precision), 0) * COUNT(r.id) AS rating_square_sum
+    FROM {article_table} AS a
+        LEFT JOIN {rating_table} AS r ON r.article_id = a.id AND r.spam_status = %(not_spam)s
+    WHERE a.id >= %(min_id)s AND a.id < %(max_id)s
+    GROUP BY a.id
+) AS stats ON stats.id = article.id
+WHERE article.rating_count <> stats.rating_count
+    OR ABS(article.rating_average - stats.rating_average) > %(tolerance)s
+    OR ABS(article.rating_square_sum - stats.rating_square_sum) > %(tolerance)s * GREATEST(1, stats.rating_square_sum)
+ORDER BY article.id
+{limit}
+'''
+
+MERGE_RATING_INFO_SQL = '''
+WITH locked_article AS (
+    SELECT id FROM {article_table} WHERE id = ANY(%(article_ids)s) ORDER BY id FOR UPDATE
+)
+UPDATE {article_table} AS article SET
+    rating_count = {new_count},
+    rating_average = {new_mean},
+    rating_square_sum = {new_square_sum},
+    acceptable_score_low = {acceptable_score_low},
+    acceptable_score_high = {acceptable_score_high}
+FROM locked_article JOIN unnest(
+    %(article_ids)s::bigint[], %(counts)s::integer[], %(means)s::double precision[], %(square_sums)s::double precision[]
+) AS new_rating(article_id, count, mean, square_sum) ON new_rating.article_id = locked_article.id
+WHERE article.id = locked_article.id
+'''
+
+# Same formulas as calculate_merged_normal_dist_info
+MERGE_RATING_INFO_NEW_COUNT_SQL = '(article.rating_count + new_rating.count)'
+
+MERGE_RATING_INFO_NEW_MEAN_SQL = '''(article.rating_average
+            + (new_rating.mean - article.rating_average) * new_rating.count / (article.rating_count + new_rating.count))'''
+
+MERGE_RATING_INFO_NEW_SQUARE_SUM_SQL = '''(article.rating_square_sum + new_rating.square_sum
+            + (new_rating.mean - article.rating_average) * (new_rating.mean - article.rating_average)
+                * article.rating_count * new_rating.count / (article.rating_count + new_rating.count))'''
+
+REBUILD_RATING_INFO_SCORE_COUNT_SQL = 'COUNT(r.id) FILTER (WHERE r.score = {score}) AS score_count_{score}'
+
+ARCHIVE_SPAM_RATINGS_SQL = '''
+WITH archived AS (
+    DELETE FROM {rating_table}
+    WHERE id IN (
+        SELECT id FROM {rating_table}
+        WHERE spam_status = %(spam)s AND updated_at < %(updated_before)s
+        ORDER BY updated_at
+        LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING {columns}
+)
+INSERT INTO {archived_rating_table} ({columns}, archived_at)
+SELECT {columns}, %(now)s FROM archived
+'''
+
+UPSERT_USER_RATING_SQL = '''
+WITH old_rating AS (
+    SELECT score FROM {rating_table} WHERE article_id = %(article_id)s AND user_id = %(user_id)s
+), upserted_rating AS (
+    INSERT INTO {rating_table} AS rating (user_id, article_id, score, spam_status, created_at, updated_at)
+    VALUES (%(user_id)s, %(article_id)s, %(score)s, %(spam_status)s, %(now)s, %(now)s)
+    ON CONFLICT (article_id, user_id) DO UPDATE
+        SET score = EXCLUDED.score, updated_at = EXCLUDED.updated_at
+        -- old_rating is read from the statement snapshot, the conflicting row is the latest
+        -- version. When a concurrent request inserted or updated the rating, nothing is
+        -- changed or returned and the statement is retried.
+        WHERE rating.score = (SELECT score FROM old_rating)
+    RETURNING rating.id, rating.spam_status, rating.created_at, rating.updated_at
+), updated_article AS (
+    UPDATE {article_table} AS article SET
+        rating_count = CASE WHEN {is_not_spam} THEN {new_count} ELSE article.rating_count END,
+        rating_average = CASE WHEN {is_not_spam} THEN {new_mean} ELSE article.rating_average END,
+        rating_square_sum = CASE WHEN {is_not_spam} THEN {new_square_sum} ELSE article.rating_square_sum END,
+        acceptable_score_low = CASE WHEN {is_not_spam}
+            THEN {new_acceptable_score_low} ELSE article.acceptable_score_low END,
+        acceptable_score_high = CASE WHEN {is_not_spam}
+            THEN {new_acceptable_score_high} ELSE article.acceptable_score_high END,
+        {score_counts}
+    FROM upserted_rating LEFT JOIN old_rating ON TRUE
+    WHERE article.id = %(article_id)s AND %(update_article)s
+)
+SELECT upserted_rating.id, upserted_rating.spam_status, upserted_rating.created_at,
+    upserted_rating.updated_at, old_rating.score AS old_score
+FROM upserted_rating LEFT JOIN old_rating ON TRUE
+'''
+
+# Each attempt reads a newer snapshot (read committed), so a retry only fails
+# when the rating is changed concurrently again.
+UPSERT_USER_RATING_ATTEMPTS = 5
+
+UPSERT_USER_RATING_IS_NOT_SPAM_SQL = 'upserted_rating.spam_status = %(not_spam)s'
+
+# Same formulas as calculate_new_normal_dist_info_with_new_data_points for a
+# new score and calculate_new_normal_dist_info_with_data_update for an updated one.
+UPSERT_USER_RATING_NEW_COUNT_SQL = '(article.rating_count + (CASE WHEN old_rating.score IS NULL THEN 1 ELSE 0 END))'
+
+UPSERT_USER_RATING_NEW_MEAN_SQL = '''(CASE WHEN old_rating.score IS NULL
+            THEN article.rating_average + (%(score)s - article.rating_average) / (article.rating_count + 1)
+            ELSE ((article.rating_average * article.rating_count) + (%(score)s - old_rating.score)) / article.rating_count
+        END)'''
+
+UPSERT_USER_RATING_NEW_SQUARE_SUM_SQL = '''(article.rating_square_sum
+            + (%(score)s - article.rating_average) * (%(score)s - {new_mean})
+            - (CASE WHEN old_rating.score IS NULL THEN 0
+                ELSE (old_rating.score - article.rating_average) * (old_rating.score - {new_mean}) END))'''
+
+UPSERT_USER_RATING_SCORE_COUNT_SQL = '''score_count_{score} = article.score_count_{score}
+            + (CASE WHEN %(score)s = {score} THEN 1 ELSE 0 END)
+            - (CASE WHEN old_rating.score = {score} THEN 1 ELSE 0 END)'''
+
+# Same bounds as Article.update_acceptable_score_band
+ACCEPTABLE_SCORE_LOW_SQL = '''(CASE WHEN {count} > 0 AND {square_sum} > 0
+            THEN GREATEST({min_score}, CEIL({mean} - {zscore_bound} * SQRT({square_sum} / {count})))
+            ELSE {min_score} END)'''
+
+ACCEPTABLE_SCORE_HIGH_SQL = '''(CASE WHEN {count} > 0 AND {square_sum} > 0
+            THEN LEAST({max_score}, FLOOR({mean} + {zscore_bound} * SQRT({square_sum} / {count})))
+            ELSE {max_score} END)'''
+
+
+def get_acceptable_score_band_sql(count: str, mean: str, square_sum: str, zscore_bound: float) -> Tuple[str, str]:
+    '''
+    Returns sql expressions of acceptable score band low and high
+    for given sql expressions of rating count, average and square sum.
+    '''
+    band_info = {
+        'count': count,
+        'mean': mean,
+        'square_sum': square_sum,
+        'zscore_bound': float(zscore_bound),
+        'min_score': min(RatingScores.values),
+        'max_score': max(RatingScores.values),
+    }
+    return (
+        ACCEPTABLE_SCORE_LOW_SQL.format(**band_info),
+        ACCEPTABLE_SCORE_HIGH_SQL.format(**band_info),
+    )
+
+
 class RatingManager(models.Manager):
 
+    def get_upsert_user_rating_sql(self, article) -> str:
+        new_square_sum = UPSERT_USER_RATING_NEW_SQUARE_SUM_SQL.format(new_mean=UPSERT_USER_RATING_NEW_MEAN_SQL)
+        new_acceptable_score_low, new_acceptable_score_high = get_acceptable_score_band_sql(
+            UPSERT_USER_RATING_NEW_COUNT_SQL,
+            UPSERT_USER_RATING_NEW_MEAN_SQL,
+            new_square_sum,
+            config.SPAM_RATE_ZSCORE_BOUND,
+        )
+        return UPSERT_USER_RATING_SQL.format(
+            rating_table=self.model._meta.db_table,
+            article_table=article._meta.db_table,
+            is_not_spam=UPSERT_USER_RATING_IS_NOT_SPAM_SQL,
+            new_count=UPSERT_USER_RATING_NEW_COUNT_SQL,
+            new_mean=UPSERT_USER_RATING_NEW_MEAN_SQL,
+            new_square_sum=new_square_sum,
+            new_acceptable_score_low=new_acceptable_score_low,
+            new_acceptable_score_high=new_acceptable_score_high,
+            score_counts=',\n        '.join(
+                UPSERT_USER_RATING_SCORE_COUNT_SQL.format(score=score) for score in RatingScores.values
+            ),
+        )
+
+    @staticmethod
+    def get_upsert_user_rating_params(user, article, score: int, spam_status: int, update_article: bool) -> dict:
+        return {
+            'user_id': user.id,
+            'article_id': article.id,
+            'score': score,
+            'spam_status': spam_status,
+            'now': timezone.now(),
+            'not_spam': RatingSpamStatus.NOT_SPAM,
+            'update_article': update_article,
+        }
+
+    def make_upserted_rating(self, db, user, article, score: int, spam_status: int, created_at, updated_at, rating_id):
+        return self.model.from_db(
+            db,
+            ['id', 'user_id', 'article_id', 'score', 'created_at', 'updated_at', 'spam_status'],
+            [rating_id, user.id, article.id, score, created_at, updated_at, spam_status],
+        )
+
+    def upsert_user_rating(
+        self,
+        user,
+        article,
+        score: int,
+        spam_status: int,
+        update_article: bool = True,
+    ):
+        '''
+        Inserts the user rating on article or updates its score, and applies the
+        change to article rating info, acceptable score band and score counts,
+        in a single statement, retried when the rating is changed concurrently.
+        spam_status is only used for new ratings. Updated ratings keep their status
+        and article rating info is only changed for not spam ratings.
+        When update_article is False the article is left untouched.
+        return rating, old_score (None when the rating is new)
+        '''
+        db = router.db_for_write(self.model)
+        sql = self.get_upsert_user_rating_sql(article)
+        with connections[db].cursor() as cursor:
+            for _ in range(UPSERT_USER_RATING_ATTEMPTS):
+                cursor.execute(
+                    sql, self.get_upsert_user_rating_params(user, article, score, spam_status, update_article)
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    break
+            else:
+                raise OperationalError('Rating was changed concurrently on every upsert attempt')
+            rating_id, spam_status, created_at, updated_at, old_score = row
+        if update_article and spam_status == RatingSpamStatus.NOT_SPAM:
+            if old_score is None:
+                self.model._meta.apps.get_model('articles', 'RatingRollup').objects.add_scores(
+                    {article.id: [score]}, created_at
+                )
+            transaction.on_commit(articles_list_cache.invalidate, using=db)
+
+        rating = self.make_upserted_rating(db, user, article, score, spam_status, created_at, updated_at, rating_id)
+        return rating, old_score
+
+    async def aupsert_user_rating(
+        self,
+        user,
+        article,
+        score: int,
+        spam_status: int,
+        update_article: bool = True,
+    ):
+        '''
+        Same as upsert_user_rating for async views, run with the async ORM. The
+        async ORM runs in autocommit, so the rating is committed when this returns,
+        and the rollup and articles list cache are updated after it.
+        return rating, old_score (None when the rating is new)
+        '''
+        db = router.db_for_write(self.model)
+        sql = self.get_upsert_user_rating_sql(article)
+        for _ in range(UPSERT_USER_RATING_ATTEMPTS):
+            rows = [
+                row async for row in self.raw(
+                    sql,
+                    self.get_upsert_user_rating_params(user, article, score, spam_status, update_article),
+                    using=db,
+                )
+            ]
+            if rows:
+                break
+        else:
+            raise OperationalError('Rating was changed concurrently on every upsert attempt')
+        row = rows[0]
+        rating = self.make_upserted_rating(
+            db, user, article, score, row.spam_status, row.created_at, row.updated_at, row.id
+        )
+        if update_article and rating.spam_status == RatingSpamStatus.NOT_SPAM:
+            if row.old_score is None:
+                await self.model._meta.apps.get_model('articles', 'RatingRollup').objects.aadd_scores(
+                    {article.id: [score]}, rating.created_at
+                )
+            await articles_list_cache.ainvalidate()
+
+        return rating, row.old_score
+
     def get_user_rating_on_article_or_none(self, user, article) -> bool:
         return self.filter(user=user, article=article).last()
 
+    def get_user_ratings_for_article_ids(self, user, article_ids, for_update: bool = False) -> dict:
+        '''
+        With for_update, ratings are locked in article id order.
+        '''
+        ratings = self.filter(user=user, article_id__in=article_ids)
+        if for_update:
+            ratings = ratings.select_for_update().order_by('article_id')
+        return {
+            rating.article_id: rating
+            for rating in ratings
+        }
+
+    def get_ratings_out_of_acceptable_score_band(self):
+        '''
+        Ratings whose score is out of the current acceptable score band of their
+        article. The queryset can be re-screened in one UPDATE statement.
+        '''
+        return self.filter(
+            models.Q(score__lt=models.F('article__acceptable_score_low')) |
+            models.Q(score__gt=models.F('article__acceptable_score_high'))
+        )
+
     def get_probable_spam_ratings(self):
         return self.filter(spam_status=RatingSpamStatus.PROBABLE_SPAM).prefetch_related('article')
 
-    def annotate_articles_with_user_rating(self, articles, user):
-        article_ids = [a.id for a in articles]
+    def claim_probable_spam_ratings(self, chunk_size: int, after=None):
+        '''
+        Oldest probable spams ordered after the rating after (when given), up to
+        chunk_size, locked until the end of the transaction. Ratings locked by
+        other transactions are skipped.
+        '''
+        ratings = self.filter(spam_status=RatingSpamStatus.PROBABLE_SPAM)
+        if after is not None:
+            ratings = ratings.filter(
+                models.Q(created_at__gt=after.created_at) | models.Q(created_at=after.created_at, id__gt=after.id)
+            )
+        return ratings.order_by('created_at', 'id').select_for_update(
+            skip_locked=True, of=('self',)
+        ).prefetch_related('article')[:chunk_size]
+
+    def get_probable_spam_backlog_count(self) -> int:
+        return self.filter(spam_status=RatingSpamStatus.PROBABLE_SPAM).count()
+
+    def get_probable_spam_oldest_age(self) -> float:
+        '''
+        Age in seconds of the oldest probable spam rating, 0 when there is none.
+        '''
+        oldest_created_at = self.filter(
+            spam_status=RatingSpamStatus.PROBABLE_SPAM
+        ).aggregate(oldest=models.Min('created_at'))['oldest']
+        if oldest_created_at is None:
+            return 0.0
+        return (timezone.now() - oldest_created_at).total_seconds()
+
+    def get_user_rating_scores_for_article_ids(self, user, article_ids: List[int]) -> dict:
         user_ratings = self.filter(
             user=user,
             article_id__in=article_ids
         ).values('article_id', 'score')
-        user_ratings_dict = {
+        return {
             user_rating['article_id']: user_rating['score'] for user_rating in user_ratings
         }
+
+    async def aget_user_rating_scores_for_article_ids(self, user, article_ids: List[int]) -> dict:
+        user_ratings = self.filter(
+            user=user,
+            article_id__in=article_ids
+        ).values('article_id', 'score')
+        return {
+            user_rating['article_id']: user_rating['score'] async for user_rating in user_ratings
+        }
+
+    def annotate_articles_with_user_rating(self, articles, user):
+        user_ratings_dict = self.get_user_rating_scores_for_article_ids(user, [a.id for a in articles])
         for a in articles:
             a.__setattr__('user_rating', user_ratings_dict.get(a.id, None))
 
         return articles
 
+    def annotate_serialized_articles_with_user_rating(self, articles: List[dict], user) -> List[dict]:
+        '''
+        Returns copies of serialized articles with user_rating set, leaving
+        the given (possibly cached and shared) dicts untouched.
+        '''
+        user_ratings_dict = self.get_user_rating_scores_for_article_ids(user, [a['id'] for a in articles])
+        return [
+            {**a, 'user_rating': user_ratings_dict.get(a['id'], None)} for a in articles
+        ]
+
+    async def aannotate_serialized_articles_with_user_rating(self, articles: List[dict], user) -> List[dict]:
+        user_ratings_dict = await self.aget_user_rating_scores_for_article_ids(user, [a['id'] for a in articles])
+        return [
+            {**a, 'user_rating': user_ratings_dict.get(a['id'], None)} for a in articles
+        ]
+
     def get_rating_info_by_articles_for_rating_ids(self, rating_ids: List[int]) -> dict:
         articles_rating_info = self.filter(id__in=rating_ids).values('article_id', 'score')
         articles_rating_info_dict = {}
@@ -65,6 +649,39 @@ class RatingManager(models.Manager):
 
         return  articles_rating_info_dict
 
+    def archive_spam_ratings(self, updated_before, batch_size: int) -> int:
+        '''
+        Moves spam ratings not updated since updated_before to ArchivedRating
+        in batches and returns the moved count.
+        '''
+        archived_count = 0
+        while batch_count := self.archive_spam_ratings_batch(updated_before, batch_size):
+            archived_count += batch_count
+        return archived_count
+
+    def archive_spam_ratings_batch(self, updated_before, batch_size: int) -> int:
+        '''
+        Moves up to batch_size spam ratings not updated since updated_before to
+        ArchivedRating in one short transaction and returns the moved count.
+        Rows locked by other transactions are skipped until the next batch.
+        Article rating info and score counts are not changed.
+        '''
+        archived_rating_model = self.model._meta.apps.get_model('articles', 'ArchivedRating')
+        sql = ARCHIVE_SPAM_RATINGS_SQL.format(
+            rating_table=self.model._meta.db_table,
+            archived_rating_table=archived_rating_model._meta.db_table,
+            columns='id, user_id, article_id, score, spam_status, created_at, updated_at',
+        )
+        db = router.db_for_write(self.model)
+        with transaction.atomic(using=db), connections[db].cursor() as cursor:
+            cursor.execute(sql, {
+                'spam': RatingSpamStatus.SPAM,
+                'updated_before': updated_before,
+                'batch_size': batch_size,
+                'now': timezone.now(),
+            })
+            return cursor.rowcount
+
     def update_spam_status_of_ratings(self, ids, spam_status):
         updated = self.filter(id__in=ids).update(spam_status=spam_status)
         if len(ids) != updated:
@@ -76,3 +693,136 @@ class RatingManager(models.Manager):
                     'spam_status': spam_status,
                 }
             )
+
+
+ADD_RATING_ROLLUP_SQL = '''
+INSERT INTO {rollup_table} AS rollup (article_id, bucket_start, {score_count_columns})
+{rows}
+ON CONFLICT (article_id, bucket_start) DO UPDATE SET
+    {score_count_updates}
+'''
+
+ADD_RATING_ROLLUP_RATINGS_SQL = '''SELECT article_id,
+    TO_TIMESTAMP(FLOOR(EXTRACT(EPOCH FROM created_at) / %s) * %s) AS bucket_start,
+    {score_counts_select}
+FROM {rating_table} AS r
+WHERE id = ANY(%s)
+GROUP BY 1, 2
+ORDER BY 1, 2'''
+
+
+class RatingRollupManager(models.Manager):
+    '''
+    Rollups are only written when RATING_ROLLUP_IS_ACTIVE is set. Rows are
+    written in article id order, the same order articles are locked in.
+    A rating is counted once, with the score it had when it was added, in the
+    bucket of when it was created; later score updates are not rolled up.
+    '''
+
+    @staticmethod
+    def get_bucket_start(moment):
+        bucket_size = config.RATING_ROLLUP_BUCKET_SIZE
+        return datetime.datetime.fromtimestamp(
+            moment.timestamp() // bucket_size * bucket_size, tz=datetime.timezone.utc
+        )
+
+    def get_add_sql(self, rows: str) -> str:
+        return ADD_RATING_ROLLUP_SQL.format(
+            rollup_table=self.model._meta.db_table,
+            score_count_columns=', '.join(SCORE_COUNT_FIELDS),
+            rows=rows,
+            score_count_updates=',\n    '.join(
+                f'{field} = rollup.{field} + EXCLUDED.{field}' for field in SCORE_COUNT_FIELDS
+            ),
+        )
+
+    def get_add_scores_sql(self, articles_scores: dict, moment=None) -> Tuple[str, list]:
+        bucket_start = self.get_bucket_start(moment or timezone.now())
+        params = []
+        for article_id in sorted(articles_scores):
+            score_counts = [0] * len(SCORE_COUNT_FIELDS)
+            for score in articles_scores[article_id]:
+                score_counts[score] += 1
+            params.extend([article_id, bucket_start, *score_counts])
+        row_sql = f'({", ".join(["%s"] * (2 + len(SCORE_COUNT_FIELDS)))})'
+        return self.get_add_sql('VALUES ' + ', '.join([row_sql] * len(articles_scores))), params
+
+    def add_scores(self, articles_scores: dict, moment=None) -> None:
+        '''
+        Adds not spam scores (dict mapping article id to scores) to buckets of moment (now by default).
+        '''
+        if not config.RATING_ROLLUP_IS_ACTIVE or not articles_scores:
+            return
+        sql, params = self.get_add_scores_sql(articles_scores, moment)
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(sql, params)
+
+    async def aadd_scores(self, articles_scores: dict, moment=None) -> None:
+        '''
+        Same as add_scores for async views, run with the async ORM.
+        '''
+        if not config.RATING_ROLLUP_IS_ACTIVE or not articles_scores:
+            return
+        sql, params = self.get_add_scores_sql(articles_scores, moment)
+        # raw querysets need rows to iterate
+        async for _ in self.raw(sql + 'RETURNING id', params, using=router.db_for_write(self.model)):
+            pass
+
+    def add_ratings(self, rating_ids: List[int]) -> None:
+        '''
+        Adds ratings to buckets of when they were created, in one statement.
+        '''
+        if not config.RATING_ROLLUP_IS_ACTIVE or not rating_ids:
+            return
+        rating_model = self.model._meta.apps.get_model('articles', 'Rating')
+        sql = self.get_add_sql(ADD_RATING_ROLLUP_RATINGS_SQL.format(
+            rating_table=rating_model._meta.db_table,
+            score_counts_select=',\n    '.join(
+                REBUILD_RATING_INFO_SCORE_COUNT_SQL.format(score=score) for score in RatingScores.values
+            ),
+        ))
+        bucket_size = config.RATING_ROLLUP_BUCKET_SIZE
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(sql, [bucket_size, bucket_size, list(rating_ids)])
+
+    def get_window_score_counts(self, article_ids: List[int], since) -> dict:
+        '''
+        Counts by score of not spam ratings submitted since the start of the
+        bucket of since. Reads one row per bucket instead of every rating.
+        return dict mapping article id to list of counts by score
+        '''
+        rollups = self.filter(
+            article_id__in=article_ids,
+            bucket_start__gte=self.get_bucket_start(since),
+        ).values('article_id').annotate(
+            **{f'total_{field}': models.Sum(field) for field in SCORE_COUNT_FIELDS}
+        ).order_by()
+        return {
+            rollup['article_id']: [rollup[f'total_{field}'] for field in SCORE_COUNT_FIELDS]
+            for rollup in rollups
+        }
+
+    def get_window_normal_dist_info(self, article_ids: List[int], since) -> dict:
+        '''
+        return dict mapping article id to (mean, variance, count) of not spam
+        ratings submitted in the window
+        '''
+        return {
+            article_id: calculate_normal_dist_info_with_histogram(score_counts)
+            for article_id, score_counts in self.get_window_score_counts(article_ids, since).items()
+        }
+
+    def delete_buckets_before(self, moment) -> int:
+        deleted_count, _ = self.filter(bucket_start__lt=self.get_bucket_start(moment)).delete()
+        return deleted_count
+
+
+class AppliedRatingBufferBatchManager(models.Manager):
+
+    def mark_applied(self, batch_id: str) -> bool:
+        '''
+        Records the batch as applied, in the transaction applying it.
+        return whether the batch was not applied before
+        '''
+        _, created = self.get_or_create(id=batch_id)
+        return created
@@ -0,0 +1,30 @@
+from core.metrics import CallbackGauge, RedisCounter, RedisHistogram, metrics_registry
+from core.settings import config
+from articles.models import Rating
+
+
+spam_handler_stage_duration = metrics_registry.register(RedisHistogram(
+    'articles_spam_handler_stage_duration_seconds',
+    'Duration of each stage of probable spam handling.',
+    is_active=config.METRICS_IS_ACTIVE,
+))
+spam_handler_run_duration = metrics_registry.register(RedisHistogram(
+    'articles_spam_handler_run_duration_seconds',
+    'Duration of a whole run of probable spam handling.',
+    is_active=config.METRICS_IS_ACTIVE,
+))
+spam_handler_ratings = metrics_registry.register(RedisCounter(
+    'articles_spam_handler_ratings',
+    'Count of probable spam ratings handled by result.',
+    is_active=config.METRICS_IS_ACTIVE,
+))
+probable_spam_backlog = metrics_registry.register(CallbackGauge(
+    'articles_probable_spam_backlog',
+    'Count of ratings waiting for spam handling.',
+    Rating.objects.get_probable_spam_backlog_count,
+))
+probable_spam_oldest_age = metrics_registry.register(CallbackGauge(
+    'articles_probable_spam_oldest_age_seconds',
+    'Age of the oldest rating waiting for spam handling, 0 when there is none.',
+    Rating.objects.get_probable_spam_oldest_age,
+))
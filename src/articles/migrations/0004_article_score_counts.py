@@ -0,0 +1,68 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0003_article_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='score_count_0',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='score_count_1',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='score_count_2',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='score_count_3',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='score_count_4',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='score_count_5',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            sql='''
+                UPDATE articles_article AS article SET
+                    score_count_0 = counts.count_0,
+                    score_count_1 = counts.count_1,
+                    score_count_2 = counts.count_2,
+                    score_count_3 = counts.count_3,
+                    score_count_4 = counts.count_4,
+                    score_count_5 = counts.count_5
+                FROM (
+                    SELECT
+                        article_id,
+                        COUNT(*) FILTER (WHERE score = 0) AS count_0,
+                        COUNT(*) FILTER (WHERE score = 1) AS count_1,
+                        COUNT(*) FILTER (WHERE score = 2) AS count_2,
+                        COUNT(*) FILTER (WHERE score = 3) AS count_3,
+                        COUNT(*) FILTER (WHERE score = 4) AS count_4,
+                        COUNT(*) FILTER (WHERE score = 5) AS count_5
+                    FROM articles_rating
+                    GROUP BY article_id
+                ) AS counts
+                WHERE article.id = counts.article_id
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+from core.settings import config
+
+
+# Bands computed like articles.managers.get_acceptable_score_band_sql
+REFRESH_ACCEPTABLE_SCORE_BANDS_SQL = '''
+UPDATE articles_article SET
+    acceptable_score_low = (CASE WHEN rating_count > 0 AND rating_square_sum > 0
+        THEN GREATEST(0, CEIL(rating_average - %(zscore_bound)s * SQRT(rating_square_sum / rating_count)))
+        ELSE 0 END),
+    acceptable_score_high = (CASE WHEN rating_count > 0 AND rating_square_sum > 0
+        THEN LEAST(5, FLOOR(rating_average + %(zscore_bound)s * SQRT(rating_square_sum / rating_count)))
+        ELSE 5 END)
+'''
+
+
+def refresh_acceptable_score_bands(apps, schema_editor):
+    # bands are trusted by the spam detector when its bound is SPAM_RATE_ZSCORE_BOUND
+    schema_editor.execute(
+        REFRESH_ACCEPTABLE_SCORE_BANDS_SQL, {'zscore_bound': float(config.SPAM_RATE_ZSCORE_BOUND)}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_article_score_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='acceptable_score_high',
+            field=models.SmallIntegerField(default=5),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='acceptable_score_low',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.RunPython(refresh_acceptable_score_bands, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:00
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # ratings table is large and written all the time, so it is not locked while indexing
+    atomic = False
+
+    dependencies = [
+        ('articles', '0005_article_acceptable_score_band'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='rating',
+            index=models.Index(condition=models.Q(('spam_status', 1)), fields=['created_at'], name='rating_probable_spam_idx'),
+        ),
+    ]
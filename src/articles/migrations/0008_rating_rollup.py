@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0007_archived_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('score_count_0', models.BigIntegerField(default=0)),
+                ('score_count_1', models.BigIntegerField(default=0)),
+                ('score_count_2', models.BigIntegerField(default=0)),
+                ('score_count_3', models.BigIntegerField(default=0)),
+                ('score_count_4', models.BigIntegerField(default=0)),
+                ('score_count_5', models.BigIntegerField(default=0)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='articles.article')),
+            ],
+            options={
+                'unique_together': {('article', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0008_rating_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppliedRatingBufferBatch',
+            fields=[
+                ('id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('applied_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
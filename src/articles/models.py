@@ -1,9 +1,18 @@
-from typing import List
+import math
+from typing import List, Tuple
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-
-from articles.managers import RatingManager, ArticleManager
+from django.utils import timezone
+
+from articles.caches import articles_list_cache
+from articles.managers import (
+    AppliedRatingBufferBatchManager,
+    ArticleManager,
+    RatingManager,
+    RatingRollupManager,
+    RATING_INFO_FIELDS,
+)
 from articles.constants import RatingScores, RatingSpamStatus
 from core.settings import config
 from core.utils import (
@@ -21,33 +30,89 @@ class Article(models.Model):
     rating_average = models.FloatField(default=0)
     rating_square_sum = models.FloatField(default=0.0)
 
+    # scores whose z-score is within SPAM_RATE_ZSCORE_BOUND, kept in sync with rating info
+    acceptable_score_low = models.SmallIntegerField(default=RatingScores.ZERO)
+    acceptable_score_high = models.SmallIntegerField(default=RatingScores.FIVE)
+
+    # counts of all ratings of the article by score, regardless of spam status
+    score_count_0 = models.BigIntegerField(default=0)
+    score_count_1 = models.BigIntegerField(default=0)
+    score_count_2 = models.BigIntegerField(default=0)
+    score_count_3 = models.BigIntegerField(default=0)
+    score_count_4 = models.BigIntegerField(default=0)
+    score_count_5 = models.BigIntegerField(default=0)
+
     objects: ArticleManager = ArticleManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='article_created_at_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        transaction.on_commit(articles_list_cache.invalidate, using=kwargs.get('using'))
+
     def get_variance(self) -> float:
         if self.rating_count == 0:
             return 0.0
 
         return self.rating_square_sum / self.rating_count
 
-    def update_rating_info_with_rating(self, rating, old_score: int|None=None) -> None:
-        if rating.spam_status != RatingSpamStatus.NOT_SPAM:
+    def update_acceptable_score_band(self) -> None:
+        variance = self.get_variance()
+        if variance <= 0:
+            self.acceptable_score_low = RatingScores.ZERO
+            self.acceptable_score_high = RatingScores.FIVE
             return
-        if old_score is None:
-            self.update_rating_info_with_new_scores(new_scores=[rating.score])
-        else:
-            self.update_rating_info_with_updated_score(rating.score, old_score)
 
-    def update_rating_info_with_updated_score(self, score, old_score):
-        new_mean, new_sum_squares =calculate_new_normal_dist_info_with_data_update(
-            models.F('rating_average'),
-            models.F('rating_square_sum'),
-            models.F('rating_count'),
-            score,
-            old_score,
+        std_dev = math.sqrt(variance)
+        self.acceptable_score_low = max(
+            RatingScores.ZERO,
+            math.ceil(self.rating_average - config.SPAM_RATE_ZSCORE_BOUND * std_dev)
+        )
+        self.acceptable_score_high = min(
+            RatingScores.FIVE,
+            math.floor(self.rating_average + config.SPAM_RATE_ZSCORE_BOUND * std_dev)
         )
-        self.rating_average = new_mean
-        self.rating_square_sum = new_sum_squares
-        self.save()
+
+    def score_is_in_acceptable_band(self, score: int) -> bool:
+        return self.acceptable_score_low <= score <= self.acceptable_score_high
+
+    def get_score_count(self, score: int) -> int:
+        return getattr(self, f'score_count_{score}')
+
+    def apply_rating_changes(
+        self,
+        new_scores: List[int],
+        updated_scores: List[Tuple[int, int]],
+        score_count_changes: List[int],
+    ) -> None:
+        '''
+        Applies not spam new scores and (new_score, old_score) updates to the
+        loaded rating info and per score count changes to score counts, in memory.
+        Caller is responsible for saving the article.
+        '''
+        for score, count_change in enumerate(score_count_changes):
+            field_name = f'score_count_{score}'
+            setattr(self, field_name, getattr(self, field_name) + count_change)
+        if new_scores:
+            self.rating_average, self.rating_square_sum, self.rating_count = \
+                calculate_new_normal_dist_info_with_new_data_points(
+                    self.rating_average,
+                    self.rating_square_sum,
+                    self.rating_count,
+                    new_scores,
+                )
+        for score, old_score in updated_scores:
+            self.rating_average, self.rating_square_sum = calculate_new_normal_dist_info_with_data_update(
+                self.rating_average,
+                self.rating_square_sum,
+                self.rating_count,
+                score,
+                old_score,
+            )
+        self.update_acceptable_score_band()
 
     def update_rating_info_with_new_scores(self, new_scores: List[int]) -> None:
         new_mean, new_sum_squares, new_count = calculate_new_normal_dist_info_with_new_data_points(
@@ -60,7 +125,8 @@ class Article(models.Model):
         self.rating_average = new_mean
         self.rating_count = new_count
         self.rating_square_sum = new_sum_squares
-        self.save()
+        self.save(update_fields=RATING_INFO_FIELDS)
+        Article.objects.refresh_acceptable_score_bands([self.id])
 
 
 class Rating(models.Model):
@@ -76,8 +142,66 @@ class Rating(models.Model):
 
     class Meta:
         unique_together = ('article', 'user',)
+        indexes = [
+            # probable spams are a small share of ratings, polled by spam handling and backlog metrics
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(spam_status=RatingSpamStatus.PROBABLE_SPAM),
+                name='rating_probable_spam_idx',
+            ),
+            # settled spams waiting to be archived, see RatingManager.archive_spam_ratings
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(spam_status=RatingSpamStatus.SPAM),
+                name='rating_spam_idx',
+            ),
+        ]
+
+
+class ArchivedRating(models.Model):
+    '''
+    Settled spam ratings moved out of Rating, keeping their ids. They are only
+    kept for auditing and for score counts of articles when rating info is rebuilt.
+    '''
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    article = models.ForeignKey(Article, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    score = models.SmallIntegerField(choices=RatingScores.choices)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    spam_status = models.SmallIntegerField(choices=RatingSpamStatus.choices)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+
+class RatingRollup(models.Model):
+    '''
+    Counts by score of not spam ratings of an article created in a bucket of
+    RATING_ROLLUP_BUCKET_SIZE seconds starting at bucket_start. Probable spams
+    are added to the bucket they were created in once they are found not spam.
+    '''
+    article = models.ForeignKey(Article, on_delete=models.CASCADE)
+    bucket_start = models.DateTimeField()
+
+    score_count_0 = models.BigIntegerField(default=0)
+    score_count_1 = models.BigIntegerField(default=0)
+    score_count_2 = models.BigIntegerField(default=0)
+    score_count_3 = models.BigIntegerField(default=0)
+    score_count_4 = models.BigIntegerField(default=0)
+    score_count_5 = models.BigIntegerField(default=0)
+
+    objects: RatingRollupManager = RatingRollupManager()
+
+    class Meta:
+        unique_together = ('article', 'bucket_start',)
+
+
+class AppliedRatingBufferBatch(models.Model):
+    '''
+    Rating buffer batches applied to articles but not acknowledged in redis yet.
+    Written in the transaction applying the batch, so a batch recovered after a
+    crash between commit and acknowledgement is not applied twice.
+    '''
+    id = models.CharField(primary_key=True, max_length=32)
+    applied_at = models.DateTimeField(default=timezone.now)
 
-    def update_score(self, article: Article, new_score: int):
-        self.score = new_score
-        self.save()
-        return self
+    objects: AppliedRatingBufferBatchManager = AppliedRatingBufferBatchManager()
@@ -0,0 +1,144 @@
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator, EmptyPage, InvalidPage
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+class EstimatedCountPaginator(Paginator):
+    '''
+    Paginator that takes the row count from postgres planner statistics
+    instead of running COUNT(*). Only valid for unfiltered querysets.
+    Pages past the estimated count are still served.
+    '''
+
+    @cached_property
+    def count(self):
+        estimated_count = self.object_list.model.objects.get_estimated_count()
+        if estimated_count is None:
+            return super().count
+        return estimated_count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            number = int(number)
+            if number < 1:
+                raise
+            return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+
+class ArticlePageNumberPagination(PageNumberPagination):
+    count_query_param = 'count'
+    estimated_count_value = 'estimated'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.count_query_param) == self.estimated_count_value:
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+
+class AsyncArticlePageNumberPagination(ArticlePageNumberPagination):
+    '''
+    ArticlePageNumberPagination for async views. Count and rows of the page
+    are fetched with the async ORM and the page is built from them.
+    '''
+
+    async def apaginate_queryset(self, queryset, request) -> list:
+        self.request = request
+        page_size = self.get_page_size(request)
+        if request.query_params.get(self.count_query_param) == self.estimated_count_value:
+            self.django_paginator_class = EstimatedCountPaginator
+            count = await sync_to_async(queryset.model.objects.get_estimated_count)()
+        else:
+            count = None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # set cached count so the paginator does not query it synchronously
+        paginator.count = count if count is not None else await queryset.acount()
+
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom:bottom + page_size]]
+        self.page = paginator._get_page(rows, number, paginator)
+        return rows
+
+
+class ArticleCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class AsyncArticleCursorPagination(ArticleCursorPagination):
+    '''
+    ArticleCursorPagination for async views. Same as CursorPagination.paginate_queryset
+    with rows of the page fetched by the async ORM.
+    '''
+
+    async def apaginate_queryset(self, queryset, request) -> list:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, None)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': current_position}
+            else:
+                kwargs = {order_attr + '__gt': current_position}
+            queryset = queryset.filter(**kwargs)
+
+        # an extra row tells whether a page follows this one
+        results = [row async for row in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        return self.page
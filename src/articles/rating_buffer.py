@@ -0,0 +1,154 @@
+import logging
+import uuid
+from typing import List, Tuple
+
+from django.db import transaction
+
+from articles.models import AppliedRatingBufferBatch, Article
+from core.redis import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class RatingBuffer:
+    '''
+    Redis backed buffer of rating changes that are not applied to articles'
+    rating info and score counts yet. Entries are "<article_id>:<spam_status>:<score>"
+    for new ratings and "<article_id>:<spam_status>:<score>:<old_score>" for updated ones.
+
+    Flushing is a reliable queue: a batch is moved to a processing list with an
+    id and only removed from it after it is applied, so a batch of a crashed
+    flush is applied by the next one. Batch ids are recorded in the transaction
+    applying the batch, so a batch is never applied twice. Flushes hold a redis
+    lock, so only one runs at a time.
+    '''
+
+    def __init__(
+            self,
+            redis_client,
+            key: str = 'articles:rating_buffer',
+            lock_timeout: int = 300,
+            async_redis_client=None,
+        ) -> None:
+        self.redis_client = redis_client
+        self._async_redis_client = async_redis_client
+        self.key = key
+        self.processing_key = f'{key}:processing'
+        self.batch_id_key = f'{key}:processing:batch_id'
+        self.lock_timeout = lock_timeout
+
+    @property
+    def async_redis_client(self):
+        return self._async_redis_client or get_async_redis_client()
+
+    @staticmethod
+    def make_entry(article_id: int, spam_status: int, score: int, old_score: int | None = None) -> str:
+        entry = f'{article_id}:{spam_status}:{score}'
+        if old_score is not None:
+            entry += f':{old_score}'
+        return entry
+
+    def push(self, article_id: int, spam_status: int, score: int, old_score: int | None = None) -> None:
+        self.redis_client.rpush(self.key, self.make_entry(article_id, spam_status, score, old_score))
+
+    def push_rating(self, rating, old_score: int | None = None) -> None:
+        self.push(rating.article_id, rating.spam_status, rating.score, old_score)
+
+    async def apush_rating(self, rating, old_score: int | None = None) -> None:
+        await self.async_redis_client.rpush(
+            self.key, self.make_entry(rating.article_id, rating.spam_status, rating.score, old_score)
+        )
+
+    def push_many(self, rating_changes: List[Tuple[int, int, int, int | None]]) -> None:
+        if rating_changes:
+            self.redis_client.rpush(self.key, *(self.make_entry(*change) for change in rating_changes))
+
+    def pop_batch(self, size: int) -> Tuple[str, List[bytes]]:
+        '''
+        Moves up to size entries from head of the buffer to the processing list
+        and stores a new id of the batch, in one transaction.
+        return batch id, entries
+        '''
+        batch_id = uuid.uuid4().hex
+        pipeline = self.redis_client.pipeline()
+        pipeline.set(self.batch_id_key, batch_id)
+        for _ in range(size):
+            pipeline.lmove(self.key, self.processing_key, 'LEFT', 'RIGHT')
+        _, *entries = pipeline.execute()
+        return batch_id, [entry for entry in entries if entry is not None]
+
+    def get_processing_batch(self) -> Tuple[str, List[bytes]]:
+        '''
+        return id and entries of the batch left in the processing list by a
+        crashed or failed flush, entries are empty when there is none
+        '''
+        pipeline = self.redis_client.pipeline()
+        pipeline.get(self.batch_id_key)
+        pipeline.lrange(self.processing_key, 0, -1)
+        batch_id, entries = pipeline.execute()
+        return (batch_id.decode() if batch_id else uuid.uuid4().hex), entries
+
+    def ack_batch(self) -> None:
+        self.redis_client.delete(self.processing_key, self.batch_id_key)
+
+    def apply_batch(self, batch_id: str, entries: List[bytes]) -> bool:
+        '''
+        Applies entries to articles unless the batch was applied before.
+        return whether the batch was applied
+        '''
+        with transaction.atomic():
+            if not AppliedRatingBufferBatch.objects.mark_applied(batch_id):
+                return False
+            Article.objects.bulk_update_rating_info_with_changes(self.parse_entries(entries))
+        return True
+
+    @staticmethod
+    def parse_entries(entries: List[bytes]) -> List[Tuple[int, int, int, int | None]]:
+        rating_changes = []
+        for entry in entries:
+            article_id, spam_status, score, *old_score = (int(part) for part in entry.decode().split(':'))
+            rating_changes.append((article_id, spam_status, score, old_score[0] if old_score else None))
+
+        return rating_changes
+
+    def flush(self, batch_size: int) -> int:
+        '''
+        Drains the buffer in batches and applies each batch to articles.
+        A batch left in the processing list by a failed or crashed flush is
+        applied first, keeping its id, so it is skipped when it was already
+        committed. Nothing is done when another flush is running.
+        return count of applied entries
+        '''
+        lock = self.redis_client.lock(f'{self.key}:lock', timeout=self.lock_timeout)
+        if not lock.acquire(blocking=False):
+            return 0
+
+        applied_count = 0
+        try:
+            batch_id, entries = self.get_processing_batch()
+            if entries:
+                logger.warning(
+                    'Recovering rating buffer batch of a failed flush',
+                    extra={'batch_id': batch_id, 'recovered_count': len(entries)}
+                )
+            else:
+                batch_id, entries = self.pop_batch(batch_size)
+            while entries:
+                if self.apply_batch(batch_id, entries):
+                    applied_count += len(entries)
+                else:
+                    logger.warning('Skipped rating buffer batch applied before', extra={'batch_id': batch_id})
+                self.ack_batch()
+                AppliedRatingBufferBatch.objects.filter(id=batch_id).delete()
+                lock.extend(self.lock_timeout, replace_ttl=True)
+                batch_id, entries = self.pop_batch(batch_size)
+        finally:
+            lock.release()
+
+        logger.info(
+            'Flushed rating buffer',
+            extra={'applied_count': applied_count}
+        )
+        return applied_count
+
+rating_buffer = RatingBuffer(get_redis_client())
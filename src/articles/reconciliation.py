@@ -0,0 +1,84 @@
+import multiprocessing
+from typing import Callable, Iterator, List, Tuple
+
+from django.db import connections
+
+from articles.managers import RATING_INFO_FIELDS
+from articles.models import Article
+
+
+def get_article_id_chunks(chunk_size: int) -> List[Tuple[int, int]]:
+    '''
+    Half open (min_id, max_id) ranges of ids with chunk_size articles each,
+    so gaps in ids do not make empty chunks.
+    '''
+    min_ids = []
+    last_id = None
+    article_ids = Article.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=10000)
+    for i, last_id in enumerate(article_ids):
+        if i % chunk_size == 0:
+            min_ids.append(last_id)
+    if last_id is None:
+        return []
+    return list(zip(min_ids, [*min_ids[1:], last_id + 1]))
+
+
+def reconcile_chunk(id_range: Tuple[int, int], tolerance: float, fix: bool) -> dict:
+    '''
+    Finds articles of the id range with drifted rating info and rebuilds them
+    from their ratings when fix is set. Only drifted articles are updated.
+    '''
+    drifts = list(Article.objects.iter_rating_info_drifts(*id_range, tolerance))
+    fixed_count = 0
+    if fix and drifts:
+        fixed_count = Article.objects.rebuild_rating_info([drift['id'] for drift in drifts])
+    return {'id_range': id_range, 'drifts': drifts, 'fixed_count': fixed_count}
+
+
+def reconcile_chunk_star(args: tuple) -> dict:
+    return reconcile_chunk(*args)
+
+
+class RatingInfoReconciler:
+    '''
+    Compares stored rating info of articles with rating info computed from their
+    not spam ratings, in chunks of article ids processed by several worker
+    processes, and optionally fixes drifted articles.
+    '''
+
+    def __init__(self, chunk_size: int = 1000, workers: int = 1, tolerance: float = 1e-6, fix: bool = False) -> None:
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.tolerance = tolerance
+        self.fix = fix
+
+    def iter_chunk_results(self) -> Iterator[dict]:
+        chunks = [(id_range, self.tolerance, self.fix) for id_range in get_article_id_chunks(self.chunk_size)]
+        if self.workers <= 1:
+            yield from map(reconcile_chunk_star, chunks)
+            return
+
+        # forked workers must open their own connections instead of sharing the parent's
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(self.workers) as pool:
+            yield from pool.imap_unordered(reconcile_chunk_star, chunks)
+
+    def reconcile(self, on_drift: Callable[[dict], None] | None = None) -> dict:
+        summary = {
+            'chunks': 0,
+            'drifted_count': 0,
+            'fixed_count': 0,
+            'max_drift': {field: 0.0 for field in RATING_INFO_FIELDS},
+        }
+        for result in self.iter_chunk_results():
+            summary['chunks'] += 1
+            summary['drifted_count'] += len(result['drifts'])
+            summary['fixed_count'] += result['fixed_count']
+            for drift in result['drifts']:
+                for field in RATING_INFO_FIELDS:
+                    summary['max_drift'][field] = max(
+                        summary['max_drift'][field], abs(drift['stored'][field] - drift['actual'][field])
+                    )
+                if on_drift is not None:
+                    on_drift(drift)
+        return summary
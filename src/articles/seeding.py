@@ -0,0 +1,179 @@
+import random
+import uuid
+from collections import defaultdict
+from typing import Iterable, List
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from articles.caches import articles_list_cache
+from articles.constants import RatingScores, RatingSpamStatus
+from articles.managers import ACCEPTABLE_SCORE_BAND_FIELDS, RATING_INFO_FIELDS, SCORE_COUNT_FIELDS
+from articles.models import Article, Rating
+from articles.spam_detector import spam_detector
+
+
+SEED_USERNAME_PREFIX = 'seed_'
+SCORE_DISTRIBUTIONS = ('normal', 'uniform', 'bimodal')
+
+
+def generate_score(rng: random.Random, distribution: str, mean: float, std: float) -> int:
+    '''
+    Random score of the distribution, rounded and clipped to valid scores.
+    '''
+    if distribution == 'uniform':
+        return rng.choice(RatingScores.values)
+    if distribution == 'bimodal':
+        mean = mean - 1.5 if rng.random() < 0.5 else mean + 1.5
+    score = round(rng.gauss(mean, std))
+    return min(max(score, RatingScores.ZERO), RatingScores.FIVE)
+
+
+class DataSeeder:
+    '''
+    Inserts synthetic users, articles and ratings in bulk and keeps rating info,
+    score counts and acceptable score bands of articles consistent with them.
+    Spam bursts are many ratings of one score on one article by new raters,
+    marked by spam detector like rating APIs would.
+    '''
+
+    def __init__(
+        self,
+        distribution: str = 'normal',
+        score_mean: float = 3.0,
+        score_std: float = 1.0,
+        password: str = 'password',
+        batch_size: int = 5000,
+        seed: int | None = None,
+    ) -> None:
+        self.distribution = distribution
+        self.score_mean = score_mean
+        self.score_std = score_std
+        self.password = password
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+
+    def create_users(self, count: int) -> List[User]:
+        run_id = uuid.uuid4().hex[:8]
+        password = make_password(self.password)
+        users = [
+            User(username=f'{SEED_USERNAME_PREFIX}{run_id}_{i}', password=password)
+            for i in range(count)
+        ]
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_articles(self, count: int) -> List[Article]:
+        articles = [
+            Article(title=f'Article {i}', body=f'Body of article {i}. ' * self.rng.randint(5, 50))
+            for i in range(count)
+        ]
+        return Article.objects.bulk_create(articles, batch_size=self.batch_size)
+
+    def create_ratings(self, articles: List[Article], users: List[User], count: int) -> dict:
+        '''
+        Creates not spam ratings on random distinct (article, user) pairs.
+        returns set of rater user indexes by article index
+        '''
+        count = min(count, len(articles) * len(users))
+        article_means = [self.rng.gauss(self.score_mean, 0.5) for _ in articles]
+        raters = defaultdict(set)
+        changes = defaultdict(lambda: ([], [0] * len(RatingScores.values)))
+
+        ratings = []
+        for pair_index in self.rng.sample(range(len(articles) * len(users)), count):
+            article_index, user_index = divmod(pair_index, len(users))
+            score = generate_score(self.rng, self.distribution, article_means[article_index], self.score_std)
+            raters[article_index].add(user_index)
+            new_scores, score_count_changes = changes[article_index]
+            new_scores.append(score)
+            score_count_changes[score] += 1
+            ratings.append(Rating(
+                user=users[user_index],
+                article=articles[article_index],
+                score=score,
+                spam_status=RatingSpamStatus.NOT_SPAM,
+            ))
+            if len(ratings) >= self.batch_size:
+                Rating.objects.bulk_create(ratings)
+                ratings = []
+        Rating.objects.bulk_create(ratings)
+
+        self.apply_changes(articles, changes)
+        return raters
+
+    def create_spam_bursts(
+        self,
+        articles: List[Article],
+        users: List[User],
+        raters: dict,
+        burst_count: int,
+        burst_size: int,
+        spam_score: int,
+    ) -> int:
+        updated_articles = {}
+        ratings = []
+        for _ in range(burst_count):
+            article_index = self.rng.randrange(len(articles))
+            article = articles[article_index]
+            free_user_indexes = [i for i in range(len(users)) if i not in raters[article_index]]
+            burst_user_indexes = self.rng.sample(free_user_indexes, min(burst_size, len(free_user_indexes)))
+            for user_index in burst_user_indexes:
+                # applied one by one so each rating is marked against the band it would meet
+                spam_status = spam_detector.get_spam_status_for_article_score(spam_score, article)
+                score_count_changes = [0] * len(RatingScores.values)
+                score_count_changes[spam_score] = 1
+                article.apply_rating_changes(
+                    [spam_score] if spam_status == RatingSpamStatus.NOT_SPAM else [],
+                    [],
+                    score_count_changes,
+                )
+                raters[article_index].add(user_index)
+                ratings.append(Rating(
+                    user=users[user_index],
+                    article=article,
+                    score=spam_score,
+                    spam_status=spam_status,
+                ))
+            updated_articles[article.id] = article
+        Rating.objects.bulk_create(ratings, batch_size=self.batch_size)
+
+        self.save_articles(updated_articles.values())
+        return len(ratings)
+
+    def apply_changes(self, articles: List[Article], changes: dict) -> None:
+        for article_index, (new_scores, score_count_changes) in changes.items():
+            articles[article_index].apply_rating_changes(new_scores, [], score_count_changes)
+        self.save_articles([articles[article_index] for article_index in changes])
+
+    def save_articles(self, articles: Iterable[Article]) -> None:
+        Article.objects.bulk_update(
+            articles,
+            [*RATING_INFO_FIELDS, *SCORE_COUNT_FIELDS, *ACCEPTABLE_SCORE_BAND_FIELDS],
+            batch_size=self.batch_size,
+        )
+
+    def seed(
+        self,
+        articles_count: int,
+        users_count: int,
+        ratings_count: int,
+        spam_burst_count: int = 0,
+        spam_burst_size: int = 50,
+        spam_score: int = RatingScores.ZERO,
+    ) -> dict:
+        users = self.create_users(users_count)
+        articles = self.create_articles(articles_count)
+        raters = self.create_ratings(articles, users, ratings_count)
+        created_ratings_count = sum(len(user_indexes) for user_indexes in raters.values())
+        spam_ratings_count = 0
+        if spam_burst_count and articles:
+            spam_ratings_count = self.create_spam_bursts(
+                articles, users, raters, spam_burst_count, spam_burst_size, spam_score
+            )
+        articles_list_cache.invalidate()
+        return {
+            'users': len(users),
+            'articles': len(articles),
+            'ratings': created_ratings_count,
+            'spam_burst_ratings': spam_ratings_count,
+        }
@@ -1,13 +1,30 @@
 from rest_framework import serializers
 
+from articles.constants import RatingScores
+from articles.managers import ACCEPTABLE_SCORE_BAND_FIELDS, SCORE_COUNT_FIELDS
 from articles.models import Article, Rating
+from core.serializers import CompiledSerializer
+from core.settings import config
 
 class ArticleForListSerializer(serializers.ModelSerializer):
     user_rating = serializers.IntegerField(read_only=True, allow_null=True)
 
     class Meta:
         model = Article
-        exclude = ['rating_square_sum']
+        exclude = ['rating_square_sum', *ACCEPTABLE_SCORE_BAND_FIELDS, *SCORE_COUNT_FIELDS]
+
+
+class ArticleExcerptForListSerializer(serializers.ModelSerializer):
+    user_rating = serializers.IntegerField(read_only=True, allow_null=True)
+    body_excerpt = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Article
+        exclude = ['body', 'rating_square_sum', *ACCEPTABLE_SCORE_BAND_FIELDS, *SCORE_COUNT_FIELDS]
+
+
+class ArticleSerializer(ArticleForListSerializer):
+    pass
 
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -15,3 +32,27 @@ class RatingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rating
         exclude = ['spam_status', 'user',]
+
+
+class RatingBatchItemSerializer(serializers.Serializer):
+    article = serializers.IntegerField()
+    score = serializers.ChoiceField(choices=RatingScores.choices)
+
+
+class RatingBatchSerializer(serializers.Serializer):
+    ratings = RatingBatchItemSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=config.RATING_BATCH_MAX_SIZE,
+    )
+
+
+article_for_list_compiled_serializer = CompiledSerializer(
+    ArticleForListSerializer,
+    values_exclude=['user_rating'],
+)
+article_excerpt_for_list_compiled_serializer = CompiledSerializer(
+    ArticleExcerptForListSerializer,
+    values_exclude=['user_rating'],
+)
+rating_compiled_serializer = CompiledSerializer(RatingSerializer)
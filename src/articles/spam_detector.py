@@ -1,5 +1,8 @@
+from core.server_timing import measure
 from core.settings import config
 from core.utils import calculate_zscore
+from articles.burst_detector import RatingBurstDetector, rating_burst_detector
+from articles.models import Article
 from articles.constants import RatingSpamStatus
 from articles.spam_handlers import BaseProbableSpamHandler, normal_dist_probable_spam_handler
 
@@ -12,25 +15,92 @@ class SpamDetector:
             decision_count_limit: int,
             normal_zscore_bound: float,
             
-            probable_spam_handler: BaseProbableSpamHandler
+            probable_spam_handler: BaseProbableSpamHandler,
+            burst_detector: RatingBurstDetector | None = None,
         ) -> None:
         self.is_active = is_active
         self.decision_count_limit = decision_count_limit
         self.normal_zscore_bound = normal_zscore_bound
         self.probable_spam_handler = probable_spam_handler
+        self.burst_detector = burst_detector
 
-    def get_spam_status_for_score(self, score: int, rating_count: int, mean: float, variance: float):
+    def get_spam_status_for_score(
+            self,
+            score: int,
+            rating_count: int,
+            mean: float,
+            variance: float,
+            article_id: int | None = None,
+            user_id: int | None = None,
+        ):
+        '''
+        When a burst detector is set and article_id is given the rating is counted
+        for burst detection, and ratings in a burst are probable spams regardless of score.
+        '''
         spam_status = RatingSpamStatus.NOT_SPAM
         if self.is_active and variance != 0 and \
             rating_count >= self.decision_count_limit  and \
                 self.score_is_out_of_normal_bound(score, mean, variance):
             spam_status = RatingSpamStatus.PROBABLE_SPAM
+        if self.is_in_burst(article_id, user_id):
+            spam_status = RatingSpamStatus.PROBABLE_SPAM
+
+        return spam_status
+
+    def get_spam_status_for_article_score(self, score: int, article: Article, user_id: int | None = None):
+        '''
+        Same decision as get_spam_status_for_score using the acceptable score band
+        precomputed on the article instead of computing the z-score.
+        '''
+        with measure('spam'):
+            spam_status = self.get_spam_status_for_article_band(score, article)
+            if self.is_in_burst(article.id, user_id):
+                spam_status = RatingSpamStatus.PROBABLE_SPAM
+
+        return spam_status
+
+    async def aget_spam_status_for_article_score(self, score: int, article: Article, user_id: int | None = None):
+        '''
+        Same as get_spam_status_for_article_score for async views, counting the
+        rating for burst detection with redis.asyncio.
+        '''
+        with measure('spam'):
+            spam_status = self.get_spam_status_for_article_band(score, article)
+            if await self.ais_in_burst(article.id, user_id):
+                spam_status = RatingSpamStatus.PROBABLE_SPAM
 
         return spam_status
 
+    def get_spam_status_for_article_band(self, score: int, article: Article):
+        if self.is_active and \
+            article.rating_count >= self.decision_count_limit and \
+                self.score_is_out_of_article_band(score, article):
+            return RatingSpamStatus.PROBABLE_SPAM
+        return RatingSpamStatus.NOT_SPAM
+
+    def is_in_burst(self, article_id: int | None, user_id: int | None) -> bool:
+        if not self.is_active or self.burst_detector is None or article_id is None:
+            return False
+        return self.burst_detector.record_rating(article_id, user_id)
+
+    async def ais_in_burst(self, article_id: int | None, user_id: int | None) -> bool:
+        if not self.is_active or self.burst_detector is None or article_id is None:
+            return False
+        return await self.burst_detector.arecord_rating(article_id, user_id)
+
+    def score_is_out_of_article_band(self, score: int, article: Article) -> bool:
+        '''
+        Bands stored on articles are computed with SPAM_RATE_ZSCORE_BOUND. A detector
+        with another bound computes the z-score of the score instead.
+        '''
+        if self.normal_zscore_bound == config.SPAM_RATE_ZSCORE_BOUND:
+            return not article.score_is_in_acceptable_band(score)
+        variance = article.get_variance()
+        return variance != 0 and self.score_is_out_of_normal_bound(score, article.rating_average, variance)
+
     def score_is_out_of_normal_bound(self, score: int, mean: float, variance: float):
         zscore = calculate_zscore(mean, variance, score)
-        return zscore > config.SPAM_RATE_ZSCORE_BOUND or zscore < -1 * config.SPAM_RATE_ZSCORE_BOUND 
+        return zscore > self.normal_zscore_bound or zscore < -1 * self.normal_zscore_bound
 
     def handle_probable_spams(self):
         self.probable_spam_handler.handle()
@@ -41,4 +111,5 @@ spam_detector = SpamDetector(
     decision_count_limit=config.SPAM_RATE_COUNT_LIMIT,
     normal_zscore_bound=config.SPAM_RATE_ZSCORE_BOUND,
     probable_spam_handler=normal_dist_probable_spam_handler,
+    burst_detector=rating_burst_detector if config.RATING_BURST_DETECTION_IS_ACTIVE else None,
 )
@@ -1,10 +1,23 @@
 import abc
 import logging
 
+from django.db import transaction
+
+from articles.metrics import spam_handler_ratings, spam_handler_run_duration, spam_handler_stage_duration
+
 logger = logging.getLogger(__name__)
 
 
 class BaseProbableSpamHandler(abc.ABC):
+    '''
+    Drains probable spams in chunks of chunk_size. Each chunk is claimed with
+    SELECT ... FOR UPDATE SKIP LOCKED and settled in its own transaction, so
+    several workers can handle the backlog in parallel without handling a
+    rating twice, and article rows are only locked for one chunk. Ratings
+    detected as neither spam nor not spam stay suspicious for a later run, and
+    each run claims chunks after the last rating it claimed so they are skipped.
+    '''
+    chunk_size = 1000
 
     def detect_real_spam_ratings(self, ratings):
         raise NotImplementedError()
@@ -12,21 +25,55 @@ class BaseProbableSpamHandler(abc.ABC):
     def get_suspicouse_ratings(self):
         raise NotImplementedError()
 
+    def claim_suspicouse_ratings(self, chunk_size: int, after=None):
+        '''
+        Locks and returns up to chunk_size suspicious ratings that are not
+        locked by other transactions, in order and after the rating after when
+        given. Called in a transaction.
+        '''
+        raise NotImplementedError()
+
     def handle_not_spam_ratings(self, not_spam_rating_ids):
         raise NotImplementedError()
 
     def handle_spam_ratings(self, spam_rating_ids):
         raise NotImplementedError()
 
+    def handle_chunk(self, after=None):
+        '''
+        return spam rating ids, not spam rating ids and the last claimed rating of
+        the handled chunk, or None when no unclaimed suspicious rating is left after after
+        '''
+        # claim runs on primary, since rows are locked until the chunk is committed
+        with transaction.atomic():
+            with spam_handler_stage_duration.time(stage='get_suspicouse_ratings'):
+                probable_spam_ratings = list(self.claim_suspicouse_ratings(self.chunk_size, after))
+            if not probable_spam_ratings:
+                return None
+            with spam_handler_stage_duration.time(stage='detect_real_spam_ratings'):
+                spam_rating_ids, not_spam_rating_ids = self.detect_real_spam_ratings(probable_spam_ratings)
+            with spam_handler_stage_duration.time(stage='handle_not_spam_ratings'):
+                self.handle_not_spam_ratings(not_spam_rating_ids)
+            with spam_handler_stage_duration.time(stage='handle_spam_ratings'):
+                self.handle_spam_ratings(spam_rating_ids)
+        return spam_rating_ids, not_spam_rating_ids, probable_spam_ratings[-1]
+
     def handle(self):
-        probable_spam_ratings = self.get_suspicouse_ratings()
-        spam_rating_ids, not_spam_rating_ids = self.detect_real_spam_ratings(probable_spam_ratings)
-        self.handle_not_spam_ratings(not_spam_rating_ids)
-        self.handle_spam_ratings(spam_rating_ids)
+        chunks_count = spam_ratings_count = not_spam_ratings_count = 0
+        last_claimed_rating = None
+        with spam_handler_run_duration.time():
+            while (result := self.handle_chunk(last_claimed_rating)) is not None:
+                spam_rating_ids, not_spam_rating_ids, last_claimed_rating = result
+                chunks_count += 1
+                spam_ratings_count += len(spam_rating_ids)
+                not_spam_ratings_count += len(not_spam_rating_ids)
+                spam_handler_ratings.inc(len(spam_rating_ids), result='spam')
+                spam_handler_ratings.inc(len(not_spam_rating_ids), result='not_spam')
         logger.info(
             'Ran Spam Rating Handler',
             extra={
-                'spam_ratings_count': len(spam_rating_ids),
-                'not_spam_ratings_count': len(not_spam_rating_ids),
+                'chunks_count': chunks_count,
+                'spam_ratings_count': spam_ratings_count,
+                'not_spam_ratings_count': not_spam_ratings_count,
             }
         )
@@ -1,34 +1,120 @@
+import datetime
 from typing import List
 from django.db import transaction
+from django.utils import timezone
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from articles.spam_handlers.base import BaseProbableSpamHandler
-from articles.models import Rating, Article
+from articles.models import Rating, RatingRollup, Article
 from articles.constants import RatingSpamStatus
-from core.utils import calculate_normal_distribution_pdf
+from core.utils import calculate_normal_distribution_pdf, calculate_normal_distribution_pdfs
 from core.settings import config
 
 
 class NormalDistProbableSpamHandler(BaseProbableSpamHandler):
+    '''
+    When recent_window (seconds) is set, scores are compared to the distribution of
+    not spam ratings submitted in the window (see RatingRollup) instead of all
+    ratings of the article, if the window has at least min_window_count ratings.
+    Ratings of articles with fewer than min_rating_count ratings, which are only
+    probable spams when submitted in a burst, are kept probable spam until the
+    article has enough ratings to compare them to. Otherwise ratings compared to
+    a distribution with variance 0 are not spam, like scores in the acceptable
+    score band of such an article.
+    '''
 
-    def __init__(self, decisive_prob_diff: float) -> None:
+    def __init__(
+            self,
+            decisive_prob_diff: float,
+            recent_window: int = 0,
+            min_window_count: int = 0,
+            min_rating_count: int = 0,
+            chunk_size: int = BaseProbableSpamHandler.chunk_size,
+        ) -> None:
         self.decisive_prob_diff = decisive_prob_diff
+        self.chunk_size = chunk_size
+        self.recent_window = recent_window
+        self.min_window_count = min_window_count
+        self.min_rating_count = min_rating_count
 
     def get_suspicouse_ratings(self):
         return Rating.objects.get_probable_spam_ratings()
 
+    def claim_suspicouse_ratings(self, chunk_size: int, after=None):
+        return Rating.objects.claim_probable_spam_ratings(chunk_size, after)
+
+    def get_reference_distributions(self, ratings: List[Rating]) -> dict:
+        '''
+        return dict mapping article id to (mean, variance) scores are compared to
+        '''
+        distributions = {
+            rating.article_id: (rating.article.rating_average, rating.article.get_variance())
+            for rating in ratings
+        }
+        if self.recent_window and distributions:
+            window_normal_dist_info = RatingRollup.objects.get_window_normal_dist_info(
+                list(distributions), timezone.now() - datetime.timedelta(seconds=self.recent_window)
+            )
+            for article_id, (mean, variance, count) in window_normal_dist_info.items():
+                # a window of equal scores has no distribution to compare to
+                if count >= self.min_window_count and variance > 0:
+                    distributions[article_id] = (mean, variance)
+        return distributions
+
     def detect_real_spam_ratings(self, ratings: List[Rating]):
-        article_ids = [r.article_id for r in ratings]
-        article_score_counts_dict= Article.objects.get_ratings_score_count_for_article_ids(article_ids)
+        if numpy is not None:
+            return self.detect_real_spam_ratings_vectorized(ratings)
+        return self.detect_real_spam_ratings_one_by_one(ratings)
+
+    def detect_real_spam_ratings_vectorized(self, ratings: List[Rating]):
+        ratings = list(ratings)
+        if not ratings:
+            return ([], [])
 
+        rating_ids = numpy.array([rating.id for rating in ratings], dtype=numpy.int64)
+        scores = numpy.array([rating.score for rating in ratings], dtype=numpy.float64)
+        score_counts = numpy.array(
+            [rating.article.get_score_count(rating.score) for rating in ratings], dtype=numpy.float64
+        )
+        rating_counts = numpy.array([rating.article.rating_count for rating in ratings], dtype=numpy.float64)
+        distributions = self.get_reference_distributions(ratings)
+        means = numpy.array([distributions[rating.article_id][0] for rating in ratings], dtype=numpy.float64)
+        variances = numpy.array([distributions[rating.article_id][1] for rating in ratings], dtype=numpy.float64)
+
+        is_decidable = rating_counts >= self.min_rating_count
+        has_distribution = variances > 0
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            real_probabilities_of_scores = score_counts / (rating_counts + score_counts)
+            normal_pdfs = calculate_normal_distribution_pdfs(means, variances, scores)
+        is_spam = is_decidable & has_distribution & \
+            ((real_probabilities_of_scores - normal_pdfs) > self.decisive_prob_diff)
+        is_not_spam = is_decidable & ~is_spam
+
+        return (rating_ids[is_spam].tolist(), rating_ids[is_not_spam].tolist())
+
+    def detect_real_spam_ratings_one_by_one(self, ratings: List[Rating]):
         spam_rating_ids = []
         not_spam_rating_ids = []
+        ratings = list(ratings)
+        distributions = self.get_reference_distributions(ratings)
         for rating in ratings:
+            if rating.article.rating_count < self.min_rating_count:
+                continue
+            mean, variance = distributions[rating.article_id]
+            if variance <= 0:
+                not_spam_rating_ids.append(rating.id)
+                continue
+
             article = rating.article
-            score_count = article_score_counts_dict[article.id].get(f'count_{rating.score}')
+            score_count = article.get_score_count(rating.score)
             real_probability_of_score = score_count / (article.rating_count + score_count)
             normal_pdf = calculate_normal_distribution_pdf(
-                article.rating_average,
-                article.get_variance(),
+                mean,
+                variance,
                 rating.score
             )
             prob_diff = real_probability_of_score - normal_pdf
@@ -51,6 +137,7 @@ class NormalDistProbableSpamHandler(BaseProbableSpamHandler):
                 not_spam_rating_ids,
                 RatingSpamStatus.NOT_SPAM
             )
+            RatingRollup.objects.add_ratings(not_spam_rating_ids)
 
     def handle_spam_ratings(self, spam_rating_ids):
         Rating.objects.update_spam_status_of_ratings(
@@ -60,5 +147,9 @@ class NormalDistProbableSpamHandler(BaseProbableSpamHandler):
 
 
 normal_dist_probable_spam_handler = NormalDistProbableSpamHandler(
-    config.SPAM_RATE_PROB_DIFF_LIMIT
+    config.SPAM_RATE_PROB_DIFF_LIMIT,
+    recent_window=config.SPAM_RATE_RECENT_WINDOW,
+    min_window_count=config.SPAM_RATE_COUNT_LIMIT,
+    min_rating_count=config.SPAM_RATE_COUNT_LIMIT,
+    chunk_size=config.SPAM_HANDLER_CHUNK_SIZE,
 )
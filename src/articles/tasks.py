@@ -1,6 +1,47 @@
+import datetime
+import logging
+
+from django.utils import timezone
+
 from core.celery import celery_app
+from articles.models import Rating, RatingRollup
+from articles.rating_buffer import rating_buffer
 from articles.spam_detector import spam_detector
+from core.settings import config
+
+logger = logging.getLogger(__name__)
+
 
 @celery_app.task
 def handle_probable_spam_ratings():
+    # every task claims its own chunks, so extra tasks drain the backlog in parallel on other workers
+    for _ in range(config.SPAM_HANDLER_CONCURRENCY - 1):
+        drain_probable_spam_ratings.delay()
     spam_detector.handle_probable_spams()
+
+
+@celery_app.task
+def drain_probable_spam_ratings():
+    spam_detector.handle_probable_spams()
+
+
+@celery_app.task
+def flush_rating_buffer():
+    rating_buffer.flush(config.RATING_BUFFER_FLUSH_BATCH_SIZE)
+
+
+@celery_app.task
+def archive_spam_ratings():
+    archived_count = Rating.objects.archive_spam_ratings(
+        timezone.now() - datetime.timedelta(days=config.RATING_ARCHIVE_AGE_DAYS),
+        config.RATING_ARCHIVE_BATCH_SIZE,
+    )
+    logger.info('Archived spam ratings', extra={'archived_count': archived_count})
+
+
+@celery_app.task
+def prune_rating_rollups():
+    deleted_count = RatingRollup.objects.delete_buckets_before(
+        timezone.now() - datetime.timedelta(days=config.RATING_ROLLUP_RETENTION_DAYS)
+    )
+    logger.info('Pruned rating rollups', extra={'deleted_count': deleted_count})
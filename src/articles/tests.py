@@ -1,21 +1,53 @@
+import datetime
+import io
 import random
-from unittest.mock import patch
+import threading
+import time
+from importlib import import_module
+from unittest import skipIf
+from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
+import redis
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import caches
+from django.db import connection, models, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import authentication
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 
-from articles.models import Article, Rating
+from articles.burst_detector import RatingBurstDetector
+from articles.caches import articles_list_cache
+from articles.managers import ACCEPTABLE_SCORE_BAND_FIELDS, RATING_INFO_FIELDS, SCORE_COUNT_FIELDS
+from articles.models import AppliedRatingBufferBatch, Article, ArchivedRating, Rating, RatingRollup
 from articles.constants import RatingScores, RatingSpamStatus
 authentication.TokenAuthentication
+from articles.metrics import spam_handler_ratings, spam_handler_run_duration, spam_handler_stage_duration
+from articles.rating_buffer import RatingBuffer
+from articles.reconciliation import RatingInfoReconciler
+from articles.ingestion import CopyIngestor, read_records
+from articles.seeding import DataSeeder
+from articles.serializers import (
+    ArticleForListSerializer,
+    RatingSerializer,
+    article_for_list_compiled_serializer,
+    rating_compiled_serializer,
+)
 from articles.spam_detector import SpamDetector
-from articles.spam_handlers.normal_dist_spam_handler import NormalDistProbableSpamHandler
-from core.utils import calculate_new_normal_dist_info_with_new_data_points
+from articles.spam_handlers.normal_dist_spam_handler import NormalDistProbableSpamHandler, numpy
+from core.metrics import RedisMetric, metrics_registry
+from core.settings import config
+from core.testing import FakeAsyncRedis, FakeRedis
+from core.utils import (
+    calculate_new_normal_dist_info_with_data_update,
+    calculate_new_normal_dist_info_with_new_data_points,
+)
 
 deactivated_spam_detector = SpamDetector(
     False, 10, 2, None
@@ -54,6 +86,84 @@ class TestArticlesListView(APITestCase):
         self.assertEqual(data['results'][0]['id'], self.article2.id)
         self.assertEqual(data['results'][1]['id'], self.article1.id)
 
+    def test_api_call_should_return_cursor_paginated_articles_when_cursor_pagination_is_requested(self):
+        url = reverse('articles-list')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        response = self.client.get(url, data={'pagination': 'cursor'})
+        data = response.json()
+        self.assertNotIn('count', data)
+        self.assertEqual(data['results'][0]['id'], self.article2.id)
+        self.assertEqual(data['results'][1]['id'], self.article1.id)
+        self.assertEqual(data['results'][1]['user_rating'], self.rating.score)
+        self.assertIsNone(data['next'])
+        self.client.credentials()
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    @patch.object(articles_list_cache, 'is_active', True)
+    def test_api_call_should_return_cached_page_with_user_ratings_when_cache_is_active(self):
+        caches['default'].clear()
+        url = reverse('articles-list')
+        self.client.get(url)
+        Article.objects.filter(id=self.article2.id).update(title='changed')
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        data = self.client.get(url).json()
+        self.assertEqual(data['results'][0]['title'], 'article2')
+        self.assertEqual(data['results'][1]['user_rating'], self.rating.score)
+        self.client.credentials()
+
+        articles_list_cache.invalidate()
+        data = self.client.get(url).json()
+        self.assertEqual(data['results'][0]['title'], 'changed')
+        self.assertEqual(data['results'][1]['user_rating'], None)
+
+    @patch.object(config, 'ARTICLES_LIST_BODY_EXCERPT_LENGTH', 2)
+    def test_api_call_should_return_body_excerpt_when_excerpt_body_is_requested(self):
+        url = reverse('articles-list')
+        response = self.client.get(url, data={'body': 'excerpt'})
+        data = response.json()
+        self.assertNotIn('body', data['results'][0])
+        self.assertEqual(data['results'][0]['body_excerpt'], 'fo')
+        self.assertEqual(data['results'][0]['id'], self.article2.id)
+
+    def test_api_call_should_return_count_when_estimated_count_is_requested(self):
+        url = reverse('articles-list')
+        response = self.client.get(url, data={'count': 'estimated'})
+        data = response.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(len(data['results']), 2)
+
+
+class TestArticleDetailView(APITestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='user1')
+        self.article = Article.objects.create(title='article1', body='foo bar')
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.token = token.key
+        self.rating = Rating.objects.create(
+            score=RatingScores.TWO,
+            user=self.user,
+            article=self.article,
+            spam_status=RatingSpamStatus.NOT_SPAM
+        )
+
+    def test_api_call_should_return_article_with_full_body_and_user_rating(self):
+        url = reverse('article-detail', kwargs={'pk': self.article.id})
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(data['body'], 'foo bar')
+        self.assertEqual(data['user_rating'], self.rating.score)
+        self.assertNotIn('rating_square_sum', data)
+        self.client.credentials()
+
+    def test_api_call_should_return_404_status_code_when_article_does_not_exist(self):
+        url = reverse('article-detail', kwargs={'pk': self.article.id + 1})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 @patch('articles.views.spam_detector', deactivated_spam_detector)
 class TestRatingView(APITestCase):
@@ -130,6 +240,850 @@ class TestRatingView(APITestCase):
         self.assertEqual(self.article_with_rating.rating_count, 1)
         self.assertEqual(self.article_with_rating.rating_average, score)
 
+    @patch.object(config, 'RATING_WRITE_BEHIND_IS_ACTIVE', True)
+    @patch('articles.views.rating_buffer')
+    def test_api_call_should_buffer_rating_info_update_when_write_behind_is_active(self, mocked_rating_buffer):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        url = reverse('create-rating')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                url,
+                data={
+                    'score': 0,
+                    'article': self.article_with_rating.id
+                }
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mocked_rating_buffer.push_rating.assert_not_called()
+        for callback in callbacks:
+            callback()
+        self.rating.refresh_from_db()
+        mocked_rating_buffer.push_rating.assert_called_once_with(self.rating, self.initial_score)
+        self.article_with_rating.refresh_from_db()
+        self.assertEqual(self.article_with_rating.rating_average, self.initial_score)
+
+    @patch.object(config, 'RATING_WRITE_BEHIND_IS_ACTIVE', True)
+    @patch('articles.views.rating_buffer')
+    def test_api_call_should_keep_rating_and_log_when_buffering_fails_after_commit(self, mocked_rating_buffer):
+        mocked_rating_buffer.push_rating.side_effect = redis.ConnectionError()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        url = reverse('create-rating')
+        with self.assertLogs('django', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, data={'score': 1, 'article': self.article_without_rating.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Rating.objects.filter(article=self.article_without_rating).exists())
+
+@patch('articles.async_views.spam_detector', deactivated_spam_detector)
+class TestAsyncViews(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='user1')
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.headers = {'Authorization': 'Token ' + token.key}
+        self.article1 = Article.objects.create(title='article1', body='foo', rating_count=1, rating_average=RatingScores.TWO)
+        self.article2 = Article.objects.create(title='article2', body='foo bar')
+        self.rating = Rating.objects.create(
+            score=RatingScores.TWO,
+            user=self.user,
+            article=self.article1,
+            spam_status=RatingSpamStatus.NOT_SPAM
+        )
+
+    async def test_async_articles_list_should_return_same_content_as_articles_list(self):
+        response = await self.async_client.get(reverse('async-articles-list'), headers=self.headers)
+        expected_response = await self.async_client.get(reverse('articles-list'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.content.replace(b'/async/', b'/'),
+            expected_response.content,
+        )
+        self.assertEqual(response.json()['results'][1]['user_rating'], self.rating.score)
+
+    @patch('articles.paginations.ArticleCursorPagination.page_size', 1)
+    async def test_async_articles_list_should_return_same_content_as_articles_list_when_cursor_pagination_is_requested(self):
+        response = await self.async_client.get(
+            reverse('async-articles-list'), data={'pagination': 'cursor'}, headers=self.headers
+        )
+        expected_response = await self.async_client.get(
+            reverse('articles-list'), data={'pagination': 'cursor'}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content.replace(b'/async/', b'/'), expected_response.content)
+        self.assertEqual([a['id'] for a in response.json()['results']], [self.article2.id])
+
+        next_response = await self.async_client.get(response.json()['next'], headers=self.headers)
+        self.assertEqual([a['id'] for a in next_response.json()['results']], [self.article1.id])
+        self.assertEqual(next_response.json()['results'][0]['user_rating'], self.rating.score)
+        self.assertIsNone(next_response.json()['next'])
+        self.assertIsNotNone(next_response.json()['previous'])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    @patch.object(articles_list_cache, 'is_active', True)
+    async def test_async_articles_list_should_return_cached_page_with_user_ratings_when_cache_is_active(self):
+        await caches['default'].aclear()
+        url = reverse('async-articles-list')
+        await self.async_client.get(url)
+        await Article.objects.filter(id=self.article2.id).aupdate(title='changed')
+
+        data = (await self.async_client.get(url, headers=self.headers)).json()
+        self.assertEqual(data['results'][0]['title'], 'article2')
+        self.assertEqual(data['results'][1]['user_rating'], self.rating.score)
+
+        await articles_list_cache.ainvalidate()
+        data = (await self.async_client.get(url)).json()
+        self.assertEqual(data['results'][0]['title'], 'changed')
+        self.assertEqual(data['results'][1]['user_rating'], None)
+
+    async def test_async_articles_list_should_return_404_status_code_when_page_is_invalid(self):
+        response = await self.async_client.get(reverse('async-articles-list'), data={'page': 3})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_rating_should_return_401_status_code_when_user_is_not_authenticated(self):
+        response = await self.async_client.post(reverse('async-create-rating'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_async_rating_should_update_rating_when_user_has_previous_rating_on_article(self):
+        response = await self.async_client.post(
+            reverse('async-create-rating'),
+            data={'score': 4, 'article': self.article1.id},
+            content_type='application/json',
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['rating']['id'], self.rating.id)
+        await self.rating.arefresh_from_db()
+        self.assertEqual(self.rating.score, 4)
+
+    async def test_async_rating_should_update_article_rating_info_when_rating_is_new(self):
+        with patch.object(config, 'RATING_ROLLUP_IS_ACTIVE', True):
+            response = await self.async_client.post(
+                reverse('async-create-rating'),
+                data={'score': 4, 'article': self.article2.id},
+                content_type='application/json',
+                headers=self.headers,
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        await self.article2.arefresh_from_db()
+        self.assertEqual((self.article2.rating_count, self.article2.rating_average), (1, 4))
+        self.assertEqual(self.article2.score_count_4, 1)
+        self.assertTrue(await RatingRollup.objects.filter(article=self.article2, score_count_4=1).aexists())
+
+    async def test_async_rating_should_buffer_rating_when_write_behind_is_active(self):
+        async_redis_client = FakeAsyncRedis()
+        buffer = RatingBuffer(MagicMock(), key='rating_buffer', async_redis_client=async_redis_client)
+        with patch('articles.async_views.rating_buffer', buffer), \
+                patch.object(config, 'RATING_WRITE_BEHIND_IS_ACTIVE', True):
+            response = await self.async_client.post(
+                reverse('async-create-rating'),
+                data={'score': 4, 'article': self.article1.id},
+                content_type='application/json',
+                headers=self.headers,
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(await async_redis_client.lrange('rating_buffer', 0, -1), [f'{self.article1.id}:0:4:2'.encode()])
+        await self.article1.arefresh_from_db()
+        self.assertEqual(self.article1.rating_average, RatingScores.TWO)
+
+    async def test_async_rating_should_mark_rating_as_probable_spam_when_article_is_in_burst(self):
+        burst_detector = RatingBurstDetector(async_redis_client=FakeAsyncRedis(), min_count=0, user_limit=0)
+        with patch('articles.async_views.spam_detector', SpamDetector(True, 100, 2, None, burst_detector)):
+            response = await self.async_client.post(
+                reverse('async-create-rating'),
+                data={'score': 4, 'article': self.article2.id},
+                content_type='application/json',
+                headers=self.headers,
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rating = await Rating.objects.aget(article=self.article2)
+        self.assertEqual(rating.spam_status, RatingSpamStatus.PROBABLE_SPAM)
+
+    async def test_async_rating_should_return_400_status_code_when_article_does_not_exist(self):
+        response = await self.async_client.post(
+            reverse('async-create-rating'),
+            data={'score': 4, 'article': self.article2.id + 1},
+            content_type='application/json',
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('article', response.json())
+
+
+class TestRatingManager(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='user1')
+        self.initial_values = [1, 4, 5, 2, 3]
+        self.article = Article.objects.create(title='article1', body='foo')
+        self.article.update_rating_info_with_new_scores(self.initial_values)
+        self.article.refresh_from_db()
+
+    def test_upsert_user_rating_should_create_rating_and_update_article_rating_info(self):
+        rating, old_score = Rating.objects.upsert_user_rating(
+            self.user, self.article, 0, RatingSpamStatus.NOT_SPAM
+        )
+        self.assertIsNone(old_score)
+        self.assertEqual(rating, Rating.objects.get(user=self.user, article=self.article))
+        self.assertEqual(rating.score, 0)
+
+        expected_average, expected_square_sum, expected_count = calculate_new_normal_dist_info_with_new_data_points(
+            self.article.rating_average, self.article.rating_square_sum, self.article.rating_count, [0]
+        )
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, expected_count)
+        self.assertAlmostEqual(self.article.rating_average, expected_average, 6)
+        self.assertAlmostEqual(self.article.rating_square_sum, expected_square_sum, 3)
+
+    def test_upsert_user_rating_should_update_score_and_keep_spam_status_of_existing_rating(self):
+        existing_rating, _ = Rating.objects.upsert_user_rating(
+            self.user, self.article, 5, RatingSpamStatus.NOT_SPAM
+        )
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.score_count_5, 1)
+        rating, old_score = Rating.objects.upsert_user_rating(
+            self.user, self.article, 2, RatingSpamStatus.PROBABLE_SPAM
+        )
+        self.assertEqual(old_score, 5)
+        self.assertEqual(rating.id, existing_rating.id)
+        self.assertEqual(rating.spam_status, RatingSpamStatus.NOT_SPAM)
+
+        expected_average, expected_square_sum = calculate_new_normal_dist_info_with_data_update(
+            self.article.rating_average, self.article.rating_square_sum, self.article.rating_count, 2, 5
+        )
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, len(self.initial_values) + 1)
+        self.assertAlmostEqual(self.article.rating_average, expected_average, 6)
+        self.assertAlmostEqual(self.article.rating_square_sum, expected_square_sum, 3)
+        self.assertEqual(self.article.score_count_5, 0)
+        self.assertEqual(self.article.score_count_2, 1)
+
+    def test_upsert_user_rating_should_update_acceptable_score_band(self):
+        Rating.objects.upsert_user_rating(
+            self.user, self.article, 5, RatingSpamStatus.NOT_SPAM
+        )
+        self.article.refresh_from_db()
+        acceptable_score_band = (self.article.acceptable_score_low, self.article.acceptable_score_high)
+        self.article.update_acceptable_score_band()
+        self.assertEqual(
+            acceptable_score_band,
+            (self.article.acceptable_score_low, self.article.acceptable_score_high)
+        )
+
+    def test_get_ratings_out_of_acceptable_score_band_should_return_ratings_out_of_band(self):
+        Article.objects.filter(id=self.article.id).update(acceptable_score_low=2, acceptable_score_high=4)
+        in_band_rating = Rating.objects.create(
+            user=self.user, article=self.article, score=3, spam_status=RatingSpamStatus.NOT_SPAM
+        )
+        out_of_band_rating = Rating.objects.create(
+            user=User.objects.create(username='user2'), article=self.article, score=5, spam_status=RatingSpamStatus.NOT_SPAM
+        )
+        ratings = list(Rating.objects.get_ratings_out_of_acceptable_score_band())
+        self.assertIn(out_of_band_rating, ratings)
+        self.assertNotIn(in_band_rating, ratings)
+
+    def test_upsert_user_rating_should_not_update_article_rating_info_when_rating_is_probable_spam(self):
+        Rating.objects.upsert_user_rating(
+            self.user, self.article, 0, RatingSpamStatus.PROBABLE_SPAM
+        )
+        rating_count = self.article.rating_count
+        rating_average = self.article.rating_average
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, rating_count)
+        self.assertEqual(self.article.rating_average, rating_average)
+        self.assertEqual(self.article.score_count_0, 1)
+
+    def test_archive_spam_ratings_should_move_old_spam_ratings_in_batches(self):
+        statuses = [RatingSpamStatus.SPAM] * 3 + [RatingSpamStatus.NOT_SPAM, RatingSpamStatus.PROBABLE_SPAM]
+        ratings = [
+            Rating.objects.create(
+                user=User.objects.create(username=f'archive_user{i}'), article=self.article, score=0, spam_status=spam_status
+            )
+            for i, spam_status in enumerate(statuses)
+        ]
+        recent_spam_rating = Rating.objects.create(
+            user=self.user, article=self.article, score=0, spam_status=RatingSpamStatus.SPAM
+        )
+        updated_before = timezone.now()
+        Rating.objects.filter(id=recent_spam_rating.id).update(updated_at=updated_before + datetime.timedelta(days=1))
+
+        with patch.object(Rating.objects, 'archive_spam_ratings_batch', wraps=Rating.objects.archive_spam_ratings_batch) as batch:
+            self.assertEqual(Rating.objects.archive_spam_ratings(updated_before, 2), 3)
+        self.assertEqual(batch.call_count, 3)
+
+        archived_ids = set(ArchivedRating.objects.values_list('id', flat=True))
+        self.assertEqual(archived_ids, {rating.id for rating in ratings[:3]})
+        self.assertFalse(Rating.objects.filter(id__in=archived_ids).exists())
+        self.assertEqual(Rating.objects.filter(article=self.article).count(), 3)
+
+    def test_rebuild_rating_info_should_count_archived_ratings_in_score_counts(self):
+        Rating.objects.create(user=self.user, article=self.article, score=0, spam_status=RatingSpamStatus.SPAM)
+        Rating.objects.create(
+            user=User.objects.create(username='user2'), article=self.article, score=4, spam_status=RatingSpamStatus.NOT_SPAM
+        )
+        Rating.objects.archive_spam_ratings(timezone.now(), 10)
+
+        Article.objects.rebuild_rating_info([self.article.id])
+
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, 1)
+        self.assertEqual(self.article.score_count_0, 1)
+        self.assertEqual(self.article.score_count_4, 1)
+
+
+class TestUpsertUserRatingConcurrency(TransactionTestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='user1')
+        self.article = Article.objects.create(title='article1', body='foo')
+
+    def upsert_in_other_transaction(self, score, upserted):
+        try:
+            with transaction.atomic():
+                Rating.objects.upsert_user_rating(self.user, self.article, score, RatingSpamStatus.NOT_SPAM)
+                upserted.set()
+                # the other upsert blocks on the rating until this commits
+                time.sleep(0.5)
+        finally:
+            connection.close()
+
+    def upsert_concurrently(self, other_score, score):
+        upserted = threading.Event()
+        thread = threading.Thread(target=self.upsert_in_other_transaction, args=(other_score, upserted))
+        thread.start()
+        try:
+            self.assertTrue(upserted.wait(10))
+            return Rating.objects.upsert_user_rating(self.user, self.article, score, RatingSpamStatus.NOT_SPAM)
+        finally:
+            thread.join()
+
+    def assert_article_has_single_score(self, score):
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, 1)
+        self.assertEqual(self.article.rating_average, score)
+        self.assertEqual(self.article.rating_square_sum, 0)
+        self.assertEqual(
+            [self.article.get_score_count(s) for s in RatingScores.values],
+            [1 if s == score else 0 for s in RatingScores.values]
+        )
+
+    def test_upsert_user_rating_should_update_rating_inserted_concurrently(self):
+        rating, old_score = self.upsert_concurrently(1, 4)
+
+        self.assertEqual(old_score, 1)
+        self.assertEqual(Rating.objects.get(id=rating.id).score, 4)
+        self.assert_article_has_single_score(4)
+
+    def test_upsert_user_rating_should_apply_update_to_score_updated_concurrently(self):
+        Rating.objects.upsert_user_rating(self.user, self.article, 2, RatingSpamStatus.NOT_SPAM)
+
+        rating, old_score = self.upsert_concurrently(1, 4)
+
+        self.assertEqual(old_score, 1)
+        self.assert_article_has_single_score(4)
+
+@patch('articles.views.spam_detector', deactivated_spam_detector)
+class TestRatingBatchView(APITestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='user1')
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.token = token.key
+
+        self.article_without_rating = Article.objects.create(title='article2', body='foo')
+        self.initial_score = RatingScores.TWO
+        self.article_with_rating = Article.objects.create(
+            title='article1',
+            body='foo',
+            rating_count=1,
+            rating_average=self.initial_score,
+            rating_square_sum=0.0
+        )
+        self.rating = Rating.objects.create(
+            score=self.initial_score,
+            user=self.user,
+            article=self.article_with_rating,
+            spam_status=RatingSpamStatus.NOT_SPAM
+        )
+
+    def test_api_call_should_return_401_status_code_when_user_is_not_authenticated(self):
+        url = reverse('create-ratings-batch')
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_api_call_should_create_and_update_ratings_and_return_results_in_order(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        url = reverse('create-ratings-batch')
+        missing_article_id = self.article_with_rating.id + self.article_without_rating.id
+        response = self.client.post(
+            url,
+            data={'ratings': [
+                {'article': self.article_without_rating.id, 'score': 1},
+                {'article': missing_article_id, 'score': 3},
+                {'article': self.article_with_rating.id, 'score': 4},
+                {'article': self.article_without_rating.id, 'score': 3},
+            ]},
+            format='json'
+        )
+        data = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = data['results']
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['rating']['article'], self.article_without_rating.id)
+        self.assertEqual(results[1]['article'], missing_article_id)
+        self.assertIn('article', results[1]['errors'])
+        self.assertEqual(results[2]['rating']['id'], self.rating.id)
+        self.assertEqual(results[3]['rating']['id'], results[0]['rating']['id'])
+
+        new_rating = Rating.objects.get(id=results[0]['rating']['id'])
+        self.assertEqual(new_rating.score, 3)
+        self.rating.refresh_from_db()
+        self.assertEqual(self.rating.score, 4)
+
+        self.article_without_rating.refresh_from_db()
+        self.assertEqual(self.article_without_rating.rating_count, 1)
+        self.assertEqual(self.article_without_rating.rating_average, 3)
+        self.article_with_rating.refresh_from_db()
+        self.assertEqual(self.article_with_rating.rating_count, 1)
+        self.assertEqual(self.article_with_rating.rating_average, 4)
+
+    def test_api_call_should_pass_updated_ratings_to_spam_detector_and_keep_their_spam_status(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        mocked_spam_detector = MagicMock()
+        mocked_spam_detector.get_spam_status_for_article_score.return_value = RatingSpamStatus.PROBABLE_SPAM
+        with patch('articles.views.spam_detector', mocked_spam_detector):
+            response = self.client.post(
+                reverse('create-ratings-batch'),
+                data={'ratings': [
+                    {'article': self.article_with_rating.id, 'score': 4},
+                    {'article': self.article_without_rating.id, 'score': 1},
+                ]},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mocked_spam_detector.get_spam_status_for_article_score.call_count, 2)
+        mocked_spam_detector.get_spam_status_for_article_score.assert_any_call(
+            4, self.article_with_rating, self.user.id
+        )
+        self.rating.refresh_from_db()
+        self.assertEqual(self.rating.score, 4)
+        self.assertEqual(self.rating.spam_status, RatingSpamStatus.NOT_SPAM)
+        new_rating = Rating.objects.get(article=self.article_without_rating)
+        self.assertEqual(new_rating.spam_status, RatingSpamStatus.PROBABLE_SPAM)
+
+    def test_api_call_should_return_400_status_code_when_batch_is_empty(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+        url = reverse('create-ratings-batch')
+        response = self.client.post(url, data={'ratings': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+@patch('articles.views.spam_detector', deactivated_spam_detector)
+class TestRatingBatchViewConcurrency(TransactionTestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='user1')
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        self.article = Article.objects.create(title='article1', body='foo')
+
+    def test_api_call_should_update_rating_inserted_by_concurrent_request(self):
+        inserted = threading.Event()
+
+        def insert_in_other_transaction():
+            try:
+                with transaction.atomic():
+                    Rating.objects.upsert_user_rating(self.user, self.article, 1, RatingSpamStatus.NOT_SPAM)
+                    inserted.set()
+                    # the batch blocks on the unique index until this commits
+                    time.sleep(0.5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=insert_in_other_transaction)
+        thread.start()
+        try:
+            self.assertTrue(inserted.wait(10))
+            response = self.client.post(
+                reverse('create-ratings-batch'),
+                data={'ratings': [{'article': self.article.id, 'score': 4}]},
+                format='json'
+            )
+        finally:
+            thread.join()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rating = Rating.objects.get(user=self.user, article=self.article)
+        self.assertEqual(rating.score, 4)
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, 1)
+        self.assertEqual(self.article.rating_average, 4)
+        self.assertEqual(
+            [self.article.get_score_count(score) for score in RatingScores.values],
+            [0, 0, 0, 0, 1, 0]
+        )
+
+class TestCompiledSerializers(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='user1')
+        self.article = Article.objects.create(title='article1', body='foo', rating_average=3.3333333333333335)
+        self.rating = Rating.objects.create(
+            score=RatingScores.TWO,
+            user=self.user,
+            article=self.article,
+            spam_status=RatingSpamStatus.NOT_SPAM
+        )
+
+    def test_serialize_rows_should_return_same_data_as_article_for_list_serializer(self):
+        rows = Article.objects.values(*article_for_list_compiled_serializer.values_fields)
+        self.assertEqual(
+            article_for_list_compiled_serializer.serialize_rows(rows),
+            [dict(a) for a in ArticleForListSerializer(Article.objects.all(), many=True).data],
+        )
+        self.assertEqual(
+            list(article_for_list_compiled_serializer.serialize_rows(rows)[0]),
+            list(ArticleForListSerializer(self.article).data),
+        )
+
+    def test_serialize_instance_should_return_same_data_as_rating_serializer(self):
+        rating = Rating.objects.get(id=self.rating.id)
+        self.assertEqual(
+            list(rating_compiled_serializer.serialize_instance(rating).items()),
+            list(RatingSerializer(rating).data.items()),
+        )
+
+
+class TestDataSeeder(TestCase):
+
+    def test_seed_should_create_ratings_consistent_with_article_rating_info(self):
+        counts = DataSeeder(batch_size=50, seed=1).seed(
+            articles_count=3,
+            users_count=40,
+            ratings_count=100,
+            spam_burst_count=2,
+            spam_burst_size=5,
+        )
+        self.assertEqual(counts, {'users': 40, 'articles': 3, 'ratings': 100, 'spam_burst_ratings': 10})
+        self.assertEqual(Rating.objects.count(), 110)
+        for article in Article.objects.all():
+            scores = list(article.rating_set.filter(spam_status=RatingSpamStatus.NOT_SPAM).values_list('score', flat=True))
+            all_scores = list(article.rating_set.values_list('score', flat=True))
+            self.assertEqual(article.rating_count, len(scores))
+            self.assertAlmostEqual(article.rating_average, sum(scores) / len(scores))
+            for score in RatingScores.values:
+                self.assertEqual(article.get_score_count(score), all_scores.count(score))
+
+
+class TestCopyIngestor(TestCase):
+
+    def setUp(self) -> None:
+        self.users = [User.objects.create(username=f'user{i}') for i in range(3)]
+        self.ingestor = CopyIngestor(chunk_size=2)
+
+    def test_ingest_articles_should_load_articles_with_given_ids(self):
+        records = read_records(io.StringIO(
+            '{"id": 1000, "title": "article1", "body": "foo", "created_at": "2020-01-01T00:00:00Z"}\n'
+            '{"id": 1001, "title": "article2", "body": "bar"}\n'
+            '{"id": 1002, "title": "article3", "body": "baz"}\n'
+        ), 'jsonl')
+        self.assertEqual(self.ingestor.ingest_articles(records), 3)
+        self.assertEqual(Article.objects.get(id=1000).created_at.year, 2020)
+        self.assertGreater(Article.objects.create(title='article4', body='foo').id, 1002)
+
+    def test_ingest_articles_should_reject_records_with_and_without_ids(self):
+        records = read_records(io.StringIO(
+            'id,title,body\n'
+            '1000,article1,foo\n'
+            '1001,article2,bar\n'
+            ',article3,baz\n'
+        ), 'csv')
+        with self.assertRaisesMessage(ValueError, 'Article record 3 has no id'):
+            self.ingestor.ingest_articles(records)
+        self.assertEqual(list(Article.objects.values_list('id', flat=True).order_by('id')), [1000, 1001])
+        self.assertGreater(Article.objects.create(title='article4', body='foo').id, 1001)
+
+    def test_ingest_ratings_should_skip_existing_ratings_and_missing_articles(self):
+        article = Article.objects.create(title='article1', body='foo')
+        Rating.objects.create(user=self.users[0], article=article, score=1, spam_status=RatingSpamStatus.NOT_SPAM)
+        records = read_records(io.StringIO(
+            'user_id,article_id,score,spam_status\n'
+            f'{self.users[0].id},{article.id},5,\n'
+            f'{self.users[1].id},{article.id},4,\n'
+            f'{self.users[2].id},{article.id},0,{RatingSpamStatus.PROBABLE_SPAM}\n'
+            f'{self.users[2].id},{article.id + 1},3,\n'
+        ), 'csv')
+        loaded_count, skipped_count, article_ids = self.ingestor.ingest_ratings(records)
+        self.assertEqual((loaded_count, skipped_count, article_ids), (2, 2, {article.id}))
+        self.assertEqual(Rating.objects.get(user=self.users[0]).score, 1)
+        self.assertEqual(Rating.objects.get(user=self.users[1]).spam_status, RatingSpamStatus.NOT_SPAM)
+
+        Article.objects.rebuild_rating_info(list(article_ids))
+        article.refresh_from_db()
+        self.assertEqual(article.rating_count, 2)
+        self.assertEqual(article.rating_average, 2.5)
+        self.assertAlmostEqual(article.rating_square_sum, 4.5)
+        self.assertEqual(
+            [article.get_score_count(score) for score in RatingScores.values],
+            [1, 1, 0, 0, 1, 0],
+        )
+
+    def test_rebuild_rating_info_should_match_incrementally_updated_rating_info(self):
+        DataSeeder(seed=2).seed(articles_count=3, users_count=30, ratings_count=60, spam_burst_count=1, spam_burst_size=10)
+        fields = [*RATING_INFO_FIELDS, *SCORE_COUNT_FIELDS, *ACCEPTABLE_SCORE_BAND_FIELDS]
+        expected = {a['id']: a for a in Article.objects.values('id', *fields)}
+        self.assertEqual(Article.objects.rebuild_rating_info(), 3)
+        for article in Article.objects.values('id', *fields):
+            for field in fields:
+                self.assertAlmostEqual(article[field], expected[article['id']][field])
+
+
+class TestRatingInfoReconciler(TestCase):
+
+    def setUp(self) -> None:
+        users = [User.objects.create(username=f'user{i}') for i in range(3)]
+        self.articles = [Article.objects.create(title=f'article{i}', body='foo') for i in range(5)]
+        for article in self.articles:
+            for user, score in zip(users, [1, 3, 5]):
+                Rating.objects.create(user=user, article=article, score=score, spam_status=RatingSpamStatus.NOT_SPAM)
+            Rating.objects.create(
+                user=User.objects.create(username=f'spammer{article.id}'), article=article, score=0,
+                spam_status=RatingSpamStatus.SPAM,
+            )
+        Article.objects.rebuild_rating_info()
+        self.drifted_article = self.articles[3]
+        Article.objects.filter(id=self.drifted_article.id).update(rating_count=4, rating_average=2.25)
+
+    def test_reconcile_should_report_drifted_articles_only(self):
+        drifts = []
+        summary = RatingInfoReconciler(chunk_size=2).reconcile(on_drift=drifts.append)
+
+        self.assertEqual(summary['chunks'], 3)
+        self.assertEqual(summary['drifted_count'], 1)
+        self.assertEqual(summary['fixed_count'], 0)
+        self.assertEqual(drifts, [{
+            'id': self.drifted_article.id,
+            'stored': {'rating_count': 4, 'rating_average': 2.25, 'rating_square_sum': 8.0},
+            'actual': {'rating_count': 3, 'rating_average': 3.0, 'rating_square_sum': 8.0},
+        }])
+        self.assertEqual(summary['max_drift']['rating_average'], 0.75)
+        self.drifted_article.refresh_from_db()
+        self.assertEqual(self.drifted_article.rating_count, 4)
+
+    def test_reconcile_should_fix_drifted_articles_when_fix_is_set(self):
+        summary = RatingInfoReconciler(chunk_size=2, fix=True).reconcile()
+
+        self.assertEqual(summary['fixed_count'], 1)
+        self.drifted_article.refresh_from_db()
+        self.assertEqual(self.drifted_article.rating_count, 3)
+        self.assertAlmostEqual(self.drifted_article.rating_average, 3.0)
+        self.assertEqual(RatingInfoReconciler(chunk_size=2).reconcile()['drifted_count'], 0)
+
+
+    def test_iter_rating_info_drifts_should_page_by_id_when_server_side_cursors_are_disabled(self):
+        Article.objects.update(rating_count=4)
+        article_ids = [article.id for article in self.articles]
+
+        with patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+            with CaptureQueriesContext(connection) as queries:
+                drifts = list(Article.objects.iter_rating_info_drifts(article_ids[0], article_ids[-1] + 1, 1e-6, page_size=2))
+
+        self.assertEqual([drift['id'] for drift in drifts], article_ids)
+        self.assertEqual(len(queries.captured_queries), 3)
+
+@patch.object(config, 'RATING_ROLLUP_IS_ACTIVE', True)
+class TestRatingRollupManager(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(username='user1')
+        self.article = Article.objects.create(title='article1', body='foo')
+        self.other_article = Article.objects.create(title='article2', body='foo')
+
+    def test_add_scores_should_count_scores_in_bucket_and_answer_window_queries(self):
+        now = timezone.now()
+        RatingRollup.objects.add_scores({self.article.id: [1, 3], self.other_article.id: [5]}, now)
+        RatingRollup.objects.add_scores({self.article.id: [3]}, now)
+        RatingRollup.objects.add_scores({self.article.id: [0, 0, 0]}, now - datetime.timedelta(days=1))
+
+        self.assertEqual(RatingRollup.objects.filter(article=self.article).count(), 2)
+        score_counts = RatingRollup.objects.get_window_score_counts(
+            [self.article.id, self.other_article.id], now - datetime.timedelta(minutes=1)
+        )
+        self.assertEqual(score_counts, {self.article.id: [0, 1, 0, 2, 0, 0], self.other_article.id: [0, 0, 0, 0, 0, 1]})
+        mean, variance, count = RatingRollup.objects.get_window_normal_dist_info(
+            [self.article.id], now - datetime.timedelta(days=2)
+        )[self.article.id]
+        self.assertEqual(count, 6)
+        self.assertAlmostEqual(mean, 7 / 6)
+
+    def test_add_scores_should_not_write_when_rollups_are_not_active(self):
+        with patch.object(config, 'RATING_ROLLUP_IS_ACTIVE', False):
+            RatingRollup.objects.add_scores({self.article.id: [1]})
+        self.assertFalse(RatingRollup.objects.exists())
+
+    def test_rating_writes_should_add_not_spam_scores_to_rollups(self):
+        Rating.objects.upsert_user_rating(self.user, self.article, 4, RatingSpamStatus.NOT_SPAM)
+        Rating.objects.upsert_user_rating(
+            User.objects.create(username='user2'), self.article, 0, RatingSpamStatus.PROBABLE_SPAM
+        )
+        Article.objects.bulk_update_rating_info_with_changes([
+            (self.article.id, RatingSpamStatus.NOT_SPAM, 2, None),
+            (self.article.id, RatingSpamStatus.PROBABLE_SPAM, 0, None),
+        ])
+
+        score_counts = RatingRollup.objects.get_window_score_counts([self.article.id], timezone.now())
+        self.assertEqual(score_counts[self.article.id], [0, 0, 1, 0, 1, 0])
+
+    def test_rating_updates_should_not_be_counted_again_in_rollups(self):
+        Rating.objects.upsert_user_rating(self.user, self.article, 4, RatingSpamStatus.NOT_SPAM)
+        Rating.objects.upsert_user_rating(self.user, self.article, 1, RatingSpamStatus.NOT_SPAM)
+        Article.objects.bulk_update_rating_info_with_changes([
+            (self.article.id, RatingSpamStatus.NOT_SPAM, 2, 1),
+        ])
+
+        score_counts = RatingRollup.objects.get_window_score_counts([self.article.id], timezone.now())
+        self.assertEqual(score_counts[self.article.id], [0, 0, 0, 0, 1, 0])
+
+    def test_add_ratings_should_add_ratings_to_buckets_they_were_created_in(self):
+        rating = Rating.objects.create(
+            user=self.user, article=self.article, score=5, spam_status=RatingSpamStatus.NOT_SPAM
+        )
+        created_at = timezone.now() - datetime.timedelta(days=1)
+        Rating.objects.filter(id=rating.id).update(created_at=created_at)
+
+        RatingRollup.objects.add_ratings([rating.id])
+
+        rollup = RatingRollup.objects.get(article=self.article)
+        self.assertEqual(rollup.bucket_start, RatingRollup.objects.get_bucket_start(created_at))
+        self.assertEqual(rollup.score_count_5, 1)
+
+    def test_spam_handler_should_compare_scores_to_recent_window_when_it_has_enough_ratings(self):
+        self.article.update_rating_info_with_new_scores([0, 5, 0, 5])
+        self.article.refresh_from_db()
+        rating = Rating.objects.create(
+            user=self.user, article=self.article, score=1, spam_status=RatingSpamStatus.PROBABLE_SPAM
+        )
+        ratings = list(Rating.objects.get_probable_spam_ratings())
+        RatingRollup.objects.add_scores({self.article.id: [2, 4]})
+
+        distributions = NormalDistProbableSpamHandler(0.1, recent_window=3600).get_reference_distributions(ratings)
+        self.assertEqual(distributions[rating.article_id], (3.0, 1.0))
+
+        distributions = NormalDistProbableSpamHandler(
+            0.1, recent_window=3600, min_window_count=3
+        ).get_reference_distributions(ratings)
+        self.assertEqual(distributions[rating.article_id], (2.5, 6.25))
+
+
+class TestRatingBuffer(TestCase):
+
+    def setUp(self) -> None:
+        self.initial_average = 3.0
+        self.initial_count = 10
+        self.initial_square_sum = 20.0
+        self.article = Article.objects.create(
+            title='article1',
+            body='foo',
+            rating_count=self.initial_count,
+            rating_average=self.initial_average,
+            rating_square_sum=self.initial_square_sum
+        )
+
+    def test_parse_entries_should_return_new_and_updated_rating_changes(self):
+        entries = [b'1:0:3', b'2:1:4:1']
+        rating_changes = RatingBuffer.parse_entries(entries)
+        self.assertEqual(rating_changes, [
+            (1, RatingSpamStatus.NOT_SPAM, 3, None),
+            (2, RatingSpamStatus.PROBABLE_SPAM, 4, 1),
+        ])
+
+    def make_redis_client(self, batch_entries, processing_batch=(None, [])):
+        redis_client = MagicMock()
+        redis_client.pipeline.return_value.execute.side_effect = [
+            list(processing_batch),
+            [True] + batch_entries + [None] * (10 - len(batch_entries)),
+            [True] + [None] * 10,
+        ]
+        return redis_client
+
+    def test_flush_should_apply_buffered_rating_changes_to_articles(self):
+        # the updated rating, buffered when it was created with a score of 4
+        Rating.objects.upsert_user_rating(
+            User.objects.create(username='user1'), self.article, 4, RatingSpamStatus.NOT_SPAM
+        )
+        self.article.refresh_from_db()
+        redis_client = self.make_redis_client([
+            RatingBuffer.make_entry(self.article.id, RatingSpamStatus.NOT_SPAM, 5).encode(),
+            RatingBuffer.make_entry(self.article.id, RatingSpamStatus.NOT_SPAM, 1, 4).encode(),
+            RatingBuffer.make_entry(self.article.id, RatingSpamStatus.PROBABLE_SPAM, 0).encode(),
+        ])
+        rating_buffer = RatingBuffer(redis_client)
+
+        applied_count = rating_buffer.flush(batch_size=10)
+
+        expected_average, expected_square_sum, expected_count = calculate_new_normal_dist_info_with_new_data_points(
+            self.article.rating_average, self.article.rating_square_sum, self.article.rating_count, [5]
+        )
+        expected_average, expected_square_sum = calculate_new_normal_dist_info_with_data_update(
+            expected_average, expected_square_sum, expected_count, 1, 4
+        )
+        self.assertEqual(applied_count, 3)
+        redis_client.delete.assert_called_once_with(rating_buffer.processing_key, rating_buffer.batch_id_key)
+        self.assertFalse(AppliedRatingBufferBatch.objects.exists())
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, expected_count)
+        self.assertEqual(self.article.rating_average, expected_average)
+        self.assertAlmostEqual(self.article.rating_square_sum, expected_square_sum, 3)
+        self.assertEqual(
+            [self.article.get_score_count(score) for score in RatingScores.values],
+            [1, 1, 0, 0, 0, 1]
+        )
+
+    def test_flush_should_keep_failed_batch_in_processing_list(self):
+        entries = [RatingBuffer.make_entry(self.article.id, RatingSpamStatus.NOT_SPAM, 1).encode()]
+        redis_client = self.make_redis_client(entries)
+        rating_buffer = RatingBuffer(redis_client)
+
+        with patch.object(Article.objects, 'bulk_update_rating_info_with_changes', side_effect=ValueError()):
+            with self.assertRaises(ValueError):
+                rating_buffer.flush(batch_size=10)
+
+        redis_client.delete.assert_not_called()
+        redis_client.lock.return_value.release.assert_called_once()
+        self.assertFalse(AppliedRatingBufferBatch.objects.exists())
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, self.initial_count)
+
+    def test_flush_should_apply_batch_of_crashed_flush_once(self):
+        entries = [RatingBuffer.make_entry(self.article.id, RatingSpamStatus.NOT_SPAM, 5).encode()]
+        redis_client = self.make_redis_client([], processing_batch=(b'batch1', entries))
+        rating_buffer = RatingBuffer(redis_client)
+
+        self.assertEqual(rating_buffer.flush(batch_size=10), 1)
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, self.initial_count + 1)
+
+        # crashed after the batch was committed and before it was acknowledged
+        AppliedRatingBufferBatch.objects.create(id='batch1')
+        redis_client = self.make_redis_client([], processing_batch=(b'batch1', entries))
+        with self.assertLogs('articles.rating_buffer', 'WARNING'):
+            self.assertEqual(RatingBuffer(redis_client).flush(batch_size=10), 0)
+
+        redis_client.delete.assert_called_once_with(rating_buffer.processing_key, rating_buffer.batch_id_key)
+        self.assertFalse(AppliedRatingBufferBatch.objects.exists())
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.rating_count, self.initial_count + 1)
+
+    def test_flush_should_do_nothing_when_another_flush_is_running(self):
+        redis_client = self.make_redis_client([])
+        redis_client.lock.return_value.acquire.return_value = False
+
+        self.assertEqual(RatingBuffer(redis_client).flush(batch_size=10), 0)
+        redis_client.pipeline.assert_not_called()
+
 
 class TestSpamDetector(TestCase):
 
@@ -159,10 +1113,164 @@ class TestSpamDetector(TestCase):
         spam_status = self.spam_detector.get_spam_status_for_score(0, 101, 4.5, 0)
         self.assertEqual(spam_status, RatingSpamStatus.NOT_SPAM)
 
+    @patch.object(config, 'SPAM_RATE_ZSCORE_BOUND', 2)
+    def test_get_spam_status_for_article_score_should_match_get_spam_status_for_score(self):
+        for rating_count, mean, variance in [(101, 4.5, 4), (101, 4.5, 0), (99, 4.5, 4), (150, 2.5, 0.3), (200, 3.1, 1.7)]:
+            article = Article(
+                rating_count=rating_count,
+                rating_average=mean,
+                rating_square_sum=variance * rating_count,
+            )
+            article.update_acceptable_score_band()
+            for normal_zscore_bound in [2, 1]:
+                self.spam_detector.normal_zscore_bound = normal_zscore_bound
+                for score in RatingScores.values:
+                    self.assertEqual(
+                        self.spam_detector.get_spam_status_for_article_score(score, article),
+                        self.spam_detector.get_spam_status_for_score(score, rating_count, mean, variance),
+                    )
+
+    @patch.object(config, 'SPAM_RATE_ZSCORE_BOUND', 1)
+    def test_acceptable_score_band_migration_should_use_configured_zscore_bound(self):
+        article = Article.objects.create(title='article1', body='foo')
+        article.update_rating_info_with_new_scores([1, 2, 3, 4, 5])
+        Article.objects.filter(id=article.id).update(acceptable_score_low=0, acceptable_score_high=5)
+
+        migration = import_module('articles.migrations.0005_article_acceptable_score_band')
+        with connection.schema_editor() as schema_editor:
+            migration.refresh_acceptable_score_bands(None, schema_editor)
+
+        article.refresh_from_db()
+        band = (article.acceptable_score_low, article.acceptable_score_high)
+        article.update_acceptable_score_band()
+        self.assertEqual(band, (2, 4))
+        self.assertEqual(band, (article.acceptable_score_low, article.acceptable_score_high))
+
+
+class TestClaimProbableSpamRatings(TransactionTestCase):
+
+    def setUp(self) -> None:
+        article = Article.objects.create(title='article1', body='foo')
+        self.ratings = [
+            Rating.objects.create(
+                user=User.objects.create(username=f'user{i}'), article=article, score=0,
+                spam_status=RatingSpamStatus.PROBABLE_SPAM,
+            )
+            for i in range(6)
+        ]
+
+    def test_claim_probable_spam_ratings_should_skip_ratings_claimed_by_other_transactions(self):
+        claimed = threading.Event()
+        release = threading.Event()
+        other_claimed_ids = []
+
+        def claim_in_other_transaction():
+            try:
+                with transaction.atomic():
+                    other_claimed_ids.extend(r.id for r in Rating.objects.claim_probable_spam_ratings(4))
+                    claimed.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=claim_in_other_transaction)
+        thread.start()
+        try:
+            self.assertTrue(claimed.wait(10))
+            with transaction.atomic():
+                claimed_ids = [r.id for r in Rating.objects.claim_probable_spam_ratings(4)]
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(other_claimed_ids, [r.id for r in self.ratings[:4]])
+        self.assertEqual(claimed_ids, [r.id for r in self.ratings[4:]])
+
+
+class TestRatingBurstDetector(TestCase):
+
+    def setUp(self) -> None:
+        self.burst_detector = RatingBurstDetector(
+            redis_client=FakeRedis(), window=60, baseline_window=3600, min_count=5, factor=3, user_limit=4
+        )
+        self.now = 1_000_000 * 3600.0
+
+    def record_ratings(self, article_id: int, count: int, start: float, interval: float) -> list:
+        return [
+            self.burst_detector.record_rating(article_id, user_id=i, now=start + i * interval) for i in range(count)
+        ]
+
+    def test_record_rating_should_report_burst_when_article_rate_spikes_above_baseline(self):
+        # one rating per 2 minutes for most of an hour, then 10 ratings in 10 seconds
+        self.assertFalse(any(self.record_ratings(1, 25, self.now, 120)))
+        in_burst = self.record_ratings(1, 10, self.now + 3060, 1)
+
+        self.assertEqual(in_burst, [False] * 4 + [True] * 6)
+
+    def test_record_rating_should_not_report_burst_when_rate_is_steady_over_baseline_window(self):
+        # 12 ratings per minute for two hours, the first hour builds the baseline
+        in_burst = self.record_ratings(1, 1440, self.now, 5)
+        self.assertFalse(any(in_burst[720:]))
+
+    def test_record_rating_should_report_burst_when_user_rates_too_often(self):
+        in_burst = [
+            self.burst_detector.record_rating(article_id, user_id=1, now=self.now + article_id)
+            for article_id in range(6)
+        ]
+        self.assertEqual(in_burst, [False] * 4 + [True] * 2)
+
+    def test_record_rating_should_not_report_burst_when_redis_fails(self):
+        redis_client = MagicMock()
+        redis_client.pipeline.return_value.execute.side_effect = redis.ConnectionError()
+        burst_detector = RatingBurstDetector(redis_client=redis_client, min_count=0)
+        with self.assertLogs('articles.burst_detector', 'WARNING'):
+            self.assertFalse(burst_detector.record_rating(1, 1))
+
+    def test_init_should_raise_value_error_when_baseline_window_is_not_longer_than_window(self):
+        for window, baseline_window in [(60, 60), (60, 30), (0, 3600)]:
+            with self.assertRaises(ValueError):
+                RatingBurstDetector(redis_client=FakeRedis(), window=window, baseline_window=baseline_window)
+
+    async def test_arecord_rating_should_count_ratings_like_record_rating(self):
+        burst_detector = RatingBurstDetector(
+            async_redis_client=FakeAsyncRedis(), window=60, baseline_window=3600, min_count=5, factor=3, user_limit=4
+        )
+        in_burst = [
+            await burst_detector.arecord_rating(1, user_id=i, now=self.now + 3060 + i) for i in range(10)
+        ]
+        self.assertEqual(in_burst, self.record_ratings(1, 10, self.now + 3060, 1))
+
+    async def test_arecord_rating_should_not_report_burst_when_redis_fails(self):
+        async_redis_client = MagicMock()
+        async_redis_client.pipeline.return_value.execute = AsyncMock(side_effect=redis.ConnectionError())
+        burst_detector = RatingBurstDetector(async_redis_client=async_redis_client, min_count=0)
+        with self.assertLogs('articles.burst_detector', 'WARNING'):
+            self.assertFalse(await burst_detector.arecord_rating(1, 1))
+
+    def test_spam_detector_should_mark_ratings_in_burst_as_probable_spam(self):
+        burst_detector = MagicMock()
+        burst_detector.record_rating.return_value = True
+        spam_detector = SpamDetector(True, 100, 2, None, burst_detector)
+        article = Article(id=1, rating_count=0)
+
+        self.assertEqual(spam_detector.get_spam_status_for_article_score(3, article, 7), RatingSpamStatus.PROBABLE_SPAM)
+        self.assertEqual(
+            spam_detector.get_spam_status_for_score(3, 0, 3, 1, article_id=1, user_id=7), RatingSpamStatus.PROBABLE_SPAM
+        )
+        burst_detector.record_rating.assert_called_with(1, 7)
+
+        burst_detector.record_rating.return_value = False
+        self.assertEqual(spam_detector.get_spam_status_for_article_score(3, article, 7), RatingSpamStatus.NOT_SPAM)
+
 
 class TestNormalDistProbableSpamHandler(TestCase):
 
     def setUp(self) -> None:
+        for metric in metrics_registry.metrics.values():
+            if isinstance(metric, RedisMetric):
+                patcher = patch.object(metric, '_redis_client', FakeRedis())
+                patcher.start()
+                self.addCleanup(patcher.stop)
         self.initial_average = 3.0
         self.initial_count = 100
         self.initial_square_sum = 200.0
@@ -198,6 +1306,14 @@ class TestNormalDistProbableSpamHandler(TestCase):
         article.update_rating_info_with_new_scores(scores)
         article.refresh_from_db()
 
+    def add_score_counts(self, article, scores):
+        # ratings are created directly, so their scores are counted like the rating API does
+        Article.objects.filter(id=article.id).update(**{
+            f'score_count_{score}': models.F(f'score_count_{score}') + scores.count(score)
+            for score in set(scores)
+        })
+        article.refresh_from_db(fields=SCORE_COUNT_FIELDS)
+
     def make_ratings(self, score, spam_status, article, count):
         ratings = []
         for _ in range(count):
@@ -209,6 +1325,7 @@ class TestNormalDistProbableSpamHandler(TestCase):
                     spam_status=spam_status,
                 )
             )
+        self.add_score_counts(article, [r.score for r in ratings])
         return ratings
 
     def make_ratings_with_random_scores(self, spam_status, article, count):
@@ -222,6 +1339,7 @@ class TestNormalDistProbableSpamHandler(TestCase):
                     spam_status=spam_status,
                 )
             )
+        self.add_score_counts(article, [r.score for r in ratings])
         return ratings
 
     def assert_article_rating_info_is_as_expected(
@@ -272,6 +1390,35 @@ class TestNormalDistProbableSpamHandler(TestCase):
         for rating in ratings:
             self.assertEqual(rating.spam_status, RatingSpamStatus.NOT_SPAM)
 
+    def test_handle_not_spam_ratings_should_update_rating_info_of_all_articles_with_one_update(self):
+        article1_ratings = self.make_ratings_with_random_scores(RatingSpamStatus.PROBABLE_SPAM, self.article1, 10)
+        article2_ratings = self.make_ratings_with_random_scores(RatingSpamStatus.PROBABLE_SPAM, self.article2, 10)
+        rating_ids = [rating.id for rating in article1_ratings + article2_ratings]
+
+        with CaptureQueriesContext(connection) as queries:
+            NormalDistProbableSpamHandler(0.1).handle_not_spam_ratings(rating_ids)
+
+        article_updates = [
+            query for query in queries.captured_queries
+            if query['sql'].lstrip().startswith(('UPDATE "articles_article"', 'WITH locked_article'))
+        ]
+        self.assertEqual(len(article_updates), 1)
+        self.assertNotIn('"body"', article_updates[0]['sql'])
+        for article, ratings in ((self.article1, article1_ratings), (self.article2, article2_ratings)):
+            expected_average, expected_square_sum, expected_count = calculate_new_normal_dist_info_with_new_data_points(
+                self.initial_average, self.initial_square_sum, self.initial_count, [r.score for r in ratings]
+            )
+            article.refresh_from_db()
+            self.assertAlmostEqual(article.rating_average, expected_average)
+            self.assertEqual(article.rating_count, expected_count)
+            self.assertAlmostEqual(article.rating_square_sum, expected_square_sum, 3)
+            acceptable_score_low, acceptable_score_high = article.acceptable_score_low, article.acceptable_score_high
+            article.update_acceptable_score_band()
+            self.assertEqual(
+                (acceptable_score_low, acceptable_score_high),
+                (article.acceptable_score_low, article.acceptable_score_high),
+            )
+
     def test_handle_spam_ratings_should_update_ratings_spam_status(self):
         ratings = self.make_ratings_with_random_scores(RatingSpamStatus.PROBABLE_SPAM, self.article1, 10)
 
@@ -339,3 +1486,193 @@ class TestNormalDistProbableSpamHandler(TestCase):
             expected_count,
             expected_mean_diff_square_sum,
         )
+
+    @skipIf(numpy is None, 'numpy is not installed')
+    def test_detect_real_spam_ratings_vectorized_should_return_same_result_as_one_by_one(self):
+        self.make_normal_dist_ratings_for_article(self.clean_article)
+        self.make_ratings(0, RatingSpamStatus.PROBABLE_SPAM, self.clean_article, 10)
+        self.make_ratings_with_random_scores(RatingSpamStatus.PROBABLE_SPAM, self.article1, 30)
+        self.make_ratings_with_random_scores(RatingSpamStatus.PROBABLE_SPAM, self.article2, 30)
+        new_article = Article.objects.create(title='article3', body='foo')
+        new_article_ratings = self.make_ratings(5, RatingSpamStatus.PROBABLE_SPAM, new_article, 3)
+        equal_scores_article = Article.objects.create(title='article4', body='foo')
+        equal_scores_article.update_rating_info_with_new_scores([4] * 20)
+        equal_scores_article_ratings = self.make_ratings(0, RatingSpamStatus.PROBABLE_SPAM, equal_scores_article, 3)
+
+        probable_spam_handler = NormalDistProbableSpamHandler(0.1, min_rating_count=20)
+        ratings = list(probable_spam_handler.get_suspicouse_ratings())
+        spam_rating_ids, not_spam_rating_ids = probable_spam_handler.detect_real_spam_ratings_vectorized(ratings)
+        expected_spam_rating_ids, expected_not_spam_rating_ids = \
+            probable_spam_handler.detect_real_spam_ratings_one_by_one(ratings)
+
+        self.assertEqual(spam_rating_ids, expected_spam_rating_ids)
+        self.assertEqual(not_spam_rating_ids, expected_not_spam_rating_ids)
+        self.assertNotEqual(spam_rating_ids, [])
+        for rating in new_article_ratings:
+            self.assertNotIn(rating.id, spam_rating_ids + not_spam_rating_ids)
+        for rating in equal_scores_article_ratings:
+            self.assertIn(rating.id, not_spam_rating_ids)
+
+    @patch('articles.spam_handlers.normal_dist_spam_handler.numpy', None)
+    def test_handle_should_accept_ratings_of_articles_with_variance_zero(self):
+        article = Article.objects.create(title='article3', body='foo')
+        article.update_rating_info_with_new_scores([5] * 3)
+        ratings = self.make_ratings(0, RatingSpamStatus.PROBABLE_SPAM, article, 3)
+
+        NormalDistProbableSpamHandler(0.1, min_rating_count=3).handle()
+
+        for rating in ratings:
+            rating.refresh_from_db()
+            self.assertEqual(rating.spam_status, RatingSpamStatus.NOT_SPAM)
+        article.refresh_from_db()
+        self.assertEqual(article.rating_count, 6)
+        self.assertEqual(article.rating_average, 2.5)
+
+    def test_handle_should_keep_ratings_of_articles_with_too_few_ratings_and_drain_the_rest(self):
+        new_article = Article.objects.create(title='article3', body='foo')
+        new_article_ratings = self.make_ratings(5, RatingSpamStatus.PROBABLE_SPAM, new_article, 5)
+        self.make_normal_dist_ratings_for_article(self.clean_article)
+        spam_ratings = self.make_ratings(0, RatingSpamStatus.PROBABLE_SPAM, self.clean_article, 10)
+
+        NormalDistProbableSpamHandler(0.1, min_rating_count=20, chunk_size=2).handle()
+
+        for rating in new_article_ratings:
+            rating.refresh_from_db()
+            self.assertEqual(rating.spam_status, RatingSpamStatus.PROBABLE_SPAM)
+        for rating in spam_ratings:
+            rating.refresh_from_db()
+            self.assertEqual(rating.spam_status, RatingSpamStatus.SPAM)
+        new_article.refresh_from_db()
+        self.assertEqual(new_article.rating_count, 0)
+
+        new_article.update_rating_info_with_new_scores([4, 5] * 10)
+        NormalDistProbableSpamHandler(0.1, min_rating_count=20).handle()
+
+        self.assertFalse(Rating.objects.filter(spam_status=RatingSpamStatus.PROBABLE_SPAM).exists())
+
+    def test_handle_should_record_stage_durations_and_handled_ratings_metrics(self):
+        self.make_normal_dist_ratings_for_article(self.clean_article)
+        self.make_ratings(0, RatingSpamStatus.PROBABLE_SPAM, self.clean_article, 10)
+        with patch.object(spam_handler_stage_duration, 'is_active', True), \
+                patch.object(spam_handler_run_duration, 'is_active', True), \
+                patch.object(spam_handler_ratings, 'is_active', True):
+            NormalDistProbableSpamHandler(0.1, chunk_size=4).handle()
+
+        stage_durations = spam_handler_stage_duration.read()
+        # three chunks and a last claim finding nothing
+        self.assertEqual(stage_durations['stage="get_suspicouse_ratings"|count'], 4)
+        for stage in ('detect_real_spam_ratings', 'handle_not_spam_ratings', 'handle_spam_ratings'):
+            self.assertEqual(stage_durations[f'stage="{stage}"|count'], 3)
+        self.assertEqual(spam_handler_run_duration.read()['|count'], 1)
+        self.assertEqual(spam_handler_ratings.read(), {'result="spam"': 10, 'result="not_spam"': 0})
+
+    def test_probable_spam_backlog_gauges_should_show_count_and_age_of_oldest_probable_spam(self):
+        self.assertEqual(Rating.objects.get_probable_spam_backlog_count(), 0)
+        self.assertEqual(Rating.objects.get_probable_spam_oldest_age(), 0)
+
+        ratings = self.make_ratings(0, RatingSpamStatus.PROBABLE_SPAM, self.clean_article, 3)
+        Rating.objects.filter(id=ratings[0].id).update(created_at=timezone.now() - datetime.timedelta(minutes=10))
+
+        self.assertEqual(Rating.objects.get_probable_spam_backlog_count(), 3)
+        self.assertGreaterEqual(Rating.objects.get_probable_spam_oldest_age(), 600)
+        rendered_metrics = metrics_registry.render()
+        self.assertIn('articles_probable_spam_backlog 3.0\n', rendered_metrics)
+        self.assertIn('# TYPE articles_probable_spam_oldest_age_seconds gauge', rendered_metrics)
+
+
+class TestQueryPlans(TestCase):
+    '''
+    Fails when a hot manager query is planned as a sequential scan over
+    articles or ratings at realistic table sizes.
+    '''
+    users_count = 100
+    articles_count = 2000
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, email, is_staff, is_active, date_joined)
+                SELECT '', false, 'plan_user_' || i, '', '', '', false, true, now()
+                FROM generate_series(1, %s) AS i
+            ''', [cls.users_count])
+            cursor.execute('''
+                INSERT INTO articles_article (title, body, created_at, rating_count, rating_average, rating_square_sum,
+                    acceptable_score_low, acceptable_score_high, score_count_0, score_count_1, score_count_2,
+                    score_count_3, score_count_4, score_count_5)
+                SELECT 'article ' || i, 'body', now() - i * interval '1 minute', 0, 0, 0, 0, 5, 0, 0, 0, 0, 0, 0
+                FROM generate_series(1, %s) AS i
+            ''', [cls.articles_count])
+            # every user rates every article, probable spams are bursts on a few articles
+            cursor.execute('''
+                INSERT INTO articles_rating (user_id, article_id, score, spam_status, created_at, updated_at)
+                SELECT u.id, a.id, (u.id + a.id) %% 6,
+                    CASE WHEN a.id %% 100 = 0 AND u.id %% 5 = 0 THEN %s ELSE %s END, now(), now()
+                FROM auth_user AS u CROSS JOIN articles_article AS a
+                WHERE u.username LIKE 'plan_user_%%'
+            ''', [RatingSpamStatus.PROBABLE_SPAM, RatingSpamStatus.NOT_SPAM])
+            # rebuild_rating_info is planned with stale stats of earlier tests otherwise
+            cursor.execute('ANALYZE auth_user, articles_article, articles_rating')
+        Article.objects.rebuild_rating_info()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE auth_user, articles_article, articles_rating')
+        cls.user = User.objects.filter(username__startswith='plan_user_').first()
+        cls.article_ids = list(Article.objects.order_by('id').values_list('id', flat=True)[:20])
+        cls.rating_ids = list(Rating.objects.order_by('id').values_list('id', flat=True)[:20])
+
+    def assert_queries_do_not_scan_tables(self, run_queries):
+        with CaptureQueriesContext(connection) as context:
+            run_queries()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT')):
+                    continue
+                cursor.execute(f'EXPLAIN {query["sql"]}')
+                plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+
+        self.assertNotEqual(plans, [])
+        for plan in plans:
+            self.assertNotIn('Seq Scan on articles_rating', plan)
+            self.assertNotIn('Seq Scan on articles_article', plan)
+
+    def test_probable_spam_queries_should_use_partial_index(self):
+        self.assert_queries_do_not_scan_tables(lambda: list(Rating.objects.get_probable_spam_ratings()))
+        self.assert_queries_do_not_scan_tables(Rating.objects.get_probable_spam_backlog_count)
+        self.assert_queries_do_not_scan_tables(Rating.objects.get_probable_spam_oldest_age)
+
+    def test_user_rating_queries_should_use_indexes(self):
+        article = Article.objects.get(id=self.article_ids[0])
+        self.assert_queries_do_not_scan_tables(
+            lambda: Rating.objects.get_user_rating_scores_for_article_ids(self.user, self.article_ids)
+        )
+        self.assert_queries_do_not_scan_tables(
+            lambda: Rating.objects.get_user_rating_on_article_or_none(self.user, article)
+        )
+        self.assert_queries_do_not_scan_tables(
+            lambda: Rating.objects.upsert_user_rating(self.user, article, 3, RatingSpamStatus.NOT_SPAM)
+        )
+
+    def test_rating_id_queries_should_use_indexes(self):
+        self.assert_queries_do_not_scan_tables(
+            lambda: Rating.objects.get_rating_info_by_articles_for_rating_ids(self.rating_ids)
+        )
+        self.assert_queries_do_not_scan_tables(
+            lambda: Rating.objects.update_spam_status_of_ratings(self.rating_ids, RatingSpamStatus.NOT_SPAM)
+        )
+
+    def test_article_queries_should_use_indexes(self):
+        self.assert_queries_do_not_scan_tables(
+            lambda: list(Article.objects.order_by('-created_at', '-id').values('id', 'title')[:10])
+        )
+        self.assert_queries_do_not_scan_tables(
+            lambda: Article.objects.get_ratings_score_count_for_article_ids(self.article_ids)
+        )
+        self.assert_queries_do_not_scan_tables(
+            lambda: Article.objects.bulk_update_rating_info_with_changes(
+                [(article_id, RatingSpamStatus.NOT_SPAM, 3, None) for article_id in self.article_ids]
+            )
+        )
+        self.assert_queries_do_not_scan_tables(
+            lambda: Article.objects.refresh_acceptable_score_bands(self.article_ids)
+        )
@@ -1,39 +1,152 @@
-from rest_framework import status
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Substr
+from django.utils import timezone
+from rest_framework import serializers, status
 from rest_framework.views import APIView
-from rest_framework.generics import ListAPIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework import authentication, permissions
+from rest_framework import permissions
 
-from articles.serializers import ArticleForListSerializer, RatingSerializer
+from articles.caches import articles_list_cache
+from articles.constants import ArticlesListBodyMode, ArticlesListPaginationMode
+from articles.paginations import ArticleCursorPagination, ArticlePageNumberPagination
+from articles.rating_buffer import rating_buffer
+from articles.serializers import (
+    ArticleSerializer,
+    RatingBatchSerializer,
+    RatingSerializer,
+    article_excerpt_for_list_compiled_serializer,
+    article_for_list_compiled_serializer,
+    rating_compiled_serializer,
+)
 from articles.spam_detector import spam_detector
 from articles.models import Article, Rating
 from core.constants import APIMessages
+from core.db_routers import pin_user_to_primary, read_from_replica
 from core.settings import config
+from users.authentication import CachedTokenAuthentication
 
 
-class ArticlesListView(ListAPIView):
-    authentication_classes = [authentication.TokenAuthentication]
-    pagination_class = PageNumberPagination
+class ArticlesListMixin:
+    '''
+    Articles queryset, serializer and paginator of articles list views by requested
+    body and pagination modes. Views map pagination modes to pagination_classes.
+    '''
+    body_mode_query_param = 'body'
+    pagination_mode_query_param = 'pagination'
+    pagination_classes = {}
+
+    def get_body_mode(self):
+        return self.request.query_params.get(
+            self.body_mode_query_param,
+            config.ARTICLES_LIST_BODY_MODE
+        )
 
     def get_queryset(self):
-        return Article.objects.order_by('-created_at')
+        articles = Article.objects.order_by('-created_at', '-id')
+        if self.get_body_mode() == ArticlesListBodyMode.EXCERPT:
+            articles = articles.defer('body').annotate(
+                body_excerpt=Substr('body', 1, config.ARTICLES_LIST_BODY_EXCERPT_LENGTH)
+            )
+        return articles
+
+    def get_compiled_serializer(self):
+        if self.get_body_mode() == ArticlesListBodyMode.EXCERPT:
+            return article_excerpt_for_list_compiled_serializer
+        return article_for_list_compiled_serializer
+
+    def get_pagination_class(self):
+        pagination_mode = self.request.query_params.get(
+            self.pagination_mode_query_param,
+            config.ARTICLES_LIST_PAGINATION
+        )
+        return self.pagination_classes.get(
+            pagination_mode,
+            self.pagination_classes[ArticlesListPaginationMode.PAGE_NUMBER]
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            self._paginator = self.get_pagination_class()()
+        return self._paginator
+
+
+class ArticlesListView(ArticlesListMixin, ListAPIView):
+    authentication_classes = [CachedTokenAuthentication]
+    pagination_classes = {
+        ArticlesListPaginationMode.PAGE_NUMBER: ArticlePageNumberPagination,
+        ArticlesListPaginationMode.CURSOR: ArticleCursorPagination,
+    }
 
     def get(self, request: Request):
-        articles_in_page = self.paginate_queryset(self.get_queryset())
-        if request.user.is_authenticated:
-            articles_in_page = Rating.objects.annotate_articles_with_user_rating(
-                articles_in_page,
-                user=request.user
+        with read_from_replica(user=request.user):
+            page_data = articles_list_cache.get_or_set(
+                request.build_absolute_uri(),
+                self.get_articles_page_data,
             )
+            if request.user.is_authenticated:
+                page_data = {
+                    **page_data,
+                    'results': Rating.objects.annotate_serialized_articles_with_user_rating(
+                        page_data['results'],
+                        user=request.user
+                    ),
+                }
 
-        serializer = ArticleForListSerializer(articles_in_page, many=True)
-        return self.get_paginated_response(serializer.data)
+        return Response(page_data)
+
+    def get_articles_page_data(self) -> dict:
+        '''
+        Serialized page of articles without user ratings, shared between users.
+        '''
+        compiled_serializer = self.get_compiled_serializer()
+        articles_in_page = self.paginate_queryset(
+            self.get_queryset().values(*compiled_serializer.values_fields)
+        )
+        page_data = self.get_paginated_response(
+            compiled_serializer.serialize_rows(articles_in_page)
+        ).data
+        return dict(page_data)
+
+
+class ArticleDetailView(RetrieveAPIView):
+    authentication_classes = [CachedTokenAuthentication]
+    queryset = Article.objects.all()
+    serializer_class = ArticleSerializer
+
+    def get(self, request: Request, pk: int):
+        with read_from_replica(user=request.user):
+            article = self.get_object()
+            if request.user.is_authenticated:
+                Rating.objects.annotate_articles_with_user_rating([article], user=request.user)
+
+        serializer = self.get_serializer(article)
+        return Response(serializer.data)
+
+
+def upsert_user_rating(user, article, score: int, spam_status: int):
+    '''
+    Upserts the user rating and, when write behind is active, buffers it once
+    the rating is committed, so a rolled back rating is never buffered.
+    return rating, old_score
+    '''
+    with transaction.atomic():
+        rating, old_score = Rating.objects.upsert_user_rating(
+            user=user,
+            article=article,
+            score=score,
+            spam_status=spam_status,
+            update_article=not config.RATING_WRITE_BEHIND_IS_ACTIVE,
+        )
+        if config.RATING_WRITE_BEHIND_IS_ACTIVE:
+            transaction.on_commit(lambda: rating_buffer.push_rating(rating, old_score), robust=True)
+    return rating, old_score
 
 
 class RatingView(APIView):
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request: Request):
@@ -43,33 +156,108 @@ class RatingView(APIView):
         article: Article = serializer.validated_data.get('article')
         score = serializer.validated_data.get('score')
 
-        existing_rating: Rating | None = Rating.objects.get_user_rating_on_article_or_none(
-            user=request.user, article=article
-        )
-        if existing_rating is not None:
-            old_score = existing_rating.score
-            rating = existing_rating.update_score(article, score)
-            article.update_rating_info_with_rating(
-                rating,
-                old_score,
-            )
-        else:
-            spam_status = spam_detector.get_spam_status_for_score(
-                score=score,
-                rating_count=article.rating_count,
-                mean=article.rating_average,
-                variance=article.get_variance()
-            )
-            rating = Rating.objects.create(
-                user=request.user,
-                article=article,
-                score=score,
-                spam_status=spam_status,
-            )
-            article.update_rating_info_with_rating(rating)
+        spam_status = spam_detector.get_spam_status_for_article_score(score, article, request.user.id)
+        rating, _ = upsert_user_rating(request.user, article, score, spam_status)
+        pin_user_to_primary(request.user)
 
-        response_serializer = RatingSerializer(rating)
         return Response({
                 "message": APIMessages.RATING_CREATED_SUCCESSFULLY,
-                "rating": response_serializer.data
+                "rating": rating_compiled_serializer.serialize_instance(rating)
+            }, status.HTTP_200_OK)
+
+
+class RatingBatchView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    article_does_not_exist_message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+    insert_attempts = 3
+
+    def prepare_ratings(self, items, articles: dict, user_ratings: dict, spam_statuses: dict):
+        '''
+        Applies items to user_ratings, the locked ratings of the user.
+        Like RatingView, every item is passed to the spam detector, so updates
+        are counted for burst detection too, and updated ratings keep their spam
+        status. Spam statuses are cached in spam_statuses, so items are detected
+        once even when the batch is retried.
+        return results, new_ratings, updated_ratings, rating_changes
+        '''
+        results = []
+        new_ratings = []
+        updated_ratings = {}
+        rating_changes = []
+        for item in items:
+            article = articles.get(item['article'])
+            if article is None:
+                results.append({
+                    'article': item['article'],
+                    'errors': {'article': [self.article_does_not_exist_message.format(pk_value=item['article'])]},
+                })
+                continue
+
+            score = item['score']
+            if article.id not in spam_statuses:
+                spam_statuses[article.id] = spam_detector.get_spam_status_for_article_score(
+                    score, article, self.request.user.id
+                )
+            rating = user_ratings.get(article.id)
+            if rating is not None:
+                old_score = rating.score
+                rating.score = score
+                if rating.pk is not None:
+                    rating.updated_at = timezone.now()
+                    updated_ratings[rating.pk] = rating
+                rating_changes.append((article.id, rating.spam_status, score, old_score))
+            else:
+                rating = Rating(
+                    user=self.request.user,
+                    article=article,
+                    score=score,
+                    spam_status=spam_statuses[article.id],
+                )
+                user_ratings[article.id] = rating
+                new_ratings.append(rating)
+                rating_changes.append((article.id, rating.spam_status, score, None))
+            results.append({'rating': rating})
+
+        return results, new_ratings, updated_ratings, rating_changes
+
+    def post(self, request: Request):
+        serializer = RatingBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data.get('ratings')
+        article_ids = {item['article'] for item in items}
+
+        with transaction.atomic():
+            articles = Article.objects.in_bulk(article_ids)
+            spam_statuses = {}
+            for attempt in range(self.insert_attempts):
+                user_ratings = Rating.objects.get_user_ratings_for_article_ids(
+                    request.user, articles.keys(), for_update=True
+                )
+                results, new_ratings, updated_ratings, rating_changes = self.prepare_ratings(
+                    items, articles, user_ratings, spam_statuses
+                )
+                try:
+                    with transaction.atomic():
+                        Rating.objects.bulk_create(new_ratings)
+                    break
+                except IntegrityError:
+                    # a concurrent request rated one of the articles first, its committed
+                    # rating is locked and updated on the next attempt
+                    if attempt == self.insert_attempts - 1:
+                        raise
+
+            Rating.objects.bulk_update(updated_ratings.values(), ['score', 'updated_at'])
+            if config.RATING_WRITE_BEHIND_IS_ACTIVE:
+                transaction.on_commit(lambda: rating_buffer.push_many(rating_changes), robust=True)
+            else:
+                Article.objects.bulk_update_rating_info_with_changes(rating_changes)
+        pin_user_to_primary(request.user)
+
+        for result in results:
+            if 'rating' in result:
+                result['rating'] = rating_compiled_serializer.serialize_instance(result['rating'])
+        return Response({
+                "message": APIMessages.RATINGS_BATCH_PROCESSED_SUCCESSFULLY,
+                "results": results
             }, status.HTTP_200_OK)
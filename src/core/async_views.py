@@ -0,0 +1,93 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+
+from core.renderers import FastJSONRenderer
+
+
+class AsyncAPIView(View):
+    '''
+    Base of native async API views. Requests are wrapped in DRF Request and
+    authenticated with aauthenticate() of authentication classes, and
+    responses and errors are rendered the way DRF APIView renders them.
+    Handlers must be async and return data with an optional status code.
+    '''
+
+    authentication_classes = []
+    permission_classes = []
+    parser_classes = [JSONParser]
+    renderer_class = FastJSONRenderer
+    http_method_names = ['get', 'post', 'put', 'patch', 'delete', 'head']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # token authenticated like DRF views, so not subject to CSRF checks
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, parsers=[parser() for parser in self.parser_classes])
+        self.request = request
+        try:
+            await self.perform_authentication(request)
+            self.check_permissions(request)
+
+            handler = getattr(self, request.method.lower(), None)
+            if request.method.lower() not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            data, status = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(request, exc)
+
+        return self.render(data, status)
+
+    def get_authenticators(self):
+        return [authentication() for authentication in self.authentication_classes]
+
+    async def perform_authentication(self, request: Request):
+        request.user, request.auth = AnonymousUser(), None
+        for authenticator in self.get_authenticators():
+            user_auth_tuple = await authenticator.aauthenticate(request)
+            if user_auth_tuple is not None:
+                request.user, request.auth = user_auth_tuple
+                return
+
+    def check_permissions(self, request: Request):
+        for permission in self.permission_classes:
+            if not permission().has_permission(request, self):
+                if request.auth is None and self.authentication_classes:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+
+    def handle_exception(self, request: Request, exc: Exception) -> HttpResponse:
+        if isinstance(exc, Http404):
+            exc = exceptions.NotFound()
+        if not isinstance(exc, exceptions.APIException):
+            raise exc
+
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        response = self.render(data, exc.status_code)
+
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            authenticators = self.get_authenticators()
+            if authenticators:
+                response['WWW-Authenticate'] = authenticators[0].authenticate_header(request)
+            else:
+                response.status_code = exceptions.PermissionDenied.status_code
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    def render(self, data, status: int) -> HttpResponse:
+        renderer = self.renderer_class()
+        return HttpResponse(
+            renderer.render(data),
+            status=status,
+            content_type=renderer.media_type,
+        )
@@ -0,0 +1,73 @@
+import math
+import threading
+import time
+from typing import Callable, List
+
+from django.db import connections
+
+
+def calculate_percentile(sorted_values: List[float], percentile: float) -> float:
+    '''
+    Percentile of sorted values with linear interpolation between closest ranks.
+    '''
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * percentile / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize_latencies(latencies: List[float], duration: float, errors: int) -> dict:
+    '''
+    Throughput and latency percentiles (in milliseconds) of a load run.
+    '''
+    sorted_latencies = sorted(latency * 1000 for latency in latencies)
+    count = len(sorted_latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'duration_s': round(duration, 3),
+        'requests_per_s': round(count / duration, 2) if duration else 0.0,
+        'latency_ms': {
+            'mean': round(sum(sorted_latencies) / count, 3) if count else 0.0,
+            **{
+                f'p{percentile}': round(calculate_percentile(sorted_latencies, percentile), 3)
+                for percentile in (50, 90, 95, 99)
+            },
+            'max': round(sorted_latencies[-1], 3) if count else 0.0,
+        },
+    }
+
+
+def run_load(send_request: Callable[[int], bool], requests: int, concurrency: int) -> dict:
+    '''
+    Calls send_request(i) for i in range(requests) from concurrency threads and
+    summarizes latencies. send_request returns whether the request succeeded.
+    '''
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(worker_index: int):
+        nonlocal errors
+        try:
+            for i in range(worker_index, requests, concurrency):
+                started_at = time.perf_counter()
+                try:
+                    succeeded = send_request(i)
+                except Exception:
+                    succeeded = False
+                latency = time.perf_counter() - started_at
+                with lock:
+                    latencies.append(latency)
+                    errors += 0 if succeeded else 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize_latencies(latencies, time.perf_counter() - started_at, errors)
@@ -0,0 +1,250 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from django.core.cache import caches
+
+
+MISSING = object()
+
+
+class LocalLRUCache:
+    '''
+    Thread safe in-process LRU cache. Entries expire after ttl seconds.
+    '''
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+            if entry is MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class TwoTierCache:
+    '''
+    Per-process LRU cache in front of a django cache shared between processes.
+    Keys are namespaced by a version kept in the shared cache and invalidate()
+    bumps it, which drops all entries of every process at once. Each process
+    reads the version at most once per version_ttl seconds, so local hits do not
+    touch the shared cache and other processes see invalidations after up to
+    version_ttl seconds.
+
+    On a miss only one caller recomputes the value. Other threads of the process
+    wait for it, and other processes serve the last value they have seen for the
+    key or poll the shared cache for up to wait_timeout seconds.
+    '''
+
+    lock_count = 64
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        local_max_size: int,
+        is_active: bool = True,
+        cache_alias: str = 'default',
+        lock_timeout: int = 10,
+        wait_timeout: float = 2.0,
+        wait_interval: float = 0.05,
+        version_ttl: float = 1.0,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.is_active = is_active
+        self.cache_alias = cache_alias
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.wait_interval = wait_interval
+        self.version_ttl = version_ttl
+        self._local_version = (0.0, None)
+        self.local_cache = LocalLRUCache(local_max_size, ttl)
+        self.stale_cache = LocalLRUCache(local_max_size, ttl * 10)
+        self._locks = [threading.Lock() for _ in range(self.lock_count)]
+
+    @property
+    def shared_cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def version_key(self) -> str:
+        return f'{self.namespace}:version'
+
+    def get_version(self) -> int:
+        expires_at, version = self._local_version
+        if version is not None and expires_at > time.monotonic():
+            return version
+
+        version = self.shared_cache.get(self.version_key)
+        if version is None:
+            self.shared_cache.add(self.version_key, 1, timeout=None)
+            version = self.shared_cache.get(self.version_key, 1)
+        self.set_local_version(version)
+        return version
+
+    async def aget_version(self) -> int:
+        expires_at, version = self._local_version
+        if version is not None and expires_at > time.monotonic():
+            return version
+
+        version = await self.shared_cache.aget(self.version_key)
+        if version is None:
+            await self.shared_cache.aadd(self.version_key, 1, timeout=None)
+            version = await self.shared_cache.aget(self.version_key, 1)
+        self.set_local_version(version)
+        return version
+
+    def set_local_version(self, version: int) -> None:
+        self._local_version = (time.monotonic() + self.version_ttl, version)
+
+    def invalidate(self) -> None:
+        if not self.is_active:
+            return
+        try:
+            version = self.shared_cache.incr(self.version_key)
+        except ValueError:
+            self.shared_cache.add(self.version_key, 1, timeout=None)
+            version = self.shared_cache.get(self.version_key, 1)
+        # the invalidating process sees its own change right away
+        self.set_local_version(version)
+
+    async def ainvalidate(self) -> None:
+        if not self.is_active:
+            return
+        try:
+            version = await self.shared_cache.aincr(self.version_key)
+        except ValueError:
+            await self.shared_cache.aadd(self.version_key, 1, timeout=None)
+            version = await self.shared_cache.aget(self.version_key, 1)
+        self.set_local_version(version)
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]):
+        if not self.is_active:
+            return compute()
+
+        versioned_key = f'{self.namespace}:{self.get_version()}:{key}'
+        value = self.get_cached(key, versioned_key)
+        if value is not MISSING:
+            return value
+
+        with self._locks[hash(key) % self.lock_count]:
+            value = self.local_cache.get(versioned_key, MISSING)
+            if value is not MISSING:
+                return value
+
+            lock_key = f'{versioned_key}:lock'
+            if self.shared_cache.add(lock_key, 1, timeout=self.lock_timeout):
+                try:
+                    return self.set(key, versioned_key, compute())
+                finally:
+                    self.shared_cache.delete(lock_key)
+
+            stale_value = self.stale_cache.get(key, MISSING)
+            if stale_value is not MISSING:
+                return stale_value
+
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.wait_interval)
+                value = self.get_cached(key, versioned_key)
+                if value is not MISSING:
+                    return value
+
+            return self.set(key, versioned_key, compute())
+
+    def get_cached(self, key: str, versioned_key: str):
+        value = self.local_cache.get(versioned_key, MISSING)
+        if value is not MISSING:
+            return value
+
+        value = self.shared_cache.get(versioned_key, MISSING)
+        if value is not MISSING:
+            self.local_cache.set(versioned_key, value)
+            self.stale_cache.set(key, value)
+        return value
+
+    def set(self, key: str, versioned_key: str, value):
+        self.shared_cache.set(versioned_key, value, timeout=self.ttl)
+        self.local_cache.set(versioned_key, value)
+        self.stale_cache.set(key, value)
+        return value
+
+    async def aget_or_set(self, key: str, acompute: Callable[[], Awaitable[Any]]):
+        '''
+        Same as get_or_set for async views. Coroutines of the process missing the
+        same key are not serialized by a local lock, but only one of them gets the
+        shared cache lock and recomputes the value.
+        '''
+        if not self.is_active:
+            return await acompute()
+
+        versioned_key = f'{self.namespace}:{await self.aget_version()}:{key}'
+        value = await self.aget_cached(key, versioned_key)
+        if value is not MISSING:
+            return value
+
+        lock_key = f'{versioned_key}:lock'
+        if await self.shared_cache.aadd(lock_key, 1, timeout=self.lock_timeout):
+            try:
+                return await self.aset(key, versioned_key, await acompute())
+            finally:
+                await self.shared_cache.adelete(lock_key)
+
+        stale_value = self.stale_cache.get(key, MISSING)
+        if stale_value is not MISSING:
+            return stale_value
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.wait_interval)
+            value = await self.aget_cached(key, versioned_key)
+            if value is not MISSING:
+                return value
+
+        return await self.aset(key, versioned_key, await acompute())
+
+    async def aget_cached(self, key: str, versioned_key: str):
+        value = self.local_cache.get(versioned_key, MISSING)
+        if value is not MISSING:
+            return value
+
+        value = await self.shared_cache.aget(versioned_key, MISSING)
+        if value is not MISSING:
+            self.local_cache.set(versioned_key, value)
+            self.stale_cache.set(key, value)
+        return value
+
+    async def aset(self, key: str, versioned_key: str, value):
+        await self.shared_cache.aset(versioned_key, value, timeout=self.ttl)
+        self.local_cache.set(versioned_key, value)
+        self.stale_cache.set(key, value)
+        return value
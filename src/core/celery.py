@@ -14,6 +14,21 @@ celery_app.conf.beat_schedule = {
         'schedule': crontab(minute=f'*/{config.SPAM_DETECTION_TASK_PERIOD_TIME}'),
     },
 }
+if config.RATING_WRITE_BEHIND_IS_ACTIVE:
+    celery_app.conf.beat_schedule['flush-rating-buffer'] = {
+        'task': 'articles.tasks.flush_rating_buffer',
+        'schedule': config.RATING_BUFFER_FLUSH_PERIOD_TIME,
+    }
+if config.RATING_ARCHIVE_IS_ACTIVE:
+    celery_app.conf.beat_schedule['archive-spam-ratings'] = {
+        'task': 'articles.tasks.archive_spam_ratings',
+        'schedule': config.RATING_ARCHIVE_PERIOD_TIME,
+    }
+if config.RATING_ROLLUP_IS_ACTIVE:
+    celery_app.conf.beat_schedule['prune-rating-rollups'] = {
+        'task': 'articles.tasks.prune_rating_rollups',
+        'schedule': crontab(minute=0, hour=0),
+    }
 celery_app.config_from_object('django.conf:settings', namespace='CELERY')
 celery_app.autodiscover_tasks()
 celery_app.conf.broker_connection_retry_on_startup = True
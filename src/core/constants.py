@@ -1,4 +1,5 @@
 
 class APIMessages:
     RATING_CREATED_SUCCESSFULLY = "Rating created successfully. It may take some time to see the affect on the article."
+    RATINGS_BATCH_PROCESSED_SUCCESSFULLY = "Ratings processed successfully. It may take some time to see the affect on the articles."
     USER_CREATED_SUCCESSFULLY = "User created successfully"
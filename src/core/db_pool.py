@@ -0,0 +1,28 @@
+from django.db import connections
+
+
+def summarize_pool_stats(stats: dict) -> dict:
+    '''
+    Adds average checkout wait time and saturation (share of max size in use)
+    to psycopg pool stats. Counters are totals since the process started.
+    '''
+    pool_max = stats.get('pool_max', 0)
+    in_use = stats.get('pool_size', 0) - stats.get('pool_available', 0)
+    checkouts = stats.get('requests_num', 0)
+    return {
+        **stats,
+        'connections_in_use': in_use,
+        'requests_wait_ms_avg': stats.get('requests_wait_ms', 0) / checkouts if checkouts else 0.0,
+        'saturation': in_use / pool_max if pool_max else 0.0,
+    }
+
+
+def get_pool_stats() -> dict:
+    '''
+    Pool stats of this process by database alias, None for databases without a pool.
+    '''
+    pools_stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        pools_stats[alias] = summarize_pool_stats(pool.get_stats()) if pool is not None else None
+    return pools_stats
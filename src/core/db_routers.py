@@ -0,0 +1,99 @@
+import contextvars
+import random
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.settings import config
+
+
+PRIMARY_DB_ALIAS = 'default'
+REPLICA_DB_ALIAS_PREFIX = 'replica'
+PRIMARY_PIN_CACHE_KEY = 'db:primary_pin:{user_id}'
+
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+def get_replica_aliases() -> list:
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_DB_ALIAS_PREFIX)]
+
+
+def pin_user_to_primary(user) -> None:
+    '''
+    Makes reads of the user go to primary for DB_PRIMARY_PIN_TIME seconds,
+    so the user reads their own writes while replicas catch up.
+    '''
+    if get_replica_aliases():
+        cache.set(PRIMARY_PIN_CACHE_KEY.format(user_id=user.id), 1, config.DB_PRIMARY_PIN_TIME)
+
+
+async def apin_user_to_primary(user) -> None:
+    if get_replica_aliases():
+        await cache.aset(PRIMARY_PIN_CACHE_KEY.format(user_id=user.id), 1, config.DB_PRIMARY_PIN_TIME)
+
+
+def user_is_pinned_to_primary(user) -> bool:
+    return cache.get(PRIMARY_PIN_CACHE_KEY.format(user_id=user.id)) is not None
+
+
+async def auser_is_pinned_to_primary(user) -> bool:
+    return await cache.aget(PRIMARY_PIN_CACHE_KEY.format(user_id=user.id)) is not None
+
+
+@contextmanager
+def read_from_replica(user=None):
+    '''
+    Routes reads inside the block to a replica, unless no replica is configured
+    or the given user is pinned to primary.
+    '''
+    use_replica = bool(get_replica_aliases())
+    if use_replica and user is not None and user.is_authenticated:
+        use_replica = not user_is_pinned_to_primary(user)
+
+    token = _read_from_replica.set(use_replica)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+@asynccontextmanager
+async def aread_from_replica(user=None):
+    '''
+    Async read_from_replica. The async ORM runs queries with a copy of the
+    context, so they are routed the same way.
+    '''
+    use_replica = bool(get_replica_aliases())
+    if use_replica and user is not None and user.is_authenticated:
+        use_replica = not await auser_is_pinned_to_primary(user)
+
+    token = _read_from_replica.set(use_replica)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    '''
+    Sends writes and reads to primary, except reads inside read_from_replica()
+    blocks which go to a random replica.
+    '''
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            replica_aliases = get_replica_aliases()
+            if replica_aliases:
+                return random.choice(replica_aliases)
+        return PRIMARY_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DB_ALIAS
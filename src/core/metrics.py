@@ -0,0 +1,170 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Sequence
+
+import redis
+
+from core.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def format_labels(labels: dict) -> str:
+    return ','.join(f'{name}="{value}"' for name, value in sorted(labels.items()))
+
+
+def format_sample(name: str, labels: str, value: float) -> str:
+    return f'{name}{{{labels}}} {value}' if labels else f'{name} {value}'
+
+
+def format_value(value: float) -> str:
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+class RedisMetric:
+    '''
+    Base of metrics kept in a redis hash, so values recorded by all web and
+    celery processes are exposed together by any of them. Recording a value
+    never raises, a redis failure only loses the value.
+    '''
+    type = None
+
+    def __init__(self, name: str, documentation: str, is_active: bool = True, redis_client=None) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.is_active = is_active
+        self._redis_client = redis_client
+
+    @property
+    def redis_client(self):
+        return self._redis_client or get_redis_client()
+
+    @property
+    def key(self) -> str:
+        return f'metrics:{self.name}'
+
+    def write(self, increments: dict) -> None:
+        if not self.is_active:
+            return
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for field, amount in increments.items():
+                pipeline.hincrbyfloat(self.key, field, amount)
+            pipeline.execute()
+        except redis.RedisError:
+            logger.warning('Could not record metric', extra={'metric': self.name}, exc_info=True)
+
+    def read(self) -> dict:
+        return {
+            field.decode(): float(value) for field, value in self.redis_client.hgetall(self.key).items()
+        }
+
+    def reset(self) -> None:
+        self.redis_client.delete(self.key)
+
+    def collect(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+            *self.collect_samples(),
+        ]
+
+    def collect_samples(self) -> List[str]:
+        raise NotImplementedError()
+
+
+class RedisCounter(RedisMetric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self.write({format_labels(labels): amount})
+
+    def collect_samples(self) -> List[str]:
+        return [
+            format_sample(f'{self.name}_total', labels, value)
+            for labels, value in sorted(self.read().items())
+        ]
+
+
+class RedisHistogram(RedisMetric):
+    '''
+    Fields of the hash are "<labels>|sum", "<labels>|count" and "<labels>|<le>"
+    of cumulative buckets.
+    '''
+    type = 'histogram'
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = [*sorted(buckets), float('inf')]
+
+    def observe(self, value: float, **labels) -> None:
+        labels = format_labels(labels)
+        increments = {f'{labels}|sum': value, f'{labels}|count': 1}
+        for bucket in self.buckets:
+            if value <= bucket:
+                increments[f'{labels}|{format_value(bucket)}'] = 1
+        self.write(increments)
+
+    @contextmanager
+    def time(self, **labels):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def collect_samples(self) -> List[str]:
+        values = self.read()
+        samples = []
+        for labels in sorted({field.rsplit('|', 1)[0] for field in values}):
+            for bucket in self.buckets:
+                le = format_value(bucket)
+                bucket_labels = ','.join(filter(None, [labels, f'le="{le}"']))
+                samples.append(format_sample(f'{self.name}_bucket', bucket_labels, values.get(f'{labels}|{le}', 0.0)))
+            samples.append(format_sample(f'{self.name}_sum', labels, values.get(f'{labels}|sum', 0.0)))
+            samples.append(format_sample(f'{self.name}_count', labels, values.get(f'{labels}|count', 0.0)))
+        return samples
+
+
+class CallbackGauge:
+    '''
+    Gauge whose value is computed when metrics are collected.
+    '''
+
+    def __init__(self, name: str, documentation: str, get_value: Callable[[], float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.get_value = get_value
+
+    def collect(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} gauge',
+            format_sample(self.name, '', float(self.get_value())),
+        ]
+
+
+class MetricsRegistry:
+
+    def __init__(self) -> None:
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        '''
+        Metrics in prometheus text exposition format.
+        '''
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
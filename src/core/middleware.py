@@ -0,0 +1,100 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.server_timing import db_execute_wrapper, start_timing, stop_timing
+from core.settings import config
+
+logger = logging.getLogger(__name__)
+
+
+def install_db_execute_wrapper(connection, **kwargs):
+    if db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+class ServerTimingMiddleware:
+    '''
+    Times sampled requests and reports database time and query count, view time
+    and durations measured with core.server_timing.measure() (auth, serialize,
+    render, spam) in Server-Timing header, and logs requests slower than
+    SERVER_TIMING_LOG_THRESHOLD_MS. Not loaded at all when it is not active.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not config.SERVER_TIMING_IS_ACTIVE:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.sample_rate = config.SERVER_TIMING_SAMPLE_RATE
+        self.log_threshold = config.SERVER_TIMING_LOG_THRESHOLD_MS
+        self.header_is_active = config.SERVER_TIMING_HEADER_IS_ACTIVE
+        # queries of async views run in other threads, so every connection is wrapped
+        connection_created.connect(install_db_execute_wrapper, weak=False, dispatch_uid='server_timing')
+        for connection in connections.all(initialized_only=True):
+            install_db_execute_wrapper(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timing, token = start_timing()
+        started_at = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timing(token)
+        self.report(request, response, timing, started_at)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        timing, token = start_timing()
+        started_at = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_timing(token)
+        self.report(request, response, timing, started_at)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.server_timing_view_started_at = time.perf_counter()
+
+    def report(self, request, response, timing, started_at: float) -> None:
+        finished_at = time.perf_counter()
+        metrics = timing.get_metrics()
+        view_started_at = getattr(request, 'server_timing_view_started_at', None)
+        if view_started_at is not None:
+            metrics['view'] = (finished_at - view_started_at) * 1000
+        metrics['total'] = (finished_at - started_at) * 1000
+
+        if self.header_is_active:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={duration:.2f}' + (f';desc="{timing.db_query_count} queries"' if name == 'db' else '')
+                for name, duration in metrics.items()
+            )
+        if metrics['total'] >= self.log_threshold:
+            logger.info(
+                'Request timing',
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status_code': response.status_code,
+                    'db_query_count': timing.db_query_count,
+                    **{f'{name}_ms': round(duration, 2) for name, duration in metrics.items()},
+                }
+            )
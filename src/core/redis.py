@@ -0,0 +1,33 @@
+import asyncio
+import functools
+import weakref
+
+import redis
+import redis.asyncio
+
+from core.settings import config
+
+
+@functools.cache
+def get_redis_client() -> redis.Redis:
+    '''
+    Returns a process wide redis client for buffers and caches.
+    Connections are opened lazily on first command.
+    '''
+    return redis.Redis.from_url(config.REDIS_URL or config.CELERY_BROKER_REDIS)
+
+
+_async_redis_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis_client() -> redis.asyncio.Redis:
+    '''
+    Returns a redis.asyncio client of the running event loop, since async
+    connections can only be used in the loop they were opened in.
+    '''
+    loop = asyncio.get_running_loop()
+    redis_client = _async_redis_clients.get(loop)
+    if redis_client is None:
+        redis_client = redis.asyncio.Redis.from_url(config.REDIS_URL or config.CELERY_BROKER_REDIS)
+        _async_redis_clients[loop] = redis_client
+    return redis_client
@@ -0,0 +1,32 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from core.server_timing import measure
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    '''
+    JSON renderer backed by orjson when it is installed, producing the same
+    bytes as the default renderer. Indented and non-strict output fall back
+    to the default renderer.
+    '''
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure('render'):
+            return self.render_data(data, accepted_media_type, renderer_context)
+
+    def render_data(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.strict or not self.compact or self.ensure_ascii or \
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=encoders.JSONEncoder().default, option=self.options)
+        # same escaping of line separators as the default renderer
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
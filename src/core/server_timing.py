@@ -0,0 +1,79 @@
+import contextvars
+import time
+from contextlib import nullcontext
+
+
+_current_timing = contextvars.ContextVar('server_timing', default=None)
+_inactive_measure = nullcontext()
+
+
+class RequestTiming:
+    '''
+    Durations (in milliseconds) of phases of a request and its database queries.
+    '''
+
+    def __init__(self) -> None:
+        self.durations = {}
+        self.db_query_count = 0
+        self.db_duration = 0.0
+
+    def add(self, name: str, duration: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def add_query(self, duration: float) -> None:
+        self.db_query_count += 1
+        self.db_duration += duration
+
+    def get_metrics(self) -> dict:
+        return {
+            'db': self.db_duration,
+            **self.durations,
+        }
+
+
+class Measure:
+
+    def __init__(self, timing: RequestTiming, name: str) -> None:
+        self.timing = timing
+        self.name = name
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timing.add(self.name, (time.perf_counter() - self.started_at) * 1000)
+
+
+def start_timing() -> tuple[RequestTiming, contextvars.Token]:
+    timing = RequestTiming()
+    return timing, _current_timing.set(timing)
+
+
+def stop_timing(token: contextvars.Token) -> None:
+    _current_timing.reset(token)
+
+
+def measure(name: str):
+    '''
+    Adds duration of the block to the named phase of the request being timed.
+    Does nothing when the request is not timed.
+    '''
+    timing = _current_timing.get()
+    if timing is None:
+        return _inactive_measure
+    return Measure(timing, name)
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    '''
+    Database execute wrapper counting queries of the request being timed.
+    '''
+    timing = _current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query((time.perf_counter() - started_at) * 1000)
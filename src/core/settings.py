@@ -33,6 +33,16 @@ class EnvironmentConfig(BaseSettings):
     DB_PASSWORD: str
     DB_HOST: str
     DB_PORT: str
+    DB_CONN_MAX_AGE: int = 0
+    DB_CONN_HEALTH_CHECKS: bool = False
+    DB_POOL_IS_ACTIVE: bool = False
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_MAX_IDLE: float = 600.0
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = False
+    DB_REPLICA_HOSTS: List[str] = []
+    DB_PRIMARY_PIN_TIME: int = 5
 
     # SPAM_DETECTOR
     SPAM_RATE_COUNT_LIMIT: int
@@ -40,10 +50,65 @@ class EnvironmentConfig(BaseSettings):
     SPAM_RATE_PROB_DIFF_LIMIT: float
     SPAM_DETECTION_IS_ACTIVE: bool
     SPAM_DETECTION_TASK_PERIOD_TIME: int
+    SPAM_RATE_RECENT_WINDOW: int = 0
+    SPAM_HANDLER_CHUNK_SIZE: int = 1000
+    SPAM_HANDLER_CONCURRENCY: int = 1
+    RATING_BURST_DETECTION_IS_ACTIVE: bool = False
+    RATING_BURST_WINDOW: int = 60
+    RATING_BURST_BASELINE_WINDOW: int = 3600
+    RATING_BURST_MIN_COUNT: int = 20
+    RATING_BURST_FACTOR: float = 5.0
+    RATING_BURST_USER_LIMIT: int = 30
+
+    # ARTICLES
+    ARTICLES_LIST_PAGINATION: str = 'page_number'
+    ARTICLES_LIST_BODY_MODE: str = 'full'
+    ARTICLES_LIST_BODY_EXCERPT_LENGTH: int = 200
+    ARTICLES_LIST_CACHE_IS_ACTIVE: bool = False
+    ARTICLES_LIST_CACHE_TTL: int = 60
+    ARTICLES_LIST_LOCAL_CACHE_SIZE: int = 128
+    ARTICLES_LIST_CACHE_VERSION_TTL: float = 1.0
+
+    # RATING
+    RATING_BATCH_MAX_SIZE: int = 100
+
+    # RATING WRITE BEHIND
+    RATING_WRITE_BEHIND_IS_ACTIVE: bool = False
+    RATING_BUFFER_FLUSH_PERIOD_TIME: int = 10
+    RATING_BUFFER_FLUSH_BATCH_SIZE: int = 10000
+
+    # RATING ROLLUP
+    RATING_ROLLUP_IS_ACTIVE: bool = False
+    RATING_ROLLUP_BUCKET_SIZE: int = 3600
+    RATING_ROLLUP_RETENTION_DAYS: int = 30
+
+    # RATING ARCHIVE
+    RATING_ARCHIVE_IS_ACTIVE: bool = False
+    RATING_ARCHIVE_AGE_DAYS: int = 30
+    RATING_ARCHIVE_BATCH_SIZE: int = 5000
+    RATING_ARCHIVE_PERIOD_TIME: int = 3600
+
+    # AUTH TOKEN CACHE
+    AUTH_TOKEN_CACHE_TTL: int = 60
+    AUTH_TOKEN_LOCAL_CACHE_TTL: int = 5
+    AUTH_TOKEN_LOCAL_CACHE_SIZE: int = 1024
+    AUTH_TOKEN_SHARED_CACHE_IS_ACTIVE: bool = False
+
+    # SERVER TIMING
+    SERVER_TIMING_IS_ACTIVE: bool = False
+    SERVER_TIMING_SAMPLE_RATE: float = 1.0
+    SERVER_TIMING_LOG_THRESHOLD_MS: float = 500.0
+    SERVER_TIMING_HEADER_IS_ACTIVE: bool = True
+
+    # METRICS
+    METRICS_IS_ACTIVE: bool = False
 
     # CELERY
     CELERY_BROKER_REDIS: str
 
+    # REDIS
+    REDIS_URL: str | None = None
+
 config = EnvironmentConfig()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -77,6 +142,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -135,6 +201,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'core': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
     }
 }
 
@@ -149,6 +220,44 @@ DATABASES = {
         'PASSWORD': config.DB_PASSWORD,
         'HOST': config.DB_HOST,
         'PORT': config.DB_PORT,
+        'CONN_MAX_AGE': config.DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': config.DB_CONN_HEALTH_CHECKS,
+        'OPTIONS': {},
+    }
+}
+
+if config.DB_POOL_IS_ACTIVE:
+    # connections are returned to the pool after each request, so they are not persistent.
+    # pooled connections are checked on checkout when CONN_HEALTH_CHECKS is set
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config.DB_POOL_MIN_SIZE,
+        'max_size': config.DB_POOL_MAX_SIZE,
+        'timeout': config.DB_POOL_TIMEOUT,
+        'max_idle': config.DB_POOL_MAX_IDLE,
+    }
+
+if config.DB_PGBOUNCER_TRANSACTION_MODE:
+    # server side cursors and prepared statements do not survive between transactions
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    DATABASES['default']['OPTIONS']['prepare_threshold'] = None
+
+for i, replica_host in enumerate(config.DB_REPLICA_HOSTS):
+    host, _, port = replica_host.partition(':')
+    DATABASES[f'replica_{i}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or config.DB_PORT,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config.REDIS_URL or config.CELERY_BROKER_REDIS,
     }
 }
 
@@ -168,6 +277,10 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
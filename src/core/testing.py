@@ -0,0 +1,84 @@
+class FakeRedis:
+    '''
+    In memory stand-in of the redis commands metrics and burst detection use,
+    so their tests do not need a redis server.
+    '''
+
+    def __init__(self) -> None:
+        self.data = {}
+
+    def pipeline(self, transaction: bool = True):
+        return FakeRedisPipeline(self)
+
+    def incr(self, key: str) -> int:
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return key in self.data
+
+    def get(self, key: str) -> bytes | None:
+        value = self.data.get(key)
+        return None if value is None else str(value).encode()
+
+    def hincrbyfloat(self, key: str, field: str, amount: float) -> float:
+        hash_ = self.data.setdefault(key, {})
+        hash_[field.encode()] = float(hash_.get(field.encode(), 0)) + amount
+        return hash_[field.encode()]
+
+    def hgetall(self, key: str) -> dict:
+        return {field: str(value).encode() for field, value in self.data.get(key, {}).items()}
+
+    def delete(self, *keys) -> int:
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def rpush(self, key: str, *values) -> int:
+        list_ = self.data.setdefault(key, [])
+        list_.extend(value.encode() if isinstance(value, str) else value for value in values)
+        return len(list_)
+
+    def lrange(self, key: str, start: int, end: int) -> list:
+        list_ = self.data.get(key, [])
+        return list_[start:] if end == -1 else list_[start:end + 1]
+
+
+class FakeAsyncRedis:
+    '''
+    FakeRedis with awaitable commands, standing in for redis.asyncio clients.
+    '''
+
+    def __init__(self, redis_client: FakeRedis | None = None) -> None:
+        self.redis_client = redis_client or FakeRedis()
+
+    def pipeline(self, transaction: bool = True):
+        return FakeAsyncRedisPipeline(self.redis_client)
+
+    def __getattr__(self, name: str):
+        command = getattr(self.redis_client, name)
+
+        async def execute(*args, **kwargs):
+            return command(*args, **kwargs)
+        return execute
+
+
+class FakeRedisPipeline:
+
+    def __init__(self, redis_client: FakeRedis) -> None:
+        self.redis_client = redis_client
+        self.commands = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> list:
+        commands, self.commands = self.commands, []
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class FakeAsyncRedisPipeline(FakeRedisPipeline):
+
+    async def execute(self) -> list:
+        return super().execute()
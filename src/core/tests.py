@@ -1,6 +1,40 @@
-from django.test import TestCase
+import datetime
+from unittest import skipIf
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import redis
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from core.benchmark import calculate_percentile, run_load
+from core.cache import LocalLRUCache, TwoTierCache
+from core.db_pool import summarize_pool_stats
+from core.db_routers import (
+    PrimaryReplicaRouter,
+    apin_user_to_primary,
+    aread_from_replica,
+    pin_user_to_primary,
+    read_from_replica,
+)
+from core.metrics import CallbackGauge, MetricsRegistry, RedisCounter, RedisHistogram
+from core.middleware import ServerTimingMiddleware
+from core.renderers import FastJSONRenderer, orjson
+from core.server_timing import measure
+from core.settings import config
+from core.testing import FakeRedis
 from core.utils import (
+    calculate_merged_normal_dist_info,
     calculate_new_normal_dist_info_with_data_update,
+    calculate_normal_dist_info,
+    calculate_normal_dist_info_with_histogram,
     calculate_new_normal_dist_info_with_new_data_points,
 )
 
@@ -58,3 +92,288 @@ class TestUtils(TestCase):
         expected_mean_diff_square_sum = self.calc_mean_diff_square_sum(new_values)
         self.assertEqual(new_mean, expected_mean)
         self.assertAlmostEqual(new_mean_diff_square_sum, expected_mean_diff_square_sum, 3)
+
+    def test_calculate_merged_normal_dist_info_should_return_correct_values(self):
+        new_values = [4, 3, 4, 0, 2, 1]
+        new_mean, new_mean_diff_square_sum, new_count = calculate_merged_normal_dist_info(
+            self.mean,
+            self.mean_diff_square_sum,
+            len(self.initila_values),
+            *calculate_normal_dist_info(new_values),
+        )
+        all_values = self.initila_values + new_values
+        self.assertAlmostEqual(new_mean, self.calc_mean(all_values))
+        self.assertAlmostEqual(new_mean_diff_square_sum, self.calc_mean_diff_square_sum(all_values), 3)
+        self.assertEqual(new_count, len(all_values))
+
+    def test_calculate_normal_dist_info_with_histogram_should_return_correct_values(self):
+        histogram = [self.initila_values.count(score) for score in range(6)]
+        mean, variance, count = calculate_normal_dist_info_with_histogram(histogram)
+
+        self.assertAlmostEqual(mean, self.mean)
+        self.assertAlmostEqual(variance, self.mean_diff_square_sum / len(self.initila_values))
+        self.assertEqual(count, len(self.initila_values))
+        self.assertEqual(calculate_normal_dist_info_with_histogram([0] * 6), (0.0, 0.0, 0))
+
+
+class TestLocalLRUCache(TestCase):
+
+    def test_set_should_evict_least_recently_used_entry_when_cache_is_full(self):
+        cache = LocalLRUCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_get_should_return_default_when_entry_is_expired(self):
+        cache = LocalLRUCache(max_size=2, ttl=60)
+        cache.set('a', 1, ttl=-1)
+        self.assertEqual(cache.get('a', 'default'), 'default')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestTwoTierCache(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.cache = TwoTierCache(namespace='test', ttl=60, local_max_size=10, wait_timeout=0.1)
+
+    def test_get_or_set_should_compute_value_once(self):
+        compute = MagicMock(return_value={'a': 1})
+        self.assertEqual(self.cache.get_or_set('key', compute), {'a': 1})
+        self.assertEqual(self.cache.get_or_set('key', compute), {'a': 1})
+        compute.assert_called_once()
+
+    def test_get_or_set_should_recompute_value_after_invalidate(self):
+        self.cache.get_or_set('key', lambda: 1)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get_or_set('key', lambda: 2), 2)
+
+    def test_get_or_set_should_return_stale_value_when_another_process_is_computing(self):
+        self.cache.get_or_set('key', lambda: 1)
+        self.cache.invalidate()
+        versioned_key = f'test:{self.cache.get_version()}:key'
+        caches['default'].add(f'{versioned_key}:lock', 1)
+        compute = MagicMock(return_value=2)
+        self.assertEqual(self.cache.get_or_set('key', compute), 1)
+        compute.assert_not_called()
+
+    def test_get_or_set_should_read_version_from_shared_cache_once_per_version_ttl(self):
+        other_process_cache = TwoTierCache(namespace='test', ttl=60, local_max_size=10)
+        now = [1000.0]
+        with patch('core.cache.time.monotonic', lambda: now[0]):
+            self.cache.get_or_set('key', lambda: 1)
+            other_process_cache.invalidate()
+            with patch.object(caches['default'], 'get', wraps=caches['default'].get) as shared_get:
+                self.assertEqual(self.cache.get_or_set('key', lambda: 2), 1)
+                shared_get.assert_not_called()
+
+            now[0] += self.cache.version_ttl + 1
+            self.assertEqual(self.cache.get_or_set('key', lambda: 2), 2)
+
+    def test_get_or_set_should_compute_value_when_it_is_not_active(self):
+        self.cache.is_active = False
+        self.cache.get_or_set('key', lambda: 1)
+        self.assertEqual(self.cache.get_or_set('key', lambda: 2), 2)
+
+    async def test_aget_or_set_should_compute_value_once_until_ainvalidate(self):
+        compute = AsyncMock(return_value={'a': 1})
+        self.assertEqual(await self.cache.aget_or_set('key', compute), {'a': 1})
+        self.assertEqual(await self.cache.aget_or_set('key', compute), {'a': 1})
+        compute.assert_awaited_once()
+
+        await self.cache.ainvalidate()
+        self.assertEqual(await self.cache.aget_or_set('key', AsyncMock(return_value=2)), 2)
+
+    async def test_aget_or_set_should_return_stale_value_when_another_process_is_computing(self):
+        await self.cache.aget_or_set('key', AsyncMock(return_value=1))
+        await self.cache.ainvalidate()
+        versioned_key = f'test:{await self.cache.aget_version()}:key'
+        await caches['default'].aadd(f'{versioned_key}:lock', 1)
+        compute = AsyncMock(return_value=2)
+        self.assertEqual(await self.cache.aget_or_set('key', compute), 1)
+        compute.assert_not_awaited()
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class TestFastJSONRenderer(TestCase):
+
+    def test_render_should_return_same_bytes_as_default_renderer(self):
+        data = {
+            'id': 1,
+            'title': 'مقاله \u2028 article',
+            'rating_average': 3.3333333333333335,
+            'created_at': datetime.datetime(2024, 10, 12, 19, 32, 22, 156378, tzinfo=datetime.timezone.utc),
+            'errors': {'article': [ErrorDetail('Invalid pk "1" - object does not exist.', code='does_not_exist')]},
+            'user_rating': None,
+            'results': [{'score': 0}, {'score': 5}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_render_should_fall_back_to_default_renderer_when_indent_is_requested(self):
+        data = {'id': 1, 'results': []}
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=4'),
+            JSONRenderer().render(data, 'application/json; indent=4'),
+        )
+
+
+class TestDBPool(TestCase):
+
+    def test_summarize_pool_stats_should_add_average_wait_time_and_saturation(self):
+        stats = summarize_pool_stats({
+            'pool_min': 2,
+            'pool_max': 10,
+            'pool_size': 6,
+            'pool_available': 1,
+            'requests_num': 40,
+            'requests_wait_ms': 100,
+        })
+        self.assertEqual(stats['connections_in_use'], 5)
+        self.assertEqual(stats['requests_wait_ms_avg'], 2.5)
+        self.assertEqual(stats['saturation'], 0.5)
+
+    def test_summarize_pool_stats_should_return_zero_rates_when_pool_is_unused(self):
+        stats = summarize_pool_stats({'pool_min': 0, 'pool_max': 0, 'pool_size': 0, 'pool_available': 0})
+        self.assertEqual(stats['requests_wait_ms_avg'], 0.0)
+        self.assertEqual(stats['saturation'], 0.0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+@patch('core.db_routers.get_replica_aliases', lambda: ['replica_0'])
+class TestPrimaryReplicaRouter(TestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.user = User(id=1, username='user1')
+
+    def test_db_for_read_should_return_primary_outside_read_from_replica_block(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_db_for_read_should_return_replica_inside_read_from_replica_block(self):
+        with read_from_replica(user=AnonymousUser()):
+            self.assertEqual(self.router.db_for_read(User), 'replica_0')
+            self.assertEqual(self.router.db_for_write(User), 'default')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_db_for_read_should_return_primary_when_user_is_pinned_to_primary(self):
+        pin_user_to_primary(self.user)
+        with read_from_replica(user=self.user):
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        with read_from_replica(user=User(id=2, username='user2')):
+            self.assertEqual(self.router.db_for_read(User), 'replica_0')
+
+    async def test_db_for_read_should_route_async_orm_reads_inside_aread_from_replica_block(self):
+        await apin_user_to_primary(self.user)
+        async with aread_from_replica(user=self.user):
+            self.assertEqual(await sync_to_async(self.router.db_for_read)(User), 'default')
+        async with aread_from_replica(user=User(id=2, username='user2')):
+            self.assertEqual(await sync_to_async(self.router.db_for_read)(User), 'replica_0')
+
+
+class TestBenchmark(TestCase):
+
+    def test_calculate_percentile_should_interpolate_between_closest_ranks(self):
+        values = [10, 20, 30, 40, 50]
+        self.assertEqual(calculate_percentile(values, 50), 30)
+        self.assertEqual(calculate_percentile(values, 90), 46)
+        self.assertEqual(calculate_percentile(values, 100), 50)
+        self.assertEqual(calculate_percentile([], 50), 0.0)
+
+    def test_run_load_should_send_all_requests_and_count_errors(self):
+        sent_requests = []
+
+        def send_request(i):
+            sent_requests.append(i)
+            return i % 4 != 0
+
+        result = run_load(send_request, requests=20, concurrency=3)
+        self.assertEqual(sorted(sent_requests), list(range(20)))
+        self.assertEqual(result['requests'], 20)
+        self.assertEqual(result['errors'], 5)
+
+
+class TestServerTimingMiddleware(TestCase):
+
+    def get_response(self, request):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        with measure('serialize'):
+            pass
+        return HttpResponse()
+
+    def test_init_should_raise_middleware_not_used_when_server_timing_is_not_active(self):
+        with patch.object(config, 'SERVER_TIMING_IS_ACTIVE', False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ServerTimingMiddleware(self.get_response)
+
+    @patch.object(config, 'SERVER_TIMING_IS_ACTIVE', True)
+    @patch.object(config, 'SERVER_TIMING_LOG_THRESHOLD_MS', 0)
+    def test_call_should_add_server_timing_header_and_log_timing(self):
+        middleware = ServerTimingMiddleware(self.get_response)
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            response = middleware(RequestFactory().get('/articles/'))
+        header = response['Server-Timing']
+        self.assertIn('db;dur=', header)
+        self.assertIn('desc="1 queries"', header)
+        self.assertIn('serialize;dur=', header)
+        self.assertIn('total;dur=', header)
+        self.assertEqual(logs.records[0].db_query_count, 1)
+        self.assertEqual(logs.records[0].path, '/articles/')
+
+    @patch.object(config, 'SERVER_TIMING_IS_ACTIVE', True)
+    @patch.object(config, 'SERVER_TIMING_SAMPLE_RATE', 0.0)
+    def test_call_should_not_time_request_when_it_is_not_sampled(self):
+        middleware = ServerTimingMiddleware(self.get_response)
+        response = middleware(RequestFactory().get('/articles/'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class TestRedisMetrics(TestCase):
+
+    def setUp(self) -> None:
+        redis_client = FakeRedis()
+        self.histogram = RedisHistogram(
+            'test_duration_seconds', 'Test duration.', buckets=(0.1, 1.0), redis_client=redis_client
+        )
+        self.counter = RedisCounter('test_events', 'Test events.', redis_client=redis_client)
+
+    def test_render_should_expose_metrics_in_prometheus_text_format(self):
+        self.histogram.observe(0.05, stage='a')
+        self.histogram.observe(0.5, stage='a')
+        self.histogram.observe(5, stage='a')
+        self.counter.inc(3, result='spam')
+        registry = MetricsRegistry()
+        for metric in (self.histogram, self.counter, CallbackGauge('test_backlog', 'Test backlog.', lambda: 7)):
+            registry.register(metric)
+
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP test_duration_seconds Test duration.',
+            '# TYPE test_duration_seconds histogram',
+            'test_duration_seconds_bucket{stage="a",le="0.1"} 1.0',
+            'test_duration_seconds_bucket{stage="a",le="1.0"} 2.0',
+            'test_duration_seconds_bucket{stage="a",le="+Inf"} 3.0',
+            'test_duration_seconds_sum{stage="a"} 5.55',
+            'test_duration_seconds_count{stage="a"} 3.0',
+            '# HELP test_events Test events.',
+            '# TYPE test_events counter',
+            'test_events_total{result="spam"} 3.0',
+            '# HELP test_backlog Test backlog.',
+            '# TYPE test_backlog gauge',
+            'test_backlog 7.0',
+        ])
+
+    def test_observe_should_not_record_when_metric_is_not_active(self):
+        self.histogram.is_active = False
+        self.histogram.observe(0.5)
+        self.assertEqual(self.histogram.read(), {})
+
+    def test_observe_should_not_raise_when_redis_fails(self):
+        redis_client = MagicMock()
+        redis_client.pipeline.return_value.execute.side_effect = redis.ConnectionError()
+        histogram = RedisHistogram('test_duration_seconds', 'Test duration.', redis_client=redis_client)
+        with self.assertLogs('core.metrics', 'WARNING'):
+            histogram.observe(0.5)
@@ -16,14 +16,22 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
+from core.views import DBPoolStatsView, MetricsView
 from users.views import LoginView, RegisterView
-from articles.views import ArticlesListView, RatingView
+from articles.async_views import AsyncArticlesListView, AsyncRatingView
+from articles.views import ArticleDetailView, ArticlesListView, RatingBatchView, RatingView
 
 
 urlpatterns = [
     path('users/login', LoginView.as_view()),
     path('users/register', RegisterView.as_view()),
     path('articles/rate', RatingView.as_view(), name='create-rating'),
+    path('articles/rate/batch', RatingBatchView.as_view(), name='create-ratings-batch'),
     path('articles/', ArticlesListView.as_view(), name='articles-list'),
+    path('articles/<int:pk>', ArticleDetailView.as_view(), name='article-detail'),
+    path('async/articles/rate', AsyncRatingView.as_view(), name='async-create-rating'),
+    path('async/articles/', AsyncArticlesListView.as_view(), name='async-articles-list'),
+    path('stats/db-pool', DBPoolStatsView.as_view(), name='db-pool-stats'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('admin/', admin.site.urls),
 ]
@@ -1,6 +1,11 @@
 import math
 from typing import Tuple, List
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 def calculate_zscore(mean, variance, data_point):
     std_dev = math.sqrt(variance)
@@ -16,6 +21,16 @@ def calculate_normal_distribution_pdf(mean, variance, data_point):
     return num/denom
 
 
+def calculate_normal_distribution_pdfs(means, variances, data_points):
+    '''
+    Vectorized calculate_normal_distribution_pdf over numpy float arrays.
+    Requires numpy.
+    '''
+    denom = (2 * math.pi * variances)**.5
+    num = numpy.exp(-(data_points - means)**2 / (2 * variances))
+    return num/denom
+
+
 def calculate_new_normal_dist_info_with_data_update(
     mean: float,
     mean_diff_square_sum: float,
@@ -52,3 +67,47 @@ def calculate_new_normal_dist_info_with_new_data_points(
     new_mean_diff_square_sum = mean_diff_square_sum + sum(d * d2 for d, d2 in zip(delta, delta2))
 
     return (new_mean, new_mean_diff_square_sum, new_data_count)
+
+
+def calculate_normal_dist_info(data_points: List[int]) -> Tuple[float, float, int]:
+    '''
+    Calculates mean, mean_diff_square_sum and data count of data points.
+    return mean, mean_diff_square_sum, data_count
+    '''
+    return calculate_new_normal_dist_info_with_new_data_points(0.0, 0.0, 0, data_points)
+
+
+def calculate_merged_normal_dist_info(
+    mean: float,
+    mean_diff_square_sum: float,
+    data_count: int,
+    other_mean: float,
+    other_mean_diff_square_sum: float,
+    other_data_count: int,
+) -> Tuple[float, float, int]:
+    '''
+    Merges normal dist info of two sets of data points (parallel variance formula).
+    return new_mean, new_mean_diff_square_sum, new_data_count
+    '''
+    new_data_count = data_count + other_data_count
+    delta = other_mean - mean
+    new_mean = mean + delta * other_data_count / new_data_count
+    new_mean_diff_square_sum = (
+        mean_diff_square_sum + other_mean_diff_square_sum
+        + delta * delta * data_count * other_data_count / new_data_count
+    )
+    return (new_mean, new_mean_diff_square_sum, new_data_count)
+
+
+def calculate_normal_dist_info_with_histogram(score_counts: List[int]) -> Tuple[float, float, int]:
+    '''
+    Calculates mean, variance and data count of data points whose values are
+    indexes of score_counts, e.g. [2, 0, 1] is data points 0, 0 and 2.
+    return mean, variance, data_count
+    '''
+    data_count = sum(score_counts)
+    if data_count == 0:
+        return (0.0, 0.0, 0)
+    mean = sum(score * count for score, count in enumerate(score_counts)) / data_count
+    variance = sum(count * (score - mean) ** 2 for score, count in enumerate(score_counts)) / data_count
+    return (mean, variance, data_count)
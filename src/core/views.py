@@ -0,0 +1,28 @@
+from django.http import HttpResponse
+from rest_framework import permissions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.db_pool import get_pool_stats
+from core.metrics import metrics_registry
+from users.authentication import CachedTokenAuthentication
+
+
+class DBPoolStatsView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request: Request):
+        return Response(get_pool_stats(), status.HTTP_200_OK)
+
+
+class MetricsView(APIView):
+    '''
+    Metrics of all web and celery processes in prometheus text format.
+    '''
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request: Request):
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,162 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication, exceptions
+from rest_framework.authtoken.models import Token
+
+from core.cache import LocalLRUCache
+from core.server_timing import measure
+from core.settings import config
+
+
+class TokenUserCache:
+    '''
+    Users of auth tokens cached by token key in a per-process LRU and
+    optionally in the shared django cache. Entries of other processes' LRUs
+    can not be dropped, so they live for at most local_ttl seconds.
+
+    Only user_fields are cached, never the password hash. Cached users are
+    rebuilt with other fields deferred, so reading them queries the database.
+    '''
+    # in User field order, as from_db expects
+    user_fields = ('id', 'is_superuser', 'username', 'is_staff', 'is_active')
+
+    def __init__(
+        self,
+        ttl: int,
+        local_ttl: int,
+        local_max_size: int,
+        shared_cache_is_active: bool = False,
+        cache_alias: str = 'default',
+        key_prefix: str = 'auth:token',
+    ) -> None:
+        self.ttl = ttl
+        self.shared_cache_is_active = shared_cache_is_active
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.local_cache = LocalLRUCache(max_size=local_max_size, ttl=local_ttl)
+
+    @property
+    def shared_cache(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, token_key: str) -> str:
+        return f'{self.key_prefix}:{token_key}'
+
+    def make_entry(self, user) -> tuple:
+        return tuple(getattr(user, field) for field in self.user_fields)
+
+    def make_user(self, entry: tuple | None):
+        if entry is None:
+            return None
+        return User.from_db(None, list(self.user_fields), entry)
+
+    def get(self, token_key: str):
+        entry = self.local_cache.get(token_key)
+        if entry is None and self.shared_cache_is_active:
+            entry = self.shared_cache.get(self.make_key(token_key))
+            if entry is not None:
+                self.local_cache.set(token_key, entry)
+        return self.make_user(entry)
+
+    async def aget(self, token_key: str):
+        entry = self.local_cache.get(token_key)
+        if entry is None and self.shared_cache_is_active:
+            entry = await self.shared_cache.aget(self.make_key(token_key))
+            if entry is not None:
+                self.local_cache.set(token_key, entry)
+        return self.make_user(entry)
+
+    def set(self, token_key: str, user) -> None:
+        entry = self.make_entry(user)
+        self.local_cache.set(token_key, entry)
+        if self.shared_cache_is_active:
+            self.shared_cache.set(self.make_key(token_key), entry, self.ttl)
+
+    async def aset(self, token_key: str, user) -> None:
+        entry = self.make_entry(user)
+        self.local_cache.set(token_key, entry)
+        if self.shared_cache_is_active:
+            await self.shared_cache.aset(self.make_key(token_key), entry, self.ttl)
+
+    def delete(self, token_key: str) -> None:
+        self.local_cache.delete(token_key)
+        if self.shared_cache_is_active:
+            self.shared_cache.delete(self.make_key(token_key))
+
+
+token_user_cache = TokenUserCache(
+    ttl=config.AUTH_TOKEN_CACHE_TTL,
+    local_ttl=config.AUTH_TOKEN_LOCAL_CACHE_TTL,
+    local_max_size=config.AUTH_TOKEN_LOCAL_CACHE_SIZE,
+    shared_cache_is_active=config.AUTH_TOKEN_SHARED_CACHE_IS_ACTIVE,
+)
+
+
+class CachedTokenAuthentication(authentication.TokenAuthentication):
+    '''
+    TokenAuthentication which skips the token and user query while the user
+    of the token is cached.
+    '''
+
+    token_user_cache = token_user_cache
+
+    def authenticate(self, request):
+        with measure('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        user = self.token_user_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            self.token_user_cache.set(key, user)
+            return (user, token)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, Token(key=key, user=user))
+
+    async def aauthenticate(self, request):
+        '''
+        Same as authenticate() for async views, fetching the token with the async ORM.
+        '''
+        with measure('auth'):
+            return await self.aauthenticate_token(request)
+
+    async def aauthenticate_token(self, request):
+        auth = authentication.get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            msg = _('Invalid token header. No credentials provided.')
+            raise exceptions.AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = _('Invalid token header. Token string should not contain spaces.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. Token string should not contain invalid characters.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        user = await self.token_user_cache.aget(key)
+        if user is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+            user = token.user
+            if user.is_active:
+                await self.token_user_cache.aset(key, user)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, Token(key=key, user=user))
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.authentication import token_user_cache
+
+# cached fields and the password, changing any of them drops cached users
+TOKEN_USER_FIELDS = frozenset(token_user_cache.user_fields) - {'id'} | {'password'}
+
+
+def get_token_user_state(user: User) -> dict:
+    # read from __dict__, so deferred fields are not loaded
+    return {field: user.__dict__.get(field) for field in TOKEN_USER_FIELDS}
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token_user(sender, instance: Token, **kwargs):
+    token_user_cache.delete(instance.key)
+
+
+@receiver(post_init, sender=User)
+def remember_token_user_state(sender, instance: User, **kwargs):
+    instance._token_user_state = get_token_user_state(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance: User, created: bool, update_fields=None, **kwargs):
+    '''
+    Drops cached users of the user's tokens when a cached field or the password
+    changed, so saves like last_login updates do not query tokens.
+    '''
+    saved_fields = TOKEN_USER_FIELDS if update_fields is None else TOKEN_USER_FIELDS.intersection(update_fields)
+    saved_state = {field: instance.__dict__.get(field) for field in saved_fields}
+    is_changed = any(instance._token_user_state[field] != value for field, value in saved_state.items())
+    instance._token_user_state.update(saved_state)
+    if created or not is_changed:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        token_user_cache.delete(key)
@@ -1,3 +1,77 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
 
-# Create your tests here.
+from users.authentication import CachedTokenAuthentication, TokenUserCache, token_user_cache
+
+
+class TestCachedTokenAuthentication(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='user1')
+        self.token = Token.objects.create(user=self.user)
+        self.authenticator = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_user_cache.local_cache.clear()
+
+    def test_authenticate_credentials_should_not_query_db_when_token_user_is_cached(self):
+        self.authenticator.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.authenticator.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_authenticate_credentials_should_fail_when_token_is_deleted(self):
+        self.authenticator.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticator.authenticate_credentials(self.token.key)
+
+    def test_authenticate_credentials_should_fail_when_user_is_deactivated(self):
+        self.authenticator.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticator.authenticate_credentials(self.token.key)
+
+    def test_authenticate_credentials_should_fail_when_user_is_deactivated_with_update_fields(self):
+        self.authenticator.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticator.authenticate_credentials(self.token.key)
+
+    def test_user_save_should_keep_cached_token_user_when_no_cached_field_or_password_changed(self):
+        self.authenticator.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(1):
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            self.user.email = 'user1@example.com'
+            self.user.save()
+        with self.assertNumQueries(0):
+            self.authenticator.authenticate_credentials(self.token.key)
+
+        self.user.set_password('new password')
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.authenticator.authenticate_credentials(self.token.key)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_token_user_cache_should_not_store_password_hash(self):
+        self.user.set_password('password')
+        self.user.save()
+        user_cache = TokenUserCache(ttl=60, local_ttl=5, local_max_size=10, shared_cache_is_active=True)
+        user_cache.set(self.token.key, self.user)
+
+        entry = caches['default'].get(user_cache.make_key(self.token.key))
+        self.assertNotIn(self.user.password, entry)
+        user_cache.local_cache.clear()
+        with self.assertNumQueries(0):
+            user = user_cache.get(self.token.key)
+            self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'user1', True))
+        self.assertIn('password', user.get_deferred_fields())